@@ -15,13 +15,21 @@ Python version: 3.9.13
 try:
     import platform  # Access to underlying platform’s identifying data
     import os  # Miscellaneous operating system interfaces
-    from typing import Union, Callable, Optional, Generator  # Support for type hints
+    from typing import Union, Callable, Optional, Generator, Iterator  # Support for type hints
     import functools  # Higher-order functions and operations on callable objects
     import itertools  # Functions creating iterators for efficient looping
     import signal  # Set handlers for asynchronous events
     import re  # Regular expression operations
     import time as tim  # Time access and conversions
     import concurrent.futures  # Launching parallel tasks
+    import hashlib  # Secure hashes and message digests
+    import io  # Core tools for working with streams
+    import contextlib  # Utilities for with-statement contexts
+    import json  # JSON encoder and decoder
+    import shutil  # High-level file operations
+    import inspect  # Inspect live objects
+    import sys  # System-specific parameters and functions
+    import argparse  # Parser for command-line options, arguments and sub-commands
 except ImportError as L_err:
     print("Chyba v načtení standardní knihovny: {0}".format(L_err))
     exit(1)
@@ -38,8 +46,14 @@ try:
     # Data manipulation and analysis
     import xarray as xr  # Library for working with labeled multi-dimensional arrays
     import numpy as np  # Fundamental package for scientific computing
-    from scipy.stats import skew, kurtosis, hmean, gmean, linregress  # Library for statistics and regression analysis
-    from scipy.fftpack import dct  # Library for discrete cosine transform
+    from scipy.stats import skew, kurtosis, hmean, gmean, norm, rankdata  # Library for statistics
+    from scipy.stats import t as student_t  # Student's t distribution for regression p-values
+    from scipy.stats import genextreme  # Generalized extreme value distribution
+    from scipy.special import gamma  # Gamma function for the L-moment estimators
+    from scipy.fft import dct, idct, rfft, irfft, next_fast_len  # Library for DCT and FFT (multithreaded)
+    from scipy.signal import welch, periodogram, fftconvolve  # Spectral density estimation and FFT convolution
+    from scipy.cluster.hierarchy import linkage, leaves_list, fcluster, dendrogram  # Hierarchical clustering
+    from scipy.spatial.distance import squareform  # Conversion of distance matrices
 
     # Visualization
     import tqdm  # displaying progress bars
@@ -56,8 +70,15 @@ except Exception as e:
     print(f"Jiná chyba v ačtení knihovny třetích stran: {e}")
     exit(1)
 
+# Optional third-party libraries:
+try:
+    import yaml  # YAML parser for the job files of JobRunner
+except ImportError:
+    yaml = None
+
 DEBUG_PRINT = False  # If True, print more information about the operations performed.
 DEBUG_SKIP = False  # If True, skip parts for loading data into the loop to draw graphs.
+PLOT_OPTIONS = 25  # Number of plot options offered in the menu (0 to PLOT_OPTIONS - 1).
 
 
 class JumpException(Exception):
@@ -68,6 +89,13 @@ class JumpException(Exception):
     pass
 
 
+class ScriptedInputError(Exception):
+    """
+    Custom exception class raised when a headless job asks for more input than its scripted answers provide.
+    """
+    pass
+
+
 class Utils:
     """
     A utility class providing various helper functions.
@@ -98,11 +126,12 @@ class Utils:
 
         :return: None
         """
-        print("""Nápověda:
+        print(f"""Nápověda:
 pro potvrzení napište 'a' nebo 'y'
 pro zamítnutí napište 'n'
 pro výpis nápovědy 'h'
-pro výběr plotu '0-9'
+pro výběr plotu '0-{PLOT_OPTIONS - 1}'
+pro zadání čísla (např. délky okna), př.: '12', '120'
 pro výběr let, př.: '2000', '1990-2000', '1982, 1984, 1986-1988'
 pro výběr krajů, př.: '0', '1,2-7,12', '7-8'
 a pro ukončení programu 'k', 'e', 'x' nebo '.'\n""")
@@ -142,6 +171,24 @@ class UserInterface:
     parsing it into the desired format.
     """
 
+    @staticmethod
+    def ask(text: str, answers: Optional[Iterator[str]] = None) -> str:
+        """
+        Reads one line of user input, or the next scripted answer when a headless job is running.
+
+        :param text: prompt to display to the user
+        :param answers: scripted answers of a headless job, None reads the keyboard
+        :return: the entered or scripted text
+        """
+        if answers is None:
+            return input(text)
+        try:
+            answer: str = next(answers)
+        except StopIteration:
+            raise ScriptedInputError(f"Chybí odpověď na dotaz: {text}")
+        print(text + answer) if DEBUG_PRINT else None
+        return answer
+
     @staticmethod
     def parse_date_range(date_str: str) -> list[int]:
         """
@@ -202,7 +249,9 @@ class UserInterface:
             return []
 
     @staticmethod
-    def input_loop(text: str, match: bool = False, year: bool = False, region: bool = False) -> Union[bool, str, list]:
+    def input_loop(text: str, match: bool = False, year: bool = False, region: bool = False,
+                   number: bool = False, answers: Optional[Iterator[str]] = None,
+                   last_year: Optional[int] = None) -> Union[bool, str, list, int]:
         """
         Loops until valid user input is entered.
 
@@ -210,6 +259,9 @@ class UserInterface:
         :param match: whether the user input should be a single digit
         :param year: whether the user input should be a date range
         :param region: whether the user input should be a region range
+        :param number: whether the user input should be a positive integer
+        :param answers: scripted answers of a headless job, None reads the keyboard
+        :param last_year: the last year of the loaded data offered by the year prompt
         :return: valid user input
         """
         yes_list = ["a", "ano", "y", "yes", "souhlas", "samozřejmě", "certainly"]
@@ -219,7 +271,7 @@ class UserInterface:
         while True:
             if region:
                 # Prompt user for region range input
-                user_input: str = input(text + " (0-13): ")
+                user_input: str = UserInterface.ask(text + " (0-13): ", answers)
                 low_user_input: str = user_input.lower()
                 if low_user_input in help_list:
                     Utils.pyhelp()
@@ -231,7 +283,9 @@ class UserInterface:
 
             if year:
                 # Prompt user for date range input
-                user_input: str = input(text + " (1961-2022): ")
+                years: str = f"{PrefixSumIndex.FIRST_YEAR}-{last_year}" if last_year is not None else \
+                    f"od {PrefixSumIndex.FIRST_YEAR}"
+                user_input: str = UserInterface.ask(text + f" ({years}): ", answers)
                 low_user_input: str = user_input.lower()
                 if low_user_input in help_list:
                     # Display help message
@@ -244,9 +298,26 @@ class UserInterface:
                     # Parse and return region range input
                     return UserInterface.parse_date_range(low_user_input)
 
+            if number:
+                # Prompt user for positive integer input
+                user_input: str = UserInterface.ask(text + ": ", answers)
+                low_user_input: str = user_input.lower()
+                if low_user_input.isdigit() and int(low_user_input) > 0:
+                    # Return user input as integer if it is a positive number
+                    return int(low_user_input)
+                elif low_user_input in help_list:
+                    # Display help message
+                    Utils.pyhelp()
+                    continue
+                elif low_user_input in end_list:
+                    # Exit program if user input is in end list
+                    exit()
+                print("Zadejte kladné celé číslo")
+                continue
+
             if match:
                 # Prompt user for single digit input
-                user_input: str = input(text + " (0-9/help/konec)?: ")
+                user_input: str = UserInterface.ask(text + f" (0-{PLOT_OPTIONS - 1}/help/konec)?: ", answers)
                 low_user_input: str = user_input.lower()
                 if low_user_input.isdigit():
                     # Return user input if it is a single digit
@@ -260,7 +331,7 @@ class UserInterface:
                     exit()
             else:
                 # Prompt user for yes/no input
-                user_input: str = input(text + " (ano/ne/help/konec)?: ")
+                user_input: str = UserInterface.ask(text + " (ano/ne/help/konec)?: ", answers)
                 low_user_input: str = user_input.lower()
                 if low_user_input in yes_list:
                     # Return True if user input is in yes list
@@ -298,6 +369,8 @@ class DataFetcher:
         self.temper_data_are: bool = False
         self.precip_data_are: bool = False
         self.parallel: bool = False
+        # Results of the data-quality scan of the loaded tables
+        self.quality: dict[str, dict] = {}
 
     def online_control(self, url: str) -> bool:
         """
@@ -602,226 +675,2286 @@ class DataFetcher:
         else:  # offline, load backup
             print("load_backup") if DEBUG_PRINT else None
             data: dict = self.load_backup()
+        self.validate(data)
         return data
 
+    def validate(self, data: dict) -> None:
+        """
+        Runs the vectorized data-quality scan of the loaded tables and prints its report.
+
+        :param data: A dictionary with the weather data, where keys are "temper" and/or "precip".
+        :return: None
+        """
+        self.quality = {name: DataValidator.scan(array, name) for name, array in data.items()}
+        for name, result in self.quality.items():
+            DataValidator.report(result, name)
 
-class GraphPlotter:
+    def fetch(self, online: bool, temper: bool, precip: bool, parallel: bool = False, save: bool = False,
+              validate: bool = True) -> dict:
+        """
+        Non-interactive counterpart of get_data for the command line, it never asks the user.
+
+        :param online: Flag whether to fetch data online (otherwise the backup is loaded).
+        :param temper: Flag whether to fetch temperature data or not.
+        :param precip: Flag whether to fetch precipitation data or not.
+        :param parallel: Flag whether to fetch data in parallel or not.
+        :param save: Flag whether to save the fetched data as the new backup.
+        :param validate: Flag whether to run the data-quality scan of the loaded data.
+        :return: A dictionary containing fetched data, where keys are "temper" and/or "precip".
+        """
+        self.temper_data_are: bool = temper
+        self.precip_data_are: bool = precip
+        self.parallel: bool = parallel
+        if online:
+            if not (self.online_control(self.TEMPER_MAIN_URL) and self.online_control(self.PRECIP_MAIN_URL)):
+                print("Problém s webovou stránkou")
+                return {}
+            data: dict = self.get_url_data()
+            if save:
+                os.makedirs(self.BACKUP_PATH, exist_ok=True)
+                self.create_new_backup(data)
+        else:
+            if not os.path.exists(self.BACKUP_PATH):
+                print("Chybí záloha html stránek pro offline zpracování dat")
+                return {}
+            # The backup is read into memory, so the files can be overwritten later
+            data: dict = {name: array.load() for name, array in self.load_backup().items()}
+        if validate:
+            self.validate(data)
+        return data
+
+    def update(self, temper: bool, precip: bool, parallel: bool = False) -> dict:
+        """
+        Fetches the data online, compares them with the backup, prints the years that are new or have changed
+        (e.g. the newly published months) and saves the new backup if there is any change.
+
+        :param temper: Flag whether to update temperature data or not.
+        :param precip: Flag whether to update precipitation data or not.
+        :param parallel: Flag whether to fetch data in parallel or not.
+        :return: A dictionary containing fetched data, where keys are "temper" and/or "precip".
+        """
+        # The old backup is only compared, so it is not scanned again
+        old: dict = self.fetch(False, temper, precip, validate=False) if os.path.exists(self.BACKUP_PATH) else {}
+        new: dict = self.fetch(True, temper, precip, parallel)
+        changed: bool = False
+        for name, array in new.items():
+            # Tables of both versions ordered by year, compared year by year
+            tables: np.ndarray = array.values[DataValidator.chronological(len(array) - 60)]
+            years: list[int] = list(range(PrefixSumIndex.FIRST_YEAR, PrefixSumIndex.FIRST_YEAR + len(tables)))
+            if name in old and old[name].shape[1:] == array.shape[1:]:
+                previous: np.ndarray = old[name].values[DataValidator.chronological(len(old[name]) - 60)]
+                common: int = min(len(previous), len(tables))
+                differs: np.ndarray = np.ones(len(tables), dtype=bool)
+                differs[:common] = (previous[:common].astype(str) != tables[:common].astype(str)).any(axis=(1, 2))
+                years = [year for year, flag in zip(years, differs) if flag]
+            title: str = "teplot" if name == "temper" else "srážek"
+            print(f"Změněné roky {title}: {', '.join(map(str, years))}" if years else f"Data {title} jsou beze změn")
+            changed = changed or bool(years)
+        if new and changed:
+            os.makedirs(self.BACKUP_PATH, exist_ok=True)
+            self.create_new_backup(new)
+            print(f'Záloha ve složce "{self.BACKUP_PATH}" byla aktualizována')
+        return new
+
+
+class DataValidator:
     """
-    Class GraphPlotter is a utility class that provides methods for plotting various types of graphs
-    related to weather data.
-    It can plot 2D and 3D graphs, histograms, boxplots, and correlation plots.
-    It takes input data in the form of a dictionary containing temperature and/or precipitation data.
-    The class also provides an interactive user interface to choose which type of graph to plot and on which data.
+    The DataValidator class checks the scraped CHMI tables right after they are loaded. All checks work on whole
+    arrays at once (string parsing, plausible ranges, consistency of value, normal and deviation, robust z-scores
+    per region and month, duplicate years), so the scan adds only milliseconds even for long archives.
     """
+    # Plausible ranges of monthly values in the Czech Republic (temperature in °C, precipitation in mm)
+    RANGES: dict[str, tuple[float, float]] = {"temper": (-25., 30.), "precip": (0., 600.)}
+    Z_LIMIT: float = 5.  # robust z-score limit of an outlier
+    LISTED: int = 5  # number of cells listed in the report for each problem
 
-    def __init__(self, data: dict[str, xr.DataArray], temper_choose: bool, precip_choose: bool) -> None:
-        # Set the months and regions for later use
-        self.months: list[str] = ['Leden', 'Únor', 'Březen', 'Duben', 'Květen', 'Červen', 'Červenec', 'Srpen', 'Září',
-                                  'Říjen', 'Listopad', 'Prosinec']
-        self.regions: list[str] = ['Česká republika', 'Praha a Středočeský', 'Jihočeský', 'Plzeňský', 'Karlovarský',
-                                   'Ústecký', 'Liberecký', 'Královéhradecký', 'Pardubický', 'Vysočina', 'Jihomoravský',
-                                   'Olomoucký', 'Zlínský', 'Moravskoslezský']
-        # Save the user's choices for temperature and precipitation data
-        self.temper_choose: bool = temper_choose
-        self.precip_choose: bool = precip_choose
-        self.last_time: float = tim.time()
-        # Make a copy of the original data to use as a backup
-        self.data: dict[str, xr.DataArray] = data.copy()
-        self.backup_data: dict = {}
-        if temper_choose:
-            self.backup_data["temper"]: xr.DataArray = self.data["temper"].copy()
-        if precip_choose:
-            self.backup_data["precip"]: xr.DataArray = self.data["precip"].copy()
-        # Get length of the data, remove duplicate data, and slice the data into decades
-        if temper_choose:
-            len_data: int = len(self.data["temper"]) - 60  # remove duplicate data
-        else:
-            len_data: int = len(self.data["precip"]) - 60  # remove duplicate data
-        # Get the length of the last decade and the number of decades in the data
+    @staticmethod
+    def parse(values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Converts an array of CHMI number strings with a decimal comma into floats and marks malformed cells.
+
+        :param values: numpy array of strings, e.g. '-1,5'
+        :return: a tuple (floats, malformed), empty and malformed cells are NaN in the floats
+        """
+        strings: np.ndarray = np.char.strip(np.char.replace(values.astype(str), ',', '.'))
+        strings = strings.astype(f"<U{max(strings.dtype.itemsize // 4, 1)}")
+        # A number is an optional leading sign, ASCII digits and at most one decimal point, checked on the code
+        # points of all cells at once (the shorter strings are padded with zeros)
+        chars: np.ndarray = strings[..., None].view(np.uint32)
+        digit: np.ndarray = (chars >= ord('0')) & (chars <= ord('9'))
+        point: np.ndarray = chars == ord('.')
+        sign: np.ndarray = ((chars == ord('+')) | (chars == ord('-'))) & (np.arange(chars.shape[-1]) == 0)
+        numeric: np.ndarray = (digit | point | sign | (chars == 0)).all(axis=-1) & digit.any(axis=-1) & \
+            (point.sum(axis=-1) <= 1)
+        malformed: np.ndarray = ~numeric & (strings != '')
+        return np.where(numeric, strings, 'nan').astype(float), malformed
+
+    @staticmethod
+    def chronological(len_data: int) -> list[int]:
+        """
+        Returns the indices of the scraped tables ordered by year (the tables are listed by decades from the newest).
+
+        :param len_data: number of tables without the duplicates
+        :return: list of table indices, the position in the list is the year minus 1961
+        """
         rest_size: int = len_data % 10
-        decades: int = int(len_data / 10)  # 1961-today (minimal 62 years)
-        # Slice the temperature data into decades and remove unnecessary rows and columns
-        if temper_choose:
-            self.data["temper"]: xr.DataArray = self.data["temper"].isel(time=sum(
-                [list(range(len_data - 10 * (i + 1), len_data - 10 * i)) for i in range(decades)], []) + list(
-                range(rest_size)))
-            self.data["temper"]: xr.DataArray = self.data["temper"].isel(row=slice(1, 1 + 14 * 3, 3),
-                                                                         col=slice(2, 2 + 12))
-        # Slice the precipitation data into decades and remove unnecessary rows and columns
-        if precip_choose:
-            self.data["precip"]: xr.DataArray = self.data["precip"].isel(time=sum(
-                [list(range(len_data - 10 * (i + 1), len_data - 10 * i)) for i in range(decades)], []) + list(
-                range(rest_size)))
-            self.data["precip"]: xr.DataArray = self.data["precip"].isel(row=slice(1, 1 + 14 * 3, 3),
-                                                                         col=slice(2, 2 + 12))
+        decades: int = int(len_data / 10)
+        return sum([list(range(len_data - 10 * (i + 1), len_data - 10 * i)) for i in range(decades)], []) + list(
+            range(rest_size))
 
-    def reset_data(func: Callable[..., any]) -> Callable[..., any]:
+    @classmethod
+    def scan(cls, data: xr.DataArray, name: str) -> dict:
         """
-        This is a decorator function that takes another function as an argument and returns a new function.
-        The returned function restores the original data stored in the data dictionary by copying the backup data
-        for possible reuse.
+        Scans the raw table of one weather variable.
+
+        :param data: xarray.DataArray of strings with the dims (time, row, col) as returned by get_weather_data
+        :param name: "temper" or "precip"
+        :return: a dictionary with the lists of (year, region, month, ...) tuples for each problem
+            ('malformed', 'missing', 'out_of_range', 'inconsistent', 'outliers'), groups of identical years
+            ('duplicates'), the region names from the table ('regions') and the duration of the scan in seconds
+            ('time')
+        """
+        start: float = tim.time()
+        len_data: int = len(data) - 60  # remove duplicate data
+        raw: np.ndarray = data.values[cls.chronological(len_data)]
+        # Value, normal and deviation rows of the 14 regions with the 12 months, shape (3, years, regions, months)
+        block: np.ndarray = raw[:, 1:1 + 14 * 3, 2:2 + 12].reshape(len(raw), 14, 3, 12).transpose(2, 0, 1, 3)
+        numbers: np.ndarray
+        malformed: np.ndarray
+        numbers, malformed = cls.parse(block)
+        value, normal, deviation = numbers
+        # The text of the first malformed row of every cell
+        text: np.ndarray = np.take_along_axis(block, malformed.argmax(axis=0)[None], axis=0)[0].astype(str)
+        malformed = malformed.any(axis=0)
+
+        # Empty cells are expected only at the end of the current year
+        published: np.ndarray = np.isfinite(value).any(axis=1)
+        expected: np.ndarray = np.zeros_like(published)
+        expected[-1] = np.logical_or.accumulate(published[-1][::-1])[::-1] == 0
+        missing: np.ndarray = ~np.isfinite(value) & ~malformed & ~expected[:, None, :]
+
+        low, high = cls.RANGES[name]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out_of_range: np.ndarray = (value < low) | (value > high)
+            # The deviation is the difference from the normal (temperature) or the percentage of it (precipitation),
+            # the tolerance covers the rounding of the published numbers
+            if name == "temper":
+                inconsistent: np.ndarray = np.abs(value - normal - deviation) > 0.15
+            else:
+                inconsistent: np.ndarray = (normal > 0) & (np.abs(100 * value / normal - deviation) > 1 + 10 / normal)
+            # Robust z-score from the median and the median absolute deviation of every region and month,
+            # the skewed precipitation is compared after the square root transformation
+            scaled: np.ndarray = value if name == "temper" else np.sqrt(value)
+            median: np.ndarray = np.nanmedian(scaled, axis=0)
+            mad: np.ndarray = np.nanmedian(np.abs(scaled - median), axis=0)
+            z: np.ndarray = 0.6745 * (scaled - median) / mad
+            outliers: np.ndarray = np.abs(z) > cls.Z_LIMIT
+
+        # Years with identical tables, compared by rows of all published values
+        flat: np.ndarray = np.nan_to_num(value.reshape(len(value), -1), nan=np.inf)
+        used: np.ndarray = published.any(axis=1)
+        inverse: np.ndarray
+        counts: np.ndarray
+        _, inverse, counts = np.unique(flat[used], axis=0, return_inverse=True, return_counts=True)
+        years: np.ndarray = PrefixSumIndex.FIRST_YEAR + np.flatnonzero(used)
+        duplicates: list[list[int]] = [years[inverse.ravel() == group].tolist() for group in np.flatnonzero(counts > 1)]
+
+        def cells(mask: np.ndarray, *extra: np.ndarray) -> list[tuple]:
+            # The flagged cells as (year, region, month, extra values...) tuples
+            index: tuple[np.ndarray, ...] = np.nonzero(mask)
+            return list(zip((index[0] + PrefixSumIndex.FIRST_YEAR).tolist(), index[1].tolist(),
+                            (index[2] + 1).tolist(), *(e[index].tolist() for e in extra)))
+
+        # The strongest outliers first
+        outlier_cells: list[tuple] = sorted(cells(outliers, value, z), key=lambda cell: -abs(cell[4]))
+        return {'malformed': cells(malformed, text), 'missing': cells(missing),
+                'out_of_range': cells(out_of_range, value),
+                'inconsistent': cells(inconsistent, value, normal, deviation), 'outliers': outlier_cells,
+                'duplicates': duplicates, 'regions': [str(region).strip() for region in raw[0, 1:1 + 14 * 3:3, 0]],
+                'time': tim.time() - start}
+
+    @classmethod
+    def report(cls, result: dict, name: str) -> None:
+        """
+        Prints a compact report of one scan, a summary line and a few examples of each problem.
 
-        :return: function
+        :param result: dictionary returned by scan
+        :param name: "temper" or "precip"
+        :return: None
         """
+        labels: dict[str, str] = {'malformed': "chybné buňky", 'missing': "chybějící hodnoty",
+                                  'out_of_range': "mimo rozsah", 'inconsistent': "nesouhlasí s normálem",
+                                  'outliers': "odlehlé hodnoty"}
+        title: str = "teplot" if name == "temper" else "srážek"
+        summary: str = ", ".join(f"{label}: {len(result[key])}" for key, label in labels.items())
+        print(f"Kontrola dat {title} ({result['time'] * 1000:.0f} ms) - {summary}, "
+              f"duplicitní roky: {sum(len(group) for group in result['duplicates'])}")
+        for key, label in labels.items():
+            for cell in result[key][:cls.LISTED]:
+                details: str = ", ".join(str(round(x, 2)) if isinstance(x, float) else repr(x) for x in cell[3:])
+                print(f"  {label}: rok {cell[0]}, {result['regions'][cell[1]]}, měsíc {cell[2]}" +
+                      (f" ({details})" if details else ""))
+            if len(result[key]) > cls.LISTED:
+                print(f"  {label}: ... a dalších {len(result[key]) - cls.LISTED}")
+        for group in result['duplicates']:
+            print(f"  duplicitní roky: {', '.join(map(str, group))}")
+
+
+class PrefixSumIndex:
+    """
+    The PrefixSumIndex class is a summed-area (prefix-sum) index over the year × month × region cube of one
+    weather variable. It keeps running sums of values, squared values and valid counts along the monthly time axis,
+    so the total, mean and variance of any contiguous range of months (or a union of such ranges) are answered
+    in constant time per range without touching the underlying data.
+    """
+    FIRST_YEAR: int = 1961  # the first year of the CHMI data series
 
-        @functools.wraps(func)
-        def wrapper(self, *args: any, **kwargs: any) -> func:
-            """
-            This is a decorator function that wraps around another function passed as an argument.
-            it first executes the original function then it restores the original weather data from the backup.
+    def __init__(self, cube: np.ndarray) -> None:
+        """
+        Builds the index from a numeric cube.
 
-            :param self: The class instance that the decorated function is a method of.
-            :param args: Positional arguments passed to the decorated function.
-            :param kwargs: Keyword arguments passed to the decorated function.
-            :return: The result of the decorated function.
-            """
-            result: func = func(self, *args, **kwargs)
-            if self.temper_choose:
-                self.data["temper"]: xr.DataArray = self.backup_data["temper"].copy()
-            if self.precip_choose:
-                self.data["precip"]: xr.DataArray = self.backup_data["precip"].copy()
-            return result
+        :param cube: 3D numpy array with the shape (years, regions, months)
+        """
+        self.n_years: int
+        self.n_regions: int
+        self.n_months: int
+        self.n_years, self.n_regions, self.n_months = cube.shape
+        # Flatten years and months into one monthly time axis for each region
+        series: np.ndarray = cube.transpose(1, 0, 2).reshape(self.n_regions, -1)
+        valid: np.ndarray = ~np.isnan(series)
+        filled: np.ndarray = np.where(valid, series, 0.)
+
+        # Running sums with a leading zero column, so a range [start, stop) is sums[:, stop] - sums[:, start]
+        self.sums: np.ndarray = np.zeros((self.n_regions, series.shape[1] + 1))
+        self.squares: np.ndarray = np.zeros_like(self.sums)
+        self.counts: np.ndarray = np.zeros_like(self.sums)
+        np.cumsum(filled, axis=1, out=self.sums[:, 1:])
+        np.cumsum(filled ** 2, axis=1, out=self.squares[:, 1:])
+        np.cumsum(valid, axis=1, out=self.counts[:, 1:])
 
-        return wrapper
+    @staticmethod
+    def year_runs(years: list[int]) -> list[tuple[int, int]]:
+        """
+        Splits an ascending list of years into contiguous runs.
 
-    @Utils.debug
-    def plot_3d(self) -> None:
+        :param years: ascending list of years, e.g. the output of UserInterface.parse_date_range
+        :return: list of (first year, last year) tuples, e.g. [(1982, 1982), (1984, 1984), (1986, 1988)]
         """
-        Create and display a 3D plot of temperature or precipitation data for the last 5 years.
+        runs: list[tuple[int, int]] = []
+        for year in years:
+            if runs and year == runs[-1][1] + 1:
+                runs[-1] = (runs[-1][0], year)
+            else:
+                runs.append((year, year))
+        return runs
 
-        :return: None
+    @classmethod
+    def year_index(cls, years: list[int], n_years: int) -> np.ndarray:
         """
-        self.plot_3d_year_region(predef_years=[year for year in range(2018, 2022 + 1)],
-                                 subtitle_part_text="za posledních 5 let",
-                                 regions=[region for region in range(0, 14)])
+        Converts years into the row indices of a yearly archive starting with FIRST_YEAR.
 
-    @Utils.debug
-    def plot_3d_year(self) -> None:
+        :param years: list of years
+        :param n_years: number of years in the archive
+        :return: numpy array of row indices
+        :raises ValueError: if any year is not in the archive
         """
-        Create and display a 3D plot of temperature or precipitation data for a specific year(s).
+        index: np.ndarray = np.asarray(years, dtype=int) - cls.FIRST_YEAR
+        if index.size and (index.min() < 0 or index.max() >= n_years):
+            raise ValueError(f"Roky nejsou v rozsahu {cls.FIRST_YEAR}-{cls.FIRST_YEAR + n_years - 1}")
+        return index
 
-        :return: None
+    def month_bounds(self, first_year: int, last_year: int) -> tuple[int, int]:
         """
-        self.plot_3d_year_region(regions=[region for region in range(0, 14)])
+        Converts an inclusive range of years into a half-open range of indices on the monthly time axis.
 
-    @Utils.debug
-    @reset_data
-    def plot_3d_year_region(self, predef_years: str = None, subtitle_part_text: str = "", regions: str = None) -> None:
+        :param first_year: the first year of the range
+        :param last_year: the last year of the range (inclusive)
+        :return: a tuple (start, stop) of monthly indices
+        :raises ValueError: if the range is not inside the indexed years
         """
-        Create and display a 3D plot of temperature or precipitation data for a specific year(s) and region(s).
+        if first_year < self.FIRST_YEAR or last_year > self.FIRST_YEAR + self.n_years - 1 or first_year > last_year:
+            years: str = str(first_year) if first_year == last_year else f"{first_year}-{last_year}"
+            raise ValueError(f"Roky {years} nejsou v rozsahu "
+                             f"{self.FIRST_YEAR}-{self.FIRST_YEAR + self.n_years - 1}")
+        return (first_year - self.FIRST_YEAR) * self.n_months, (last_year - self.FIRST_YEAR + 1) * self.n_months
+
+    def range_sums(self, starts: Union[int, np.ndarray], stops: Union[int, np.ndarray],
+                   regions: Optional[list[int]] = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns sums of values, squared values and counts for half-open monthly ranges [start, stop).
+        Starts and stops can be arrays, so thousands of windows are evaluated in one vectorized lookup.
 
-        :param predef_years: A list of years to plot, if None it plots all the available years
-        :param subtitle_part_text: A substring for the subtitle
-        :param regions: A list of regions to display
-        :return: None
+        :param starts: start index (or array of indices) on the monthly time axis
+        :param stops: stop index (or array of indices) on the monthly time axis, exclusive
+        :param regions: list of region IDs, if None, all regions are used
+        :return: a tuple (sums, squares, counts), each with the shape (regions, *shape of starts)
         """
-        if regions is None:
-            regions = []
-        if predef_years is None:
-            predef_years = []
+        rows: Union[list[int], slice] = slice(None) if regions is None else regions
+        starts, stops = np.asarray(starts), np.asarray(stops)
+        return (self.sums[rows][:, stops] - self.sums[rows][:, starts],
+                self.squares[rows][:, stops] - self.squares[rows][:, starts],
+                self.counts[rows][:, stops] - self.counts[rows][:, starts])
 
-        def create_3d_plot(name: str, years: list[int] = None, regions: list[int] = None,
-                           subtitle_part_text: str = subtitle_part_text) -> None:
-            """
-            This function creates and displays a 3D plot of temperature or precipitation data for a specific year
-            or years and region(s).
+    @staticmethod
+    def moments(sums: np.ndarray, squares: np.ndarray, counts: np.ndarray) -> dict[str, np.ndarray]:
+        """
+        Converts accumulated sums into totals, means, variances and standard deviations.
 
-            :param name: str, the name of the weather variable ("temper" or "precip")
-            :param years: list[int], optional, list of years to plot, if None, all years will be plotted
-            :param regions: list[int], optional, list of region IDs to plot, if None, all regions will be plotted
-            :param subtitle_part_text: str, optional, text to include in the plot subtitle
-            :return: None
-            """
-            if regions is None:
-                regions = []
-            if years is None:
-                years = []
+        :param sums: sums of values
+        :param squares: sums of squared values
+        :param counts: numbers of valid values
+        :return: a dictionary with keys 'total', 'count', 'mean', 'var' and 'std'
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean: np.ndarray = sums / counts
+            # population variance (ddof=0), the same as np.nanvar used in the plot statistics
+            var: np.ndarray = np.maximum(squares / counts - mean ** 2, 0.)
+        return {"total": sums, "count": counts, "mean": mean, "var": var, "std": np.sqrt(var)}
+
+    def query(self, years: list[int], regions: Optional[list[int]] = None, pooled: bool = False
+              ) -> dict[str, np.ndarray]:
+        """
+        Computes the total, mean and variance over a union of year ranges in constant time per contiguous range.
 
-            def on_key_press(event: mpl.backend_bases.KeyEvent) -> None:
-                """
-                A function that is called when a key is pressed. If the pressed key is 'x', it closes all the figures.
+        :param years: ascending list of years, e.g. [1982, 1984, 1986, 1987, 1988]
+        :param regions: list of region IDs, if None, all regions are used
+        :param pooled: if True, the selected regions are pooled into a single value
+        :return: a dictionary with keys 'total', 'count', 'mean', 'var' and 'std', values per region or pooled
+        """
+        bounds: np.ndarray = np.array([self.month_bounds(first, last) for first, last in self.year_runs(years)])
+        sums: np.ndarray
+        squares: np.ndarray
+        counts: np.ndarray
+        sums, squares, counts = self.range_sums(bounds[:, 0], bounds[:, 1], regions)
+        # Combine the contiguous runs (and optionally the regions) by adding their sums
+        axis: Union[int, tuple[int, int]] = (0, 1) if pooled else 1
+        return self.moments(sums.sum(axis=axis), squares.sum(axis=axis), counts.sum(axis=axis))
+
+    def sweep(self, window: int, step: int = 1, regions: Optional[list[int]] = None) -> dict[str, np.ndarray]:
+        """
+        Evaluates all windows of a given length on the monthly time axis at once.
 
-                :param event: The event object that contains information about the key press.
-                :return: None
-                """
-                if event.key.lower() == 'x':
-                    plt.close('all')
+        :param window: window length in months
+        :param step: shift between two consecutive windows in months
+        :param regions: list of region IDs, if None, all regions are used
+        :return: a dictionary with keys 'total', 'count', 'mean', 'var' and 'std', each (regions, windows)
+        """
+        starts: np.ndarray = np.arange(0, self.sums.shape[1] - window, step)
+        return self.moments(*self.range_sums(starts, starts + window, regions))
 
-            def update(val: Union[float, np.float64]) -> None:
-                """
-                A function that is called when the slider value is changed.
-                It sets the alpha (transparency) of the plot surface.
 
-                :param val: The new value of the slider.
-                :return: None
-                """
-                if len(regions) == 1:
-                    surf[0].set_alpha(val)
-                else:
-                    surf.set_alpha(val)
+class TrendAnalyzer:
+    """
+    The TrendAnalyzer class computes trends of every region × calendar month series of a numeric cube
+    (years, regions, months) in one batched computation: the least-squares (OLS) slope, Sen's slope and
+    the Mann-Kendall test of significance. Missing values (NaN) are left out of every series.
+    """
 
-            def scroll_event(event: mpl.backend_bases.MouseEvent) -> None:
-                """
-                A function that is called when the scroll wheel is used.
-                It increases or decreases the alpha (transparency) of the plot surface.
+    @staticmethod
+    def ols_slope(cube: np.ndarray, years: np.ndarray) -> np.ndarray:
+        """
+        Computes the least-squares slopes of all series along the year axis.
 
-                :param event: The event object that contains information about the scroll event.
-                :return: None
-                """
-                if event.button == 'up':
-                    alpha: float = min(1., pos.val + 0.02)
-                    pos.set_val(alpha)
-                elif event.button == 'down':
-                    alpha: float = max(0., pos.val - 0.02)
-                    pos.set_val(alpha)
+        :param cube: 3D numpy array with the shape (years, regions, months)
+        :param years: 1D numpy array of years belonging to the first axis of the cube
+        :return: 2D numpy array of slopes per year with the shape (regions, months)
+        """
+        valid: np.ndarray = ~np.isnan(cube)
+        x: np.ndarray = np.where(valid, years[:, None, None], 0.)
+        y: np.ndarray = np.where(valid, cube, 0.)
+        n: np.ndarray = valid.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            x_mean: np.ndarray = x.sum(axis=0) / n
+            y_mean: np.ndarray = y.sum(axis=0) / n
+            sxy: np.ndarray = (x * y).sum(axis=0) - n * x_mean * y_mean
+            sxx: np.ndarray = (x * x).sum(axis=0) - n * x_mean ** 2
+            return sxy / sxx
 
-            def rotate_graph(_: mpl.backend_bases.KeyEvent) -> None:
-                """
-                This is a function that rotates the 3D plot view by changing the azimuth and
-                elevation angles of the plot based on keyboard keys.
-                The function also stores the time of the last rotation to avoid updating the plot too frequently.
+    @staticmethod
+    def sen_slope(cube: np.ndarray, years: np.ndarray) -> np.ndarray:
+        """
+        Computes Sen's slopes (medians of the slopes between all pairs of years) of all series at once.
 
-                :param _: Unused argument, required for compatibility with matplotlib callback functions.
-                :return: None
-                """
-                current_time: float = tim.time()
-                if current_time - self.last_time > 0.1:  # 200 ms
-                    if keyboard.is_pressed('right') and keyboard.is_pressed('up'):
-                        ax.view_init(elev=ax.elev - 5, azim=ax.azim - 5)
-                        ax.elev -= 5
-                        ax.azim -= 5
-                    elif keyboard.is_pressed('right') and keyboard.is_pressed('down'):
-                        ax.view_init(elev=ax.elev + 5, azim=ax.azim - 5)
-                        ax.elev += 5
-                        ax.azim -= 5
-                    elif keyboard.is_pressed('right'):
-                        ax.view_init(elev=ax.elev, azim=ax.azim - 5)
-                        ax.azim -= 5
-                    elif keyboard.is_pressed('left') and keyboard.is_pressed('up'):
-                        ax.view_init(elev=ax.elev - 5, azim=ax.azim + 5)
-                        ax.elev -= 5
-                        ax.azim += 5
-                    elif keyboard.is_pressed('left') and keyboard.is_pressed('down'):
-                        ax.view_init(elev=ax.elev + 5, azim=ax.azim + 5)
-                        ax.elev += 5
-                        ax.azim += 5
-                    elif keyboard.is_pressed('left'):
-                        ax.view_init(elev=ax.elev, azim=ax.azim + 5)
-                        ax.azim += 5
-                    elif keyboard.is_pressed('up'):
-                        ax.view_init(elev=ax.elev - 5, azim=ax.azim)
-                        ax.elev -= 5
-                    elif keyboard.is_pressed('down'):
-                        ax.view_init(elev=ax.elev + 5, azim=ax.azim)
-                        ax.elev += 5
-                    fig.canvas.draw()
-                    self.last_time = current_time
+        :param cube: 3D numpy array with the shape (years, regions, months)
+        :param years: 1D numpy array of years belonging to the first axis of the cube
+        :return: 2D numpy array of slopes per year with the shape (regions, months)
+        """
+        i: np.ndarray
+        j: np.ndarray
+        i, j = np.triu_indices(len(years), k=1)
+        slopes: np.ndarray = (cube[j] - cube[i]) / (years[j] - years[i])[:, None, None]
+        with np.errstate(invalid='ignore'):
+            return np.nanmedian(slopes, axis=0)
 
-            def update_text(ax, pos: list[float], text: str, is_temper: bool, bottom: bool) -> None:
-                """
-                Updates text in the given axis.
+    @staticmethod
+    def mann_kendall(cube: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Computes the Mann-Kendall test with the correction for tied values for all series at once.
 
-                :param ax: The axis to update the text in.
+        :param cube: 3D numpy array with the shape (years, regions, months)
+        :return: a tuple (s, z, p) of the test statistic S, its normal score Z and the two-sided p-value,
+                 each with the shape (regions, months)
+        """
+        i: np.ndarray
+        j: np.ndarray
+        i, j = np.triu_indices(cube.shape[0], k=1)
+        with np.errstate(invalid='ignore'):
+            s: np.ndarray = np.nansum(np.sign(cube[j] - cube[i]), axis=0)
+        n: np.ndarray = (~np.isnan(cube)).sum(axis=0)
+        # Size of the group of tied values for every value, a group of t values contributes t(t-1)(2t+5)
+        ties: np.ndarray = (cube[:, None] == cube[None, :]).sum(axis=1)
+        tie_term: np.ndarray = np.where(np.isnan(cube), 0, (ties - 1) * (2 * ties + 5)).sum(axis=0)
+        var_s: np.ndarray = (n * (n - 1) * (2 * n + 5) - tie_term) / 18.
+        with np.errstate(invalid='ignore', divide='ignore'):
+            z: np.ndarray = np.where(var_s > 0, (s - np.sign(s)) / np.sqrt(var_s), 0.)
+        p: np.ndarray = 2 * norm.sf(np.abs(z))
+        return s, z, p
+
+    @staticmethod
+    def analyze(cube: np.ndarray, years: list[int]) -> dict[str, np.ndarray]:
+        """
+        Computes all trend statistics of the given cube.
+
+        :param cube: 3D numpy array with the shape (years, regions, months)
+        :param years: list of years belonging to the first axis of the cube
+        :return: a dictionary with keys 'ols', 'sen' (slopes per year), 's', 'z' and 'p' (Mann-Kendall test)
+        """
+        years_arr: np.ndarray = np.asarray(years, dtype=float)
+        s: np.ndarray
+        z: np.ndarray
+        p: np.ndarray
+        s, z, p = TrendAnalyzer.mann_kendall(cube)
+        return {"ols": TrendAnalyzer.ols_slope(cube, years_arr), "sen": TrendAnalyzer.sen_slope(cube, years_arr),
+                "s": s, "z": z, "p": p}
+
+
+class Bootstrap:
+    """
+    The Bootstrap class computes bootstrap confidence intervals of the statistics shown in the plot overlays.
+    Resamples are drawn as index matrices and all statistics are evaluated for all resamples in vectorized form,
+    the resamples are processed in chunks to keep the memory bounded. More series (e.g. regions) can be
+    spread across a process pool.
+    The cost grows with resamples × values, so large samples (e.g. all regions over the whole history, about 10k
+    values) use fewer resamples, but never less than MIN_RESAMPLES, which is enough for 95% percentile intervals.
+    This keeps the intervals of any selection within about a second, the number of resamples actually used is
+    returned with the intervals.
+    """
+    RESAMPLES: int = 10000  # default number of bootstrap resamples
+    MIN_RESAMPLES: int = 2000  # the smallest number of resamples used for large samples
+    WORK_LIMIT: int = 2 ** 24  # number of drawn values above which the resamples are reduced
+    CONFIDENCE: float = 0.95  # default confidence level
+    CHUNK_SIZE: int = 2 ** 22  # maximal number of resampled values held in memory at once
+    # Statistics evaluated for every resample
+    STATISTICS: tuple[str, ...] = ("min", "max", "mean", "hmean", "gmean", "q1", "median", "q3", "var", "std", "skew",
+                                   "kurtosis")
+
+    def __init__(self, resamples: int = RESAMPLES, confidence: float = CONFIDENCE, seed: Optional[int] = 0) -> None:
+        self.resamples: int = resamples
+        self.confidence: float = confidence
+        self.seed: Optional[int] = seed
+
+    @staticmethod
+    def statistics(counts: np.ndarray, values: np.ndarray) -> dict[str, np.ndarray]:
+        """
+        Computes the overlay statistics of many resamples at once. Every resample is described by the counts of
+        the (sorted) original values in it, so moments are matrix products and quantiles are found on cumulative
+        counts without sorting the resamples.
+
+        :param counts: 2D numpy array with the shape (resamples, values), how many times each value was drawn
+        :param values: 1D numpy array of ascending values
+        :return: a dictionary of 1D arrays with keys 'min', 'max', 'mean', 'hmean', 'gmean', 'q1', 'median', 'q3',
+                 'var', 'std', 'skew' and 'kurtosis'
+        """
+        n: int = len(values)
+        # Raw moments of the values shifted by their mean (to avoid cancellation) and the sums of reciprocals and
+        # logarithms, all in one matrix product
+        shift: float = float(values.mean())
+        shifted: np.ndarray = values - shift
+        with np.errstate(invalid='ignore', divide='ignore'):
+            columns: np.ndarray = np.stack([shifted, shifted ** 2, shifted ** 3, shifted ** 4, 1 / values,
+                                            np.log(values)], axis=1)
+            e1, e2, e3, e4, reciprocal, logarithm = (counts @ columns).T
+        e1, e2, e3, e4 = e1 / n, e2 / n, e3 / n, e4 / n
+        # Central moments of every resample
+        m2: np.ndarray = e2 - e1 ** 2
+        m3: np.ndarray = e3 - 3 * e1 * e2 + 2 * e1 ** 3
+        m4: np.ndarray = e4 - 4 * e1 * e3 + 6 * e1 ** 2 * e2 - 3 * e1 ** 4
+
+        # Quantiles with linear interpolation (the numpy default): the k-th smallest element of a resample is the
+        # first value whose cumulative count exceeds k. The rows of cumulative counts are shifted apart, so one
+        # binary search over the flattened matrix finds the element in all resamples at once.
+        size: int = len(counts)
+        offsets: np.ndarray = np.arange(size) * (n + 1)
+        cumulative: np.ndarray = (np.cumsum(counts, axis=1) + offsets[:, None]).ravel()
+
+        def smallest(k: float) -> np.ndarray:
+            # The k-th smallest value (from 0) of every resample
+            return values[np.searchsorted(cumulative, offsets + k, side='right') - np.arange(size) * n]
+
+        quartiles: list[np.ndarray] = []
+        for q in (0.25, 0.5, 0.75):
+            position: float = (n - 1) * q
+            low: np.ndarray = smallest(np.floor(position))
+            high: np.ndarray = smallest(min(np.floor(position) + 1, n - 1))
+            quartiles.append(low + (position - np.floor(position)) * (high - low))
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return {"min": smallest(0), "max": smallest(n - 1),
+                    "mean": e1 + shift, "hmean": n / reciprocal,
+                    "gmean": np.exp(logarithm / n),
+                    "q1": quartiles[0], "median": quartiles[1], "q3": quartiles[2],
+                    "var": m2, "std": np.sqrt(np.maximum(m2, 0)),
+                    # biased estimators, the same as scipy.stats.skew and scipy.stats.kurtosis (Fisher) defaults
+                    "skew": m3 / m2 ** 1.5, "kurtosis": m4 / m2 ** 2 - 3}
+
+    def resample(self, values: np.ndarray) -> dict[str, np.ndarray]:
+        """
+        Evaluates the statistics for all bootstrap resamples of the given values, large samples use fewer
+        resamples (see WORK_LIMIT).
+
+        :param values: numpy array of values, it is flattened and the missing values are left out
+        :return: a dictionary of 1D arrays with the statistics of every resample, empty without any valid value
+        """
+        values = np.asarray(values, dtype=float).ravel()
+        values = np.sort(values[np.isfinite(values)])
+        n: int = len(values)
+        if n == 0:
+            # e.g. a year that has not been published yet
+            return {key: np.empty(0) for key in self.STATISTICS}
+        rng: np.random.Generator = np.random.default_rng(self.seed)
+        resamples: int = min(self.resamples, max(self.MIN_RESAMPLES, self.WORK_LIMIT // n))
+        chunk: int = max(1, self.CHUNK_SIZE // n)
+        parts: list[dict[str, np.ndarray]] = []
+        for start in range(0, resamples, chunk):
+            size: int = min(chunk, resamples - start)
+            # Index matrix of one chunk of resamples, every row is one resample with replacement
+            idx: np.ndarray = rng.integers(0, n, size=(size, n))
+            # Counts of every value in every resample (one bincount over the whole matrix)
+            counts: np.ndarray = np.bincount((idx + n * np.arange(size)[:, None]).ravel(),
+                                             minlength=size * n).reshape(size, n).astype(float)
+            parts.append(self.statistics(counts, values))
+        return {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+
+    def confidence_intervals(self, values: np.ndarray) -> dict[str, Union[tuple[float, float], int]]:
+        """
+        Computes percentile bootstrap confidence intervals of the overlay statistics.
+
+        :param values: numpy array of values, it is flattened
+        :return: a dictionary with the same keys as statistics() and (lower, upper) bounds as values (NaN without
+                 any valid value) and the number of used resamples under the key 'resamples'
+        """
+        alpha: float = (1 - self.confidence) / 2
+        resampled: dict[str, np.ndarray] = self.resample(values)
+        result: dict[str, Union[tuple[float, float], int]] = {"resamples": len(resampled["mean"])}
+        for key, stats in resampled.items():
+            finite: np.ndarray = stats[np.isfinite(stats)]
+            lower: float
+            upper: float
+            lower, upper = np.quantile(finite, [alpha, 1 - alpha]) if len(finite) else (np.nan, np.nan)
+            result[key] = (float(lower), float(upper))
+        return result
+
+    def confidence_intervals_many(self, series: list[np.ndarray], parallel: bool = False
+                                  ) -> list[dict[str, Union[tuple[float, float], int]]]:
+        """
+        Computes confidence intervals for more series (e.g. one per region), optionally in a process pool.
+
+        :param series: list of numpy arrays of values
+        :param parallel: Flag whether to spread the series across a process pool or not.
+        :return: list of dictionaries returned by confidence_intervals(), in the order of the series
+        """
+        if parallel and len(series) > 1:
+            with concurrent.futures.ProcessPoolExecutor() as executor:
+                return list(executor.map(self.confidence_intervals, series))
+        return [self.confidence_intervals(values) for values in series]
+
+
+class SpectralAnalyzer:
+    """
+    The SpectralAnalyzer class performs the discrete cosine transform (DCT) of whole blocks of series
+    (e.g. regions × months) in one multithreaded scipy.fft call along the last axis and caches the spectra
+    of already transformed selections.
+    """
+    WORKERS: int = os.cpu_count() or 1  # number of threads used by scipy.fft
+
+    def __init__(self, workers: int = WORKERS) -> None:
+        self.workers: int = workers
+        self.cache: dict[tuple, np.ndarray] = {}
+
+    def dct(self, block: np.ndarray) -> np.ndarray:
+        """
+        Computes the orthonormal DCT-II of every row of the block in one call.
+
+        :param block: numpy array, the transform runs along the last axis
+        :return: numpy array of DCT coefficients with the same shape
+        """
+        return dct(block, type=2, norm='ortho', axis=-1, workers=self.workers)
+
+    def cached_dct(self, key: tuple, block: Callable[[], np.ndarray]) -> np.ndarray:
+        """
+        Returns the cached spectrum for the given key, the block is built and transformed only on a cache miss.
+
+        :param key: hashable description of the selection, e.g. (name, years)
+        :param block: function returning the block to transform
+        :return: numpy array of DCT coefficients
+        """
+        if key not in self.cache:
+            self.cache[key] = self.dct(block())
+        return self.cache[key]
+
+    def denoise(self, block: np.ndarray, keep: int, low_pass: bool = True) -> np.ndarray:
+        """
+        Smooths every row of the block by keeping only some of its DCT coefficients and reconstructing it by
+        the inverse DCT, both transforms run on the whole block in one batched call.
+
+        :param block: 2D numpy array with the shape (series, time)
+        :param keep: number of kept coefficients of every series
+        :param low_pass: if True, the lowest frequencies are kept, otherwise the largest coefficients (top-k)
+        :return: numpy array of reconstructed series with the same shape as the block
+        """
+        coefficients: np.ndarray = self.dct(block)
+        mask: np.ndarray = np.zeros(coefficients.shape, dtype=bool)
+        if low_pass:
+            mask[..., :keep] = True
+        else:
+            # Indices of the k largest coefficients of every series
+            top: np.ndarray = np.argpartition(np.abs(coefficients), -keep, axis=-1)[..., -keep:]
+            np.put_along_axis(mask, top, True, axis=-1)
+        return idct(np.where(mask, coefficients, 0.), type=2, norm='ortho', axis=-1, workers=self.workers)
+
+    @staticmethod
+    def fingerprint(cube: np.ndarray) -> str:
+        """
+        Returns a fingerprint of the numeric data, so stored spectra of different data are not served.
+
+        :param cube: numpy array of the data
+        :return: hexadecimal SHA-1 digest of the shape and the values
+        """
+        return hashlib.sha1(str(cube.shape).encode() + np.ascontiguousarray(cube).tobytes()).hexdigest()
+
+    def precompute(self, name: str, windows: dict[str, list[int]], block: Callable[[list[int]], np.ndarray]
+                   ) -> None:
+        """
+        Fills the cache with spectra of the given standard windows of years.
+
+        :param name: str, the name of the weather variable ("temper" or "precip")
+        :param windows: dictionary of window labels and lists of years
+        :param block: function returning the block (regions × months) of the given years
+        :return: None
+        """
+        for years in windows.values():
+            self.cached_dct((name, tuple(years)), lambda: block(years))
+
+    def save(self, path: str, name: str, windows: dict[str, list[int]], fingerprint: str) -> None:
+        """
+        Saves the cached spectra of the standard windows into a NumPy .npz file.
+
+        :param path: path to the .npz file
+        :param name: str, the name of the weather variable ("temper" or "precip")
+        :param windows: dictionary of window labels and lists of years
+        :param fingerprint: fingerprint of the data the spectra were computed from
+        :return: None
+        """
+        arrays: dict[str, np.ndarray] = {"fingerprint": np.array(fingerprint)}
+        for i, years in enumerate(windows.values()):
+            arrays[f"years_{i}"] = np.array(years)
+            arrays[f"dct_{i}"] = self.cache[(name, tuple(years))]
+        np.savez(path, **arrays)
+
+    def load(self, path: str, name: str, fingerprint: str) -> bool:
+        """
+        Loads stored spectra into the cache if they were computed from the same data.
+
+        :param path: path to the .npz file
+        :param name: str, the name of the weather variable ("temper" or "precip")
+        :param fingerprint: fingerprint of the current data
+        :return: True if the spectra were loaded, False otherwise
+        """
+        try:
+            with np.load(path) as stored:
+                if str(stored["fingerprint"]) != fingerprint:
+                    return False
+                for key in stored.files:
+                    if key.startswith("years_"):
+                        self.cache[(name, tuple(stored[key].tolist()))] = stored["dct_" + key[len("years_"):]]
+        except (FileNotFoundError, OSError, KeyError, ValueError):
+            return False
+        return True
+
+    @staticmethod
+    def psd(block: np.ndarray, segment: Optional[int] = None, overlap: Optional[int] = None, fs: float = 12.
+            ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Estimates the power spectral density of every row of the block at once, by Welch's method when a segment
+        length is given, otherwise by the periodogram. The mean (and linear trend for Welch) is removed.
+
+        :param block: 2D numpy array with the shape (series, time)
+        :param segment: segment length in samples for Welch's method, None for the periodogram
+        :param overlap: overlap of the segments in samples, if None, half of the segment is used
+        :param fs: sampling frequency, 12 samples per year gives frequencies in cycles per year
+        :return: a tuple (frequencies, densities) where densities have the shape (series, frequencies)
+        """
+        if segment is None:
+            return periodogram(block, fs=fs, detrend='constant', axis=-1)
+        return welch(block, fs=fs, nperseg=segment, noverlap=overlap, detrend='linear', axis=-1)
+
+    @staticmethod
+    def cycle_power(freq: np.ndarray, density: np.ndarray, cycles: tuple[float, ...] = (1., 2.)) -> np.ndarray:
+        """
+        Returns the spectral density at the frequencies nearest to the given cycles per year
+        (by default the annual and semiannual cycle).
+
+        :param freq: 1D numpy array of frequencies in cycles per year
+        :param density: 2D numpy array of densities with the shape (series, frequencies)
+        :param cycles: cycles per year to look up
+        :return: 2D numpy array with the shape (series, cycles)
+        """
+        return density[:, [int(np.abs(freq - cycle).argmin()) for cycle in cycles]]
+
+    def spectrogram(self, series: np.ndarray, window: int, step: int = 1) -> np.ndarray:
+        """
+        Computes the sliding-window DCT of every series. The windows are strided views of the series (no copies)
+        and all windows of all series are transformed in one batched call.
+
+        :param series: 2D numpy array with the shape (series, time)
+        :param window: window length in samples
+        :param step: shift between two consecutive windows in samples
+        :return: 3D numpy array of DCT coefficients with the shape (series, windows, window)
+        """
+        windows: np.ndarray = np.lib.stride_tricks.sliding_window_view(series, window, axis=-1)[:, ::step]
+        return self.dct(windows)
+
+
+class CorrelationAnalyzer:
+    """
+    The CorrelationAnalyzer class computes correlations between many series at once with matrix operations
+    and orders them by hierarchical clustering.
+    """
+
+    @staticmethod
+    def pearson(block: np.ndarray) -> np.ndarray:
+        """
+        Computes the Pearson correlation matrix of all rows of the block in one matrix product.
+
+        :param block: 2D numpy array with the shape (series, samples)
+        :return: 2D numpy array with the shape (series, series)
+        """
+        centered: np.ndarray = block - block.mean(axis=1, keepdims=True)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            normalized: np.ndarray = centered / np.sqrt((centered ** 2).sum(axis=1, keepdims=True))
+        return np.clip(normalized @ normalized.T, -1., 1.)
+
+    @staticmethod
+    def spearman(block: np.ndarray) -> np.ndarray:
+        """
+        Computes the Spearman rank correlation matrix of all rows of the block.
+
+        :param block: 2D numpy array with the shape (series, samples)
+        :return: 2D numpy array with the shape (series, series)
+        """
+        return CorrelationAnalyzer.pearson(rankdata(block, axis=1))
+
+    @staticmethod
+    def hierarchical_order(corr: np.ndarray) -> np.ndarray:
+        """
+        Orders the series so that similar series (distance 1 - r, average linkage) are next to each other.
+
+        :param corr: 2D numpy array of correlations with the shape (series, series)
+        :return: 1D numpy array of indices of the series in the new order
+        """
+        if len(corr) < 3:
+            return np.arange(len(corr))
+        return leaves_list(CorrelationAnalyzer.correlation_linkage(corr))
+
+    @staticmethod
+    def correlation_linkage(corr: np.ndarray) -> np.ndarray:
+        """
+        Computes the average-linkage hierarchical clustering of the series with the distance 1 - r.
+
+        :param corr: 2D numpy array of correlations with the shape (series, series)
+        :return: linkage matrix in the format of scipy.cluster.hierarchy
+        """
+        distance: np.ndarray = np.nan_to_num(1. - corr, nan=1.)
+        np.fill_diagonal(distance, 0.)
+        return linkage(squareform((distance + distance.T) / 2, checks=False), method='average')
+
+    @staticmethod
+    def clusters(corr: np.ndarray, count: int) -> np.ndarray:
+        """
+        Splits the series into the given number of clusters of mutually correlated series.
+
+        :param corr: 2D numpy array of correlations with the shape (series, series)
+        :param count: number of clusters
+        :return: 1D numpy array of cluster labels (1 to count) of the series
+        """
+        if len(corr) < 2:
+            return np.ones(len(corr), dtype=int)
+        return fcluster(CorrelationAnalyzer.correlation_linkage(corr), count, criterion='maxclust')
+
+    @staticmethod
+    def linregress(x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Computes least-squares regressions of y on x for any number of series pairs at once with closed-form
+        formulas, the arrays are broadcast against each other and the regression runs along the last axis.
+        Pairs of values with a missing value (NaN) are left out.
+
+        :param x: numpy array of independent values, e.g. with the shape (pairs, samples)
+        :param y: numpy array of dependent values, broadcastable with x
+        :return: a tuple (slope, intercept, r, p-value, standard error of the slope) like scipy.stats.linregress,
+                 each with the broadcast shape without the last axis
+        """
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+        valid: np.ndarray = ~(np.isnan(x) | np.isnan(y))
+        n: np.ndarray = valid.sum(axis=-1)
+        x = np.where(valid, x, 0.)
+        y = np.where(valid, y, 0.)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            x_mean: np.ndarray = x.sum(axis=-1) / n
+            y_mean: np.ndarray = y.sum(axis=-1) / n
+            # Centered sums of squares and products (the missing values contribute zero)
+            x_centered: np.ndarray = np.where(valid, x - x_mean[..., None], 0.)
+            y_centered: np.ndarray = np.where(valid, y - y_mean[..., None], 0.)
+            sxx: np.ndarray = (x_centered ** 2).sum(axis=-1)
+            syy: np.ndarray = (y_centered ** 2).sum(axis=-1)
+            sxy: np.ndarray = (x_centered * y_centered).sum(axis=-1)
+            slope: np.ndarray = sxy / sxx
+            intercept: np.ndarray = y_mean - slope * x_mean
+            r: np.ndarray = np.clip(sxy / np.sqrt(sxx * syy), -1., 1.)
+            df: np.ndarray = n - 2
+            t_stat: np.ndarray = r * np.sqrt(df / ((1. - r) * (1. + r)))
+            p_value: np.ndarray = 2 * student_t.sf(np.abs(t_stat), df)
+            std_err: np.ndarray = np.sqrt((1 - r ** 2) * syy / sxx / df)
+        return slope, intercept, r, p_value, std_err
+
+    @staticmethod
+    def lagged(x: np.ndarray, y: np.ndarray, max_lag: int, workers: int = SpectralAnalyzer.WORKERS
+               ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Computes cross-correlations of every pair of rows of x and y for lags -max_lag..max_lag with FFTs,
+        all rows at once. A positive lag means that y follows x.
+
+        :param x: 2D numpy array with the shape (series, time)
+        :param y: 2D numpy array with the same shape as x
+        :param max_lag: the largest lag in samples
+        :param workers: number of threads used by scipy.fft
+        :return: a tuple (lags, correlations) where correlations have the shape (series, 2 * max_lag + 1)
+        """
+        length: int = x.shape[-1]
+        # Standardized series, so the zero lag gives the Pearson correlation
+        x = (x - x.mean(axis=-1, keepdims=True)) / x.std(axis=-1, keepdims=True)
+        y = (y - y.mean(axis=-1, keepdims=True)) / y.std(axis=-1, keepdims=True)
+        # Zero padding to avoid circular wrap-around, sum_t x[t] * y[t + k] is the inverse FFT of conj(X) * Y
+        size: int = next_fast_len(2 * length - 1, real=True)
+        spectrum: np.ndarray = np.conj(rfft(x, n=size, axis=-1, workers=workers)) * rfft(y, n=size, axis=-1,
+                                                                                         workers=workers)
+        circular: np.ndarray = irfft(spectrum, n=size, axis=-1, workers=workers) / length
+        lags: np.ndarray = np.arange(-max_lag, max_lag + 1)
+        return lags, circular[..., lags % size]
+
+
+class EOFAnalyzer:
+    """
+    Class EOFAnalyzer decomposes region × time anomaly matrices into empirical orthogonal functions (EOF, i.e.
+    the principal components) with the singular value decomposition.
+    Matrices of the same shape, e.g. temperature and precipitation, are decomposed together in one batched SVD.
+    """
+
+    @staticmethod
+    def decompose(block: np.ndarray, standardize: bool = False) -> dict[str, np.ndarray]:
+        """
+        Computes the EOF analysis of one or more anomaly matrices.
+
+        :param block: numpy array with the shape (..., regions, time) without missing values
+        :param standardize: if True, every region is scaled to unit variance (correlation-based EOF)
+        :return: a dictionary with keys 'loadings' (..., regions, modes) in the units of the data (or correlations),
+                 'pcs' (..., modes, time) with unit variance, 'explained' (..., modes) as a fraction of the total
+                 variance and 'singular' (..., modes)
+        """
+        centered: np.ndarray = block - block.mean(axis=-1, keepdims=True)
+        if standardize:
+            centered = centered / centered.std(axis=-1, ddof=1, keepdims=True)
+        u: np.ndarray
+        s: np.ndarray
+        vt: np.ndarray
+        u, s, vt = np.linalg.svd(centered, full_matrices=False)
+        # The sign of every mode is arbitrary, so the loadings are flipped to have a positive sum
+        sign: np.ndarray = np.where(u.sum(axis=-2) < 0, -1., 1.)
+        u = u * sign[..., None, :]
+        vt = vt * sign[..., :, None]
+        scale: float = np.sqrt(block.shape[-1] - 1)
+        return {"loadings": u * (s[..., None, :] / scale), "pcs": vt * scale,
+                "explained": s ** 2 / (s ** 2).sum(axis=-1, keepdims=True), "singular": s}
+
+
+class ExtremeValueAnalyzer:
+    """
+    Class ExtremeValueAnalyzer fits extreme-value distributions to all regions at once: the generalized extreme
+    value distribution (GEV) to annual maxima (block maxima) and the generalized Pareto distribution (GPD)
+    to the exceedances over a high threshold (peaks over threshold).
+    The parameters are estimated by the method of L-moments (Hosking), which is vectorized across regions,
+    optionally the GEV is refined by the maximum likelihood in a process pool.
+    The shape parameter k follows Hosking's convention (k > 0 means an upper bound, k < 0 a heavy tail).
+    """
+
+    PERIODS: tuple[int, ...] = (10, 50, 100)  # default return periods in years
+    THRESHOLD: float = 0.95  # default quantile of the threshold for peaks over threshold
+
+    @staticmethod
+    def lmoments(samples: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Computes the first three sample L-moments of every row from the probability-weighted moments.
+
+        :param samples: 2D numpy array with the shape (series, values), missing values are NaN
+        :return: a tuple (l1, l2, l3), each with the shape (series,)
+        """
+        ordered: np.ndarray = np.sort(samples, axis=1)  # NaN are sorted to the end
+        n: np.ndarray = np.isfinite(ordered).sum(axis=1, keepdims=True).astype(float)
+        j: np.ndarray = np.arange(ordered.shape[1])[None, :].astype(float)  # rank - 1
+        values: np.ndarray = np.nan_to_num(ordered)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            b0: np.ndarray = values.sum(axis=1) / n[:, 0]
+            b1: np.ndarray = (values * j / (n - 1)).sum(axis=1) / n[:, 0]
+            b2: np.ndarray = (values * j * (j - 1) / ((n - 1) * (n - 2))).sum(axis=1) / n[:, 0]
+        return b0, 2 * b1 - b0, 6 * b2 - 6 * b1 + b0
+
+    @staticmethod
+    def fit_gev(maxima: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Fits the GEV distribution to the block maxima of every row by the method of L-moments.
+
+        :param maxima: 2D numpy array with the shape (series, blocks), missing values are NaN
+        :return: a tuple (location, scale, shape k), each with the shape (series,)
+        """
+        l1: np.ndarray
+        l2: np.ndarray
+        l3: np.ndarray
+        l1, l2, l3 = ExtremeValueAnalyzer.lmoments(maxima)
+        c: np.ndarray = 2 / (3 + l3 / l2) - np.log(2) / np.log(3)
+        k: np.ndarray = 7.8590 * c + 2.9554 * c ** 2
+        # Gumbel limit for k -> 0
+        small: np.ndarray = np.abs(k) < 1e-6
+        safe_k: np.ndarray = np.where(small, 1., k)
+        scale: np.ndarray = np.where(small, l2 / np.log(2), l2 * safe_k / ((1 - 2 ** -safe_k) * gamma(1 + safe_k)))
+        location: np.ndarray = np.where(small, l1 - np.euler_gamma * scale,
+                                        l1 - scale * (1 - gamma(1 + safe_k)) / safe_k)
+        return location, scale, k
+
+    @staticmethod
+    def fit_gpd(exceedances: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Fits the GPD distribution to the exceedances over the threshold of every row by the method of L-moments.
+
+        :param exceedances: 2D numpy array with the shape (series, values) of values minus the threshold,
+                            missing values are NaN
+        :return: a tuple (scale, shape k), each with the shape (series,)
+        """
+        l1: np.ndarray
+        l2: np.ndarray
+        l1, l2, _ = ExtremeValueAnalyzer.lmoments(exceedances)
+        k: np.ndarray = l1 / l2 - 2
+        return (1 + k) * l1, k
+
+    @staticmethod
+    def fit_gev_mle(maxima: np.ndarray) -> tuple[float, float, float]:
+        """
+        Fits the GEV distribution to the block maxima of one series by the maximum likelihood.
+
+        :param maxima: 1D numpy array of block maxima, missing values are NaN
+        :return: a tuple (location, scale, shape k)
+        """
+        values: np.ndarray = maxima[np.isfinite(maxima)]
+        # The scipy shape parameter c has the same sign convention as Hosking's k
+        c: float
+        location: float
+        scale: float
+        c, location, scale = genextreme.fit(values)
+        return location, scale, c
+
+    @staticmethod
+    def fit_gev_mle_many(maxima: np.ndarray, parallel: bool = False) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Fits the GEV distribution by the maximum likelihood to every row, optionally in a process pool.
+
+        :param maxima: 2D numpy array with the shape (series, blocks), missing values are NaN
+        :param parallel: Flag whether to spread the series across a process pool or not.
+        :return: a tuple (location, scale, shape k), each with the shape (series,)
+        """
+        if parallel and len(maxima) > 1:
+            with concurrent.futures.ProcessPoolExecutor() as executor:
+                fits: list[tuple[float, float, float]] = list(executor.map(ExtremeValueAnalyzer.fit_gev_mle,
+                                                                           maxima))
+        else:
+            fits = [ExtremeValueAnalyzer.fit_gev_mle(row) for row in maxima]
+        return tuple(np.array(params) for params in zip(*fits))
+
+    @staticmethod
+    def gev_levels(location: np.ndarray, scale: np.ndarray, k: np.ndarray, periods: np.ndarray) -> np.ndarray:
+        """
+        Computes the GEV return levels, i.e. the values exceeded on average once per the return period.
+
+        :param location: location parameters with the shape (series,)
+        :param scale: scale parameters with the shape (series,)
+        :param k: shape parameters with the shape (series,)
+        :param periods: return periods in blocks (years)
+        :return: 2D numpy array with the shape (series, periods)
+        """
+        y: np.ndarray = -np.log(-np.log(1 - 1 / np.asarray(periods, dtype=float)))  # Gumbel reduced variate
+        k = k[:, None]
+        small: np.ndarray = np.abs(k) < 1e-6
+        safe_k: np.ndarray = np.where(small, 1., k)
+        return location[:, None] + scale[:, None] * np.where(small, y, (1 - np.exp(-safe_k * y)) / safe_k)
+
+    @staticmethod
+    def gpd_levels(threshold: np.ndarray, scale: np.ndarray, k: np.ndarray, rate: np.ndarray,
+                   periods: np.ndarray) -> np.ndarray:
+        """
+        Computes the return levels of the peaks over threshold model.
+
+        :param threshold: thresholds with the shape (series,)
+        :param scale: GPD scale parameters with the shape (series,)
+        :param k: GPD shape parameters with the shape (series,)
+        :param rate: average number of exceedances per year with the shape (series,)
+        :param periods: return periods in years
+        :return: 2D numpy array with the shape (series, periods)
+        """
+        y: np.ndarray = np.log(rate[:, None] * np.asarray(periods, dtype=float))
+        k = k[:, None]
+        small: np.ndarray = np.abs(k) < 1e-6
+        safe_k: np.ndarray = np.where(small, 1., k)
+        return threshold[:, None] + scale[:, None] * np.where(small, y, (1 - np.exp(-safe_k * y)) / safe_k)
+
+    @staticmethod
+    def analyze(cube: np.ndarray, periods: tuple[int, ...] = PERIODS, threshold: float = THRESHOLD,
+                mle: bool = False, parallel: bool = False) -> dict[str, np.ndarray]:
+        """
+        Fits the block maxima and the peaks over threshold models to the monthly values of all regions.
+
+        :param cube: numeric cube with the shape (years, regions, months)
+        :param periods: return periods in years
+        :param threshold: quantile of all monthly values of a region used as its threshold
+        :param mle: if True, the GEV is fitted by the maximum likelihood instead of L-moments
+        :param parallel: Flag whether to spread the maximum likelihood fits across a process pool or not.
+        :return: a dictionary with keys 'maxima' (regions, years), 'gev' (location, scale, k), 'gev_levels'
+                 (regions, periods), 'threshold', 'rate', 'gpd' (scale, k) and 'pot_levels' (regions, periods)
+        """
+        # Annual maxima of complete years only, an incomplete year would underestimate its maximum
+        complete: np.ndarray = np.isfinite(cube).all(axis=2)
+        maxima: np.ndarray = np.where(complete, np.nanmax(cube, axis=2), np.nan).T
+        gev: tuple[np.ndarray, np.ndarray, np.ndarray] = (ExtremeValueAnalyzer.fit_gev_mle_many(maxima, parallel)
+                                                          if mle else ExtremeValueAnalyzer.fit_gev(maxima))
+
+        monthly: np.ndarray = cube.transpose(1, 0, 2).reshape(cube.shape[1], -1)
+        limit: np.ndarray = np.nanquantile(monthly, threshold, axis=1)
+        exceedances: np.ndarray = np.where(monthly > limit[:, None], monthly - limit[:, None], np.nan)
+        rate: np.ndarray = np.isfinite(exceedances).sum(axis=1) / (np.isfinite(monthly).sum(axis=1) / 12)
+        gpd: tuple[np.ndarray, np.ndarray] = ExtremeValueAnalyzer.fit_gpd(exceedances)
+        return {"maxima": maxima, "gev": gev, "gev_levels": ExtremeValueAnalyzer.gev_levels(*gev, periods),
+                "threshold": limit, "rate": rate, "gpd": gpd,
+                "pot_levels": ExtremeValueAnalyzer.gpd_levels(limit, *gpd, rate, periods)}
+
+
+class HarmonicModel:
+    """
+    Class HarmonicModel fits the seasonal model of the annual and semiannual harmonics with a linear trend
+        y(t) = c + d * t + a1 * cos(2πt) + b1 * sin(2πt) + a2 * cos(4πt) + b2 * sin(4πt)
+    (t in years) to any number of monthly series in one batched weighted least-squares solve, so the missing
+    months of every series are simply left out of its own normal equations.
+    """
+
+    TERMS: tuple[str, ...] = ("c", "d", "a1", "b1", "a2", "b2")  # names of the coefficients
+
+    @staticmethod
+    def design(time: np.ndarray) -> np.ndarray:
+        """
+        Builds the design matrix of the model.
+
+        :param time: 1D numpy array of times in years (centre of every month)
+        :return: 2D numpy array with the shape (time, terms)
+        """
+        angle: np.ndarray = 2 * np.pi * time
+        return np.stack([np.ones_like(time), time - time.mean(), np.cos(angle), np.sin(angle), np.cos(2 * angle),
+                         np.sin(2 * angle)], axis=1)
+
+    @staticmethod
+    def fit(series: np.ndarray, time: np.ndarray) -> dict[str, np.ndarray]:
+        """
+        Fits the model to all series at once.
+
+        :param series: 2D numpy array with the shape (series, time), missing values are NaN
+        :param time: 1D numpy array of times in years (centre of every month)
+        :return: a dictionary with keys 'coef' (series, terms), 'fitted' and 'residuals' (series, time),
+                 'trend' (per 10 years), 'amplitude' and 'peak' (month index of the maximum) of the annual and
+                 semiannual harmonic (series, 2) and 'r2' (series,)
+        """
+        x: np.ndarray = HarmonicModel.design(time)
+        weights: np.ndarray = np.isfinite(series).astype(float)
+        values: np.ndarray = np.where(weights > 0, series, 0.)
+        # Normal equations (X^T W X) coef = X^T W y of all series solved in one call
+        gram: np.ndarray = np.einsum('st,ti,tj->sij', weights, x, x)
+        coef: np.ndarray = np.linalg.solve(gram, np.einsum('st,ti->si', values, x)[..., None])[..., 0]
+        fitted: np.ndarray = coef @ x.T
+        residuals: np.ndarray = np.where(weights > 0, series - fitted, np.nan)
+        total: np.ndarray = np.nansum((series - np.nanmean(series, axis=1, keepdims=True)) ** 2, axis=1)
+        # a cos(wt) + b sin(wt) = A cos(w (t - t0)), the maximum of the annual cycle is in the month t0 * 12 - 0.5
+        cosine: np.ndarray = coef[:, [2, 4]]
+        sine: np.ndarray = coef[:, [3, 5]]
+        shift: np.ndarray = np.arctan2(sine, cosine) / (2 * np.pi * np.array([1, 2]))
+        return {"coef": coef, "fitted": fitted, "residuals": residuals, "trend": coef[:, 1] * 10,
+                "amplitude": np.hypot(cosine, sine), "peak": np.round(shift * 12 - 0.5).astype(int) % 12,
+                "r2": 1 - np.nansum(residuals ** 2, axis=1) / total}
+
+
+class KernelDensity2D:
+    """
+    Class KernelDensity2D estimates the joint density of two variables with a Gaussian kernel on a regular grid.
+    The points are binned into a 2D histogram and the histogram is convolved with the sampled kernel by FFT,
+    so the cost grows with the size of the grid and not with the number of points.
+    """
+
+    GRID_SIZE: int = 128  # default number of grid points along each axis
+    CUTOFF: float = 4.  # the kernel is truncated at this number of bandwidths
+
+    @staticmethod
+    def estimate(x: np.ndarray, y: np.ndarray, grid_size: int = GRID_SIZE,
+                 bandwidth: Optional[tuple[float, float]] = None) -> dict[str, np.ndarray]:
+        """
+        Computes the binned kernel density estimate of the pairs (x, y), the missing pairs are left out.
+
+        :param x: numpy array of the first variable
+        :param y: numpy array of the second variable with the same shape
+        :param grid_size: number of grid points along each axis
+        :param bandwidth: kernel bandwidths along the axes, if None, Scott's rule is used
+        :return: a dictionary with keys 'x' and 'y' (grid coordinates), 'density' (grid_size, grid_size) indexed
+                 as [y, x] and 'bandwidth'
+        """
+        valid: np.ndarray = np.isfinite(x) & np.isfinite(y)
+        x = x[valid]
+        y = y[valid]
+        if bandwidth is None:
+            # Scott's rule for two dimensions
+            bandwidth = (x.std(ddof=1) * len(x) ** (-1 / 6), y.std(ddof=1) * len(y) ** (-1 / 6))
+        # The grid reaches beyond the data, so the tails of the kernels are not cut off
+        edges: list[np.ndarray] = [np.linspace(values.min() - 3 * width, values.max() + 3 * width, grid_size + 1)
+                                   for values, width in zip((x, y), bandwidth)]
+        histogram: np.ndarray = np.histogram2d(y, x, bins=(edges[1], edges[0]))[0]
+        steps: list[float] = [edge[1] - edge[0] for edge in edges]
+        # Kernel sampled on the same grid step, truncated at CUTOFF bandwidths
+        axes: list[np.ndarray] = []
+        for width, step in zip(bandwidth, steps):
+            half: int = min(grid_size, int(np.ceil(KernelDensity2D.CUTOFF * width / step)))
+            axes.append(np.exp(-0.5 * (np.arange(-half, half + 1) * step / width) ** 2))
+        kernel: np.ndarray = np.outer(axes[1], axes[0])
+        density: np.ndarray = np.clip(fftconvolve(histogram, kernel / kernel.sum(), mode='same'), 0., None)
+        density /= density.sum() * steps[0] * steps[1]
+        return {"x": (edges[0][:-1] + edges[0][1:]) / 2, "y": (edges[1][:-1] + edges[1][1:]) / 2,
+                "density": density, "bandwidth": np.asarray(bandwidth)}
+
+
+class AnomalyLayers:
+    """
+    Class AnomalyLayers keeps the value, normal and deviation rows published by CHMI as numeric cubes
+    (years, regions, months) and precomputes the anomalies, so anomaly queries are only array lookups.
+    The precomputed layers are the difference between the value and the published normal and the z-scores
+    against the climate normals of the standard reference periods.
+    """
+
+    BASELINES: dict[str, tuple[int, int]] = {"1961-1990": (1961, 1990), "1991-2020": (1991, 2020)}
+
+    def __init__(self, value: np.ndarray, normal: np.ndarray, deviation: np.ndarray) -> None:
+        """
+        Precomputes all anomaly layers of one weather variable.
+
+        :param value: numeric cube of the measured values with the shape (years, regions, months)
+        :param normal: numeric cube of the published normals with the same shape
+        :param deviation: numeric cube of the published deviations (°C for temperature, % of the normal
+                          for precipitation) with the same shape
+        """
+        self.layers: dict[str, np.ndarray] = {"value": value, "normal": normal, "deviation": deviation,
+                                              "diff": value - normal}
+        # Mean and standard deviation of every region × calendar month over the reference periods
+        self.climatology: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        for baseline, (first, last) in self.BASELINES.items():
+            block: np.ndarray = value[first - PrefixSumIndex.FIRST_YEAR:last - PrefixSumIndex.FIRST_YEAR + 1]
+            # The reference period has to be complete, e.g. 1991-2020 is not available for shorter archives
+            if len(block) < last - first + 1:
+                continue
+            mean: np.ndarray = np.nanmean(block, axis=0)
+            std: np.ndarray = np.nanstd(block, axis=0, ddof=1)
+            self.climatology[baseline] = (mean, std)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                self.layers["z_" + baseline] = np.where(std > 0, (value - mean) / std, np.nan)
+
+    def query(self, layer: str, years: list[int], regions: Optional[list[int]] = None) -> np.ndarray:
+        """
+        Returns the given layer for the chosen years and regions.
+
+        :param layer: 'value', 'normal', 'deviation', 'diff' or 'z_<baseline>', e.g. 'z_1991-2020'
+        :param years: list of years
+        :param regions: list of region IDs, if None, all regions are used
+        :return: 3D numpy array with the shape (years, regions, months)
+        :raises ValueError: if any year is not in the archive
+        """
+        if layer not in self.layers:
+            raise KeyError(f"Neznámá vrstva odchylek: {layer}")
+        block: np.ndarray = self.layers[layer][PrefixSumIndex.year_index(years, len(self.layers[layer]))]
+        return block if regions is None else block[:, regions, :]
+
+
+class AggregatePyramid:
+    """
+    Class AggregatePyramid precomputes a multi-resolution pyramid of one weather variable: monthly values,
+    seasonal (DJF, MAM, JJA, SON), annual and decadal means and sums of every region.
+    Plots pick the finest level that still fits into a limited number of points, so long ranges
+    are drawn from a few aggregates instead of hundreds of months.
+    """
+
+    LEVELS: tuple[str, ...] = ("month", "season", "year", "decade")  # from the finest to the coarsest level
+    SPANS: dict[str, int] = {"month": 1, "season": 1, "year": 1, "decade": 10}  # years covered by one key
+    MAX_POINTS: int = 200  # maximal number of points per region drawn by a plot
+
+    def __init__(self, cube: np.ndarray) -> None:
+        """
+        Builds all levels of the pyramid at once.
+
+        :param cube: numeric cube with the shape (years, regions, months)
+        """
+        n_years: int = cube.shape[0]
+        n_regions: int = cube.shape[1]
+        years: np.ndarray = PrefixSumIndex.FIRST_YEAR + np.arange(n_years)
+        monthly: np.ndarray = cube.transpose(1, 0, 2).reshape(n_regions, -1)
+        # Every level holds the key year, the centre of the period in years and the (regions, points) aggregates
+        self.levels: dict[str, dict[str, np.ndarray]] = {
+            "month": {"year": np.repeat(years, 12), "time": (years[:, None] + (np.arange(12) + 0.5) / 12).ravel(),
+                      "mean": monthly, "sum": monthly}}
+
+        # Meteorological seasons, the winter DJF starts with the December of the previous year
+        shifted: np.ndarray = np.concatenate([np.full((n_regions, 1), np.nan), monthly[:, :-1]], axis=1)
+        seasons: np.ndarray = shifted.reshape(n_regions, n_years, 4, 3)
+        self.levels["season"] = {"year": np.repeat(years, 4),
+                                 "time": (years[:, None] + (3 * np.arange(4) + 0.5) / 12).ravel(),
+                                 "mean": seasons.mean(axis=3).reshape(n_regions, -1),
+                                 "sum": seasons.sum(axis=3).reshape(n_regions, -1)}
+
+        annual: dict[str, np.ndarray] = {"mean": cube.mean(axis=2).T, "sum": cube.sum(axis=2).T}
+        self.levels["year"] = {"year": years, "time": years + 0.5, **annual}
+
+        # Decades 1961-1970, 1971-1980, ... as the average of the complete years (mean annual sum for the sums)
+        starts: np.ndarray = np.arange(0, n_years, 10)
+        lengths: np.ndarray = np.diff(np.append(starts, n_years))
+        self.levels["decade"] = {"year": years[starts], "time": years[starts] + lengths / 2}
+        for stat, values in annual.items():
+            valid: np.ndarray = np.isfinite(values)
+            totals: np.ndarray = np.add.reduceat(np.where(valid, values, 0.), starts, axis=1)
+            counts: np.ndarray = np.add.reduceat(valid, starts, axis=1)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                self.levels["decade"][stat] = np.where(counts > 0, totals / counts, np.nan)
+
+    def keys(self, level: str, years: list[int]) -> np.ndarray:
+        """
+        Returns a mask of the points of the level which belong to the given years.
+
+        :param level: 'month', 'season', 'year' or 'decade'
+        :param years: list of years
+        :return: 1D boolean numpy array over the points of the level
+        """
+        span: int = self.SPANS[level]
+        first: int = PrefixSumIndex.FIRST_YEAR
+        wanted: np.ndarray = first + (np.asarray(years) - first) // span * span
+        return np.isin(self.levels[level]["year"], wanted)
+
+    def level_for(self, years: list[int], max_points: Optional[int] = None) -> str:
+        """
+        Picks the finest level whose number of points for the given years fits into the limit.
+
+        :param years: list of years
+        :param max_points: maximal number of points per region, if None, MAX_POINTS is used
+        :return: the name of the level
+        """
+        limit: int = self.MAX_POINTS if max_points is None else max_points
+        for level in self.LEVELS[:-1]:
+            if np.count_nonzero(self.keys(level, years)) <= limit:
+                return level
+        return self.LEVELS[-1]
+
+    def query(self, level: str, years: list[int], regions: Optional[list[int]] = None) -> dict[str, np.ndarray]:
+        """
+        Returns the aggregates of the level for the given years and regions.
+
+        :param level: 'month', 'season', 'year' or 'decade'
+        :param years: list of years
+        :param regions: list of region IDs, if None, all regions are used
+        :return: a dictionary with keys 'year', 'time', 'mean' and 'sum' (the last two with the shape
+                 (regions, points))
+        """
+        mask: np.ndarray = self.keys(level, years)
+        data: dict[str, np.ndarray] = self.levels[level]
+        rows: Union[list[int], slice] = slice(None) if regions is None else regions
+        return {"year": data["year"][mask], "time": data["time"][mask], "mean": data["mean"][rows][:, mask],
+                "sum": data["sum"][rows][:, mask]}
+
+
+class AnalogIndex:
+    """
+    Class AnalogIndex searches for analog years, i.e. the past years whose 12-month course was the most similar
+    to the chosen year, for all regions at once.
+    The index keeps the values standardized per region and calendar month together with their masks and squares,
+    so a query is a few batched matrix products followed by a partial sort.
+    """
+
+    def __init__(self, cubes: dict[str, np.ndarray]) -> None:
+        """
+        Builds the normalized index of every weather variable.
+
+        :param cubes: dictionary of numeric cubes with the shape (years, regions, months)
+        """
+        # (regions, years, months) standardized values with zeros instead of missing months, masks and squares
+        self.values: dict[str, np.ndarray] = {}
+        self.weights: dict[str, np.ndarray] = {}
+        self.squares: dict[str, np.ndarray] = {}
+        for name, cube in cubes.items():
+            with np.errstate(invalid='ignore', divide='ignore'):
+                z: np.ndarray = (cube - np.nanmean(cube, axis=0)) / np.nanstd(cube, axis=0, ddof=1)
+            z = z.transpose(1, 0, 2)
+            valid: np.ndarray = np.isfinite(z)
+            self.weights[name] = valid.astype(float)
+            self.values[name] = np.where(valid, z, 0.)
+            self.squares[name] = self.values[name] ** 2
+
+    def features(self, names: list[str]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Joins the months of the given variables into one feature vector per region and year.
+
+        :param names: names of the weather variables, e.g. ["temper", "precip"]
+        :return: a tuple (values, weights, squares), each with the shape (regions, years, 12 * variables)
+        """
+        return (np.concatenate([self.values[name] for name in names], axis=2),
+                np.concatenate([self.weights[name] for name in names], axis=2),
+                np.concatenate([self.squares[name] for name in names], axis=2))
+
+    def search(self, names: list[str], year: int, k: int = 5, regions: Optional[list[int]] = None
+               ) -> dict[str, np.ndarray]:
+        """
+        Finds the k years before the given year most similar to it (root mean square distance of the standardized
+        months) for every region. Only the months known in the given year are compared, so the current year can be
+        queried before it ends, and years missing any of these months are skipped.
+
+        :param names: names of the weather variables compared together, e.g. ["temper"] or ["temper", "precip"]
+        :param year: the query year
+        :param k: number of analog years, reduced to the number of candidates available in every region
+        :param regions: list of region IDs, if None, all regions are used
+        :return: a dictionary with keys 'years' and 'distance', both with the shape (regions, k)
+        :raises ValueError: if the year is not in the index
+        """
+        values: np.ndarray
+        weights: np.ndarray
+        squares: np.ndarray
+        values, weights, squares = self.features(names)
+        if regions is not None:
+            values, weights, squares = values[regions], weights[regions], squares[regions]
+        row: int = year - PrefixSumIndex.FIRST_YEAR
+        if not 0 <= row < values.shape[1]:
+            raise ValueError(f"Rok {year} není v rozsahu {PrefixSumIndex.FIRST_YEAR}-"
+                             f"{PrefixSumIndex.FIRST_YEAR + values.shape[1] - 1}")
+        query: np.ndarray = values[:, row, :, None]
+        mask: np.ndarray = weights[:, row, :, None]
+        # sum over the shared months of (x - q)^2 = x^2 . m - 2 x . (m q) + w . (m q^2)
+        distance: np.ndarray = (squares @ mask - 2 * values @ (mask * query) + weights @ (mask * query ** 2))[..., 0]
+        shared: np.ndarray = (weights @ mask)[..., 0]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            distance = np.sqrt(np.maximum(distance, 0.) / shared)
+        # Candidates have to know every month of the query and precede the query year
+        distance[shared < mask.sum(axis=1)] = np.inf
+        distance[:, row:] = np.inf
+        k = min(k, int(np.isfinite(distance).sum(axis=1).min()))
+        if k == 0:
+            return {"years": np.zeros((len(distance), 0), dtype=int), "distance": np.zeros((len(distance), 0))}
+        best: np.ndarray = np.argpartition(distance, k - 1, axis=1)[:, :k]
+        best = np.take_along_axis(best, np.take_along_axis(distance, best, axis=1).argsort(axis=1), axis=1)
+        return {"years": PrefixSumIndex.FIRST_YEAR + best, "distance": np.take_along_axis(distance, best, axis=1)}
+
+
+class PercentileIndex:
+    """
+    Class PercentileIndex keeps the values of every region × calendar month sorted over the whole archive,
+    so the percentile rank of any value is found by a binary search (O(log n)) for all cells at once,
+    and the percentile ranks of the archived months are precomputed lookups.
+    """
+
+    def __init__(self, cube: np.ndarray) -> None:
+        """
+        Builds the index of one weather variable.
+
+        :param cube: numeric cube with the shape (years, regions, months)
+        """
+        self.sorted: np.ndarray
+        self.counts: np.ndarray
+        self.percentiles: np.ndarray
+        self.build(cube)
+
+    def build(self, cube: np.ndarray) -> None:
+        """
+        Sorts the values of every region × calendar month and computes the percentile ranks of the archive.
+
+        :param cube: numeric cube with the shape (years, regions, months)
+        :return: None
+        """
+        # (regions, months, years) sorted values with NaN at the end and the numbers of valid values
+        self.sorted = np.sort(cube.transpose(1, 2, 0), axis=2)
+        self.counts = np.isfinite(self.sorted).sum(axis=2)
+        self.percentiles = self.rank(cube)
+
+    def search(self, values: np.ndarray, right: bool = False) -> np.ndarray:
+        """
+        Counts the archived values smaller than (or equal to, if right is True) the given values by a binary
+        search vectorized over all cells.
+
+        :param values: numpy array with the shape (..., regions, months)
+        :param right: if True, the values equal to the given values are counted as well
+        :return: numpy array of counts with the same shape as values
+        """
+        shape: tuple[int, ...] = np.broadcast_shapes(values.shape, self.counts.shape)
+        values = np.broadcast_to(values, shape)
+        table: np.ndarray = np.broadcast_to(self.sorted, shape + self.sorted.shape[-1:])
+        low: np.ndarray = np.zeros(shape, dtype=int)
+        high: np.ndarray = np.broadcast_to(self.counts, shape).copy()
+        for _ in range(int(np.ceil(np.log2(self.sorted.shape[-1] + 1)))):
+            middle: np.ndarray = (low + high) // 2
+            pivot: np.ndarray = np.take_along_axis(table, np.minimum(middle, table.shape[-1] - 1)[..., None],
+                                                   axis=-1)[..., 0]
+            # Only the unfinished searches (low < high) are moved
+            go_right: np.ndarray = (low < high) & ((pivot <= values) if right else (pivot < values))
+            go_left: np.ndarray = (low < high) & ~go_right
+            low = np.where(go_right, middle + 1, low)
+            high = np.where(go_left, middle, high)
+        return low
+
+    def rank(self, values: np.ndarray) -> np.ndarray:
+        """
+        Computes the percentile ranks of the given values against the archive of their region and calendar month
+        (the mean of the strict and weak rank, as in scipy.stats.percentileofscore with kind='mean').
+
+        :param values: numpy array with the shape (..., regions, months)
+        :return: numpy array of percentile ranks (0-100), NaN for missing values
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ranks: np.ndarray = (self.search(values) + self.search(values, right=True)) / (2 * self.counts) * 100
+        return np.where(np.isfinite(values), ranks, np.nan)
+
+    def query(self, years: list[int], regions: Optional[list[int]] = None) -> np.ndarray:
+        """
+        Returns the precomputed percentile ranks of the archived months.
+
+        :param years: list of years
+        :param regions: list of region IDs, if None, all regions are used
+        :return: 3D numpy array with the shape (years, regions, months)
+        :raises ValueError: if any year is not in the archive
+        """
+        block: np.ndarray = self.percentiles[PrefixSumIndex.year_index(years, len(self.percentiles))]
+        return block if regions is None else block[:, regions, :]
+
+
+class GraphPlotter:
+    """
+    Class GraphPlotter is a utility class that provides methods for plotting various types of graphs
+    related to weather data.
+    It can plot 2D and 3D graphs, histograms, boxplots, and correlation plots.
+    It takes input data in the form of a dictionary containing temperature and/or precipitation data.
+    The class also provides an interactive user interface to choose which type of graph to plot and on which data.
+    """
+
+    def __init__(self, data: dict[str, xr.DataArray], temper_choose: bool, precip_choose: bool) -> None:
+        # Set the months and regions for later use
+        self.months: list[str] = ['Leden', 'Únor', 'Březen', 'Duben', 'Květen', 'Červen', 'Červenec', 'Srpen', 'Září',
+                                  'Říjen', 'Listopad', 'Prosinec']
+        self.regions: list[str] = ['Česká republika', 'Praha a Středočeský', 'Jihočeský', 'Plzeňský', 'Karlovarský',
+                                   'Ústecký', 'Liberecký', 'Královéhradecký', 'Pardubický', 'Vysočina', 'Jihomoravský',
+                                   'Olomoucký', 'Zlínský', 'Moravskoslezský']
+        # Save the user's choices for temperature and precipitation data
+        self.temper_choose: bool = temper_choose
+        self.precip_choose: bool = precip_choose
+        self.last_time: float = tim.time()
+        # Make a copy of the original data
+        self.data: dict[str, xr.DataArray] = data.copy()
+        # Get length of the data, remove duplicate data, and slice the data into decades
+        if temper_choose:
+            len_data: int = len(self.data["temper"]) - 60  # remove duplicate data
+        else:
+            len_data: int = len(self.data["precip"]) - 60  # remove duplicate data
+        # Indices of the tables ordered by year, 1961-today (minimal 62 years)
+        order: list[int] = DataValidator.chronological(len_data)
+        # The last year of the data offered by the year prompt
+        self.last_year: int = PrefixSumIndex.FIRST_YEAR + len(order) - 1
+        # The normal and deviation rows of the chosen data, sliced like the values
+        ordered: dict[str, xr.DataArray] = {}
+        # Slice the temperature data into decades and remove unnecessary rows and columns
+        if temper_choose:
+            ordered["temper"] = self.data["temper"].isel(time=order)
+            self.data["temper"]: xr.DataArray = ordered["temper"].isel(row=slice(1, 1 + 14 * 3, 3),
+                                                                       col=slice(2, 2 + 12))
+        # Slice the precipitation data into decades and remove unnecessary rows and columns
+        if precip_choose:
+            ordered["precip"] = self.data["precip"].isel(time=order)
+            self.data["precip"]: xr.DataArray = ordered["precip"].isel(row=slice(1, 1 + 14 * 3, 3),
+                                                                       col=slice(2, 2 + 12))
+
+        # Backup of the sliced data, so one instance can be reused for more plots
+        self.backup_data: dict = {}
+        # Numeric cubes (years, regions, months) converted once and the lazily built prefix-sum indexes
+        self.cube: dict[str, np.ndarray] = {}
+        self.prefix_index: dict[str, PrefixSumIndex] = {}
+        # Bootstrap engine for the confidence intervals of the plotted statistics
+        self.bootstrap: Bootstrap = Bootstrap()
+        # Batched DCT with the cache of spectra of already plotted selections
+        self.spectral: SpectralAnalyzer = SpectralAnalyzer()
+        # Normal, deviation and precomputed anomaly layers of every region and year
+        self.anomaly_layers: dict[str, AnomalyLayers] = {}
+        # Seasonal, annual and decadal aggregates for the overview plots
+        self.pyramid: dict[str, AggregatePyramid] = {}
+        for name in self.data:
+            if (name == "temper" and temper_choose) or (name == "precip" and precip_choose):
+                self.backup_data[name]: xr.DataArray = self.data[name].copy()
+                self.cube[name]: np.ndarray = self.to_float(self.data[name].values)
+                self.anomaly_layers[name] = AnomalyLayers(
+                    self.cube[name],
+                    self.to_float(ordered[name].isel(row=slice(2, 2 + 14 * 3, 3), col=slice(2, 2 + 12)).values),
+                    self.to_float(ordered[name].isel(row=slice(3, 3 + 14 * 3, 3), col=slice(2, 2 + 12)).values))
+                self.pyramid[name] = AggregatePyramid(self.cube[name])
+        # EOF analyses of the anomalies, computed on the first use
+        self.eof_cache: dict[tuple[str, bool], dict[str, np.ndarray]] = {}
+        # Sorted archive of every region × calendar month for the percentile ranks
+        self.percentile_index: dict[str, PercentileIndex] = {name: PercentileIndex(cube)
+                                                             for name, cube in self.cube.items()}
+        # Harmonic seasonal models of all regions and variables, fitted on the first use
+        self.seasonal_cache: dict[str, dict[str, np.ndarray]] = {}
+        # Normalized index of the 12-month vectors for the analog-year search
+        self.analogs: AnalogIndex = AnalogIndex(self.cube)
+        # Output file of the headless mode (None displays the figures) and the files saved so far
+        self.output: Optional[str] = None
+        self.saved: list[str] = []
+        # Scripted answers of the headless mode (None reads the keyboard)
+        self.answers: Optional[Iterator[str]] = None
+
+    @staticmethod
+    def to_float(values: np.ndarray) -> np.ndarray:
+        """
+        Converts an array of CHMI number strings with a decimal comma into a float array in one vectorized step.
+
+        :param values: numpy array of strings, e.g. '-1,5'
+        :return: numpy array of floats with the same shape, empty cells (months not published yet) and malformed
+            cells reported by DataValidator are NaN
+        """
+        return DataValidator.parse(values)[0]
+
+    @staticmethod
+    def fill_gaps(block: np.ndarray) -> np.ndarray:
+        """
+        Fills missing values of every series by linear interpolation between the neighbouring known values
+        in one vectorized step, missing values at the ends are filled with the nearest known value
+        (e.g. the rest of the current year with its last published month).
+
+        :param block: numpy array of series along the last axis, missing values are NaN
+        :return: numpy array of the same shape, series without any known value stay NaN
+        """
+        valid: np.ndarray = np.isfinite(block)
+        if valid.all():
+            return block
+        n: int = block.shape[-1]
+        index: np.ndarray = np.arange(n)
+        # Positions of the previous and the next known value of every element
+        previous: np.ndarray = np.maximum.accumulate(np.where(valid, index, -1), axis=-1)
+        following: np.ndarray = np.flip(np.minimum.accumulate(np.flip(np.where(valid, index, n), axis=-1), axis=-1),
+                                        axis=-1)
+        # Missing values at the ends take the nearest known value from the other side
+        previous, following = (np.where(previous < 0, following, previous),
+                               np.where(following >= n, previous, following))
+        left: np.ndarray = np.take_along_axis(block, np.clip(previous, 0, n - 1), axis=-1)
+        right: np.ndarray = np.take_along_axis(block, np.clip(following, 0, n - 1), axis=-1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight: np.ndarray = np.where(following > previous, (index - previous) / (following - previous), 0.)
+        return np.where(valid, block, left + weight * (right - left))
+
+    def get_prefix_index(self, name: str) -> PrefixSumIndex:
+        """
+        Returns the prefix-sum index of the given weather variable, it is built on the first call.
+
+        :param name: str, the name of the weather variable ("temper" or "precip")
+        :return: PrefixSumIndex over the numeric cube of the variable
+        """
+        if name not in self.prefix_index:
+            self.prefix_index[name] = PrefixSumIndex(self.cube[name])
+        return self.prefix_index[name]
+
+    def range_stats(self, name: str, years: list[int], regions: Optional[list[int]] = None,
+                    pooled: bool = False) -> dict[str, np.ndarray]:
+        """
+        Returns the total, mean, variance and standard deviation of the given years and regions using
+        the prefix-sum index, e.g. for years from UserInterface.parse_date_range('1982, 1984, 1986-1988').
+
+        :param name: str, the name of the weather variable ("temper" or "precip")
+        :param years: ascending list of years
+        :param regions: list of region IDs, if None, all regions are used
+        :param pooled: if True, the selected regions are pooled into a single value
+        :return: a dictionary with keys 'total', 'count', 'mean', 'var' and 'std'
+        """
+        return self.get_prefix_index(name).query(years, regions, pooled)
+
+    def rolling(self, name: str, window: int, regions: Optional[list[int]] = None) -> dict[str, np.ndarray]:
+        """
+        Computes moving sums, means and standard deviations over the whole monthly series of all selected regions
+        at once using the cumulative sums of the prefix-sum index.
+
+        :param name: str, the name of the weather variable ("temper" or "precip")
+        :param window: window length in months, e.g. 12, 120 (10 years) or 360 (30-year climate normal)
+        :param regions: list of region IDs, if None, all regions are used
+        :return: a dictionary with keys 'time' (centre of the window in years), 'total', 'count', 'mean', 'var'
+                 and 'std', the statistics have the shape (regions, windows)
+        """
+        index: PrefixSumIndex = self.get_prefix_index(name)
+        result: dict[str, np.ndarray] = index.sweep(window, regions=regions)
+        result["time"] = index.FIRST_YEAR + (np.arange(result["mean"].shape[1]) + window / 2) / index.n_months
+        return result
+
+    def trends(self, name: str, years: list[int]) -> dict[str, np.ndarray]:
+        """
+        Computes the OLS slope, Sen's slope and the Mann-Kendall test for every region × calendar month series
+        of the given years in one batched computation.
+
+        :param name: str, the name of the weather variable ("temper" or "precip")
+        :param years: list of years
+        :return: a dictionary with keys 'ols', 'sen', 's', 'z' and 'p', each with the shape (regions, months)
+        :raises ValueError: if any year is not in the loaded data
+        """
+        return TrendAnalyzer.analyze(self.cube[name][PrefixSumIndex.year_index(years, len(self.cube[name]))], years)
+
+    def select(self, name: str, years: list[int], regions: Optional[list[int]] = None, fill: bool = False
+               ) -> np.ndarray:
+        """
+        Selects the given years and regions from the numeric cube and concatenates the years along the time axis,
+        the same layout as the plots use.
+
+        :param name: str, the name of the weather variable ("temper" or "precip")
+        :param years: list of years
+        :param regions: list of region IDs, if None, all regions are used
+        :param fill: if True, the missing months are filled by fill_gaps(), e.g. for the spectral transforms
+        :return: 2D numpy array with the shape (regions, 12 * years)
+        :raises ValueError: if any year is not in the loaded data
+        """
+        block: np.ndarray = self.cube[name][PrefixSumIndex.year_index(years, len(self.cube[name]))]
+        if regions is not None:
+            block = block[:, regions, :]
+        series: np.ndarray = block.transpose(1, 0, 2).reshape(block.shape[1], -1)
+        return self.fill_gaps(series) if fill else series
+
+    def dct_spectrum(self, name: str, years: list[int], regions: Optional[list[int]] = None) -> np.ndarray:
+        """
+        Returns DCT coefficients of the given years, the spectra of all regions are computed in a single batched
+        transform and cached per selection of years.
+
+        :param name: str, the name of the weather variable ("temper" or "precip")
+        :param years: list of years
+        :param regions: list of region IDs, if None, all regions are returned
+        :return: 2D numpy array with the shape (regions, 12 * years)
+        """
+        spectrum: np.ndarray = self.spectral.cached_dct((name, tuple(years)),
+                                                        lambda: self.select(name, years, fill=True))
+        return spectrum if regions is None else spectrum[regions]
+
+    def spectrogram(self, name: str, window: int, regions: Optional[list[int]] = None, step: int = 1
+                    ) -> dict[str, np.ndarray]:
+        """
+        Computes the sliding-window DCT spectrogram of the full monthly series of the given regions.
+
+        :param name: str, the name of the weather variable ("temper" or "precip")
+        :param window: window length in months
+        :param regions: list of region IDs, if None, all regions are used
+        :param step: shift between two consecutive windows in months
+        :return: a dictionary with keys 'time' (centre of the window in years), 'freq' (1/month) and 'power'
+                 (absolute values of the DCT coefficients with the shape (regions, windows, window))
+        """
+        series: np.ndarray = self.select(name, list(range(PrefixSumIndex.FIRST_YEAR, PrefixSumIndex.FIRST_YEAR +
+                                                          len(self.cube[name]))), regions, fill=True)
+        power: np.ndarray = np.abs(self.spectral.spectrogram(series, window, step))
+        time: np.ndarray = PrefixSumIndex.FIRST_YEAR + (np.arange(power.shape[1]) * step + window / 2) / 12
+        return {"time": time, "freq": np.arange(window) / (2 * window), "power": power}
+
+    def last_years(self, count: int = 5) -> list[int]:
+        """
+        Returns the last years available in all chosen data.
+
+        :param count: number of years
+        :return: ascending list of years
+        """
+        last_year: int = PrefixSumIndex.FIRST_YEAR + min(len(self.cube[name]) for name in self.chosen_names()) - 1
+        return list(range(last_year - count + 1, last_year + 1))
+
+    def standard_windows(self, name: str) -> dict[str, list[int]]:
+        """
+        Returns the standard windows of years with precomputed spectra: the last 5 years, each decade
+        and the full history.
+
+        :param name: str, the name of the weather variable ("temper" or "precip")
+        :return: dictionary of window labels and lists of years
+        """
+        years: list[int] = list(range(PrefixSumIndex.FIRST_YEAR, PrefixSumIndex.FIRST_YEAR + len(self.cube[name])))
+        windows: dict[str, list[int]] = {"posledních 5 let": self.last_years(5)}
+        for i in range(0, len(years), 10):
+            windows[f"{years[i]}-{years[min(i + 9, len(years) - 1)]}"] = years[i:i + 10]
+        windows["celá historie"] = years
+        return windows
+
+    def precompute_spectra(self, backup_path: str = DataFetcher.BACKUP_PATH) -> None:
+        """
+        Precomputes DCT spectra of the standard windows for all chosen data, so the spectral plots of these windows
+        open without any transform. The spectra are stored alongside the data backup and reused while the data
+        are the same.
+
+        :param backup_path: the backup directory path
+        :return: None
+        """
+        for name in self.chosen_names():
+            path: str = os.path.join(backup_path, f"spectra_{name}.npz")
+            # Fingerprint of the gap-filled series, which are the input of the transforms
+            fingerprint: str = SpectralAnalyzer.fingerprint(self.select(name, list(range(
+                PrefixSumIndex.FIRST_YEAR, PrefixSumIndex.FIRST_YEAR + len(self.cube[name]))), fill=True))
+            if self.spectral.load(path, name, fingerprint):
+                continue
+            windows: dict[str, list[int]] = self.standard_windows(name)
+            self.spectral.precompute(name, windows, lambda years: self.select(name, years, fill=True))
+            if os.path.isdir(backup_path):
+                try:
+                    self.spectral.save(path, name, windows, fingerprint)
+                except OSError as e:
+                    print(f"Spektra se nepodařilo uložit: {e}")
+
+    def anomalies(self, name: str) -> np.ndarray:
+        """
+        Returns the monthly series of all regions without the mean seasonal cycle (each calendar month minus
+        its mean over the whole archive).
+
+        :param name: str, the name of the weather variable ("temper" or "precip")
+        :return: 2D numpy array with the shape (regions, 12 * years)
+        """
+        cube: np.ndarray = self.cube[name] - np.nanmean(self.cube[name], axis=0)
+        return cube.transpose(1, 0, 2).reshape(cube.shape[1], -1)
+
+    def anomaly(self, name: str, layer: str, years: list[int], regions: Optional[list[int]] = None) -> np.ndarray:
+        """
+        Returns a precomputed anomaly layer of the given years and regions without any recomputation.
+
+        :param name: str, the name of the weather variable ("temper" or "precip")
+        :param layer: 'value', 'normal', 'deviation', 'diff' (value - normal) or the z-score 'z_1961-1990'
+                      or 'z_1991-2020'
+        :param years: list of years
+        :param regions: list of region IDs, if None, all regions are used
+        :return: 3D numpy array with the shape (years, regions, months)
+        """
+        return self.anomaly_layers[name].query(layer, years, regions)
+
+    def aggregates(self, name: str, years: list[int], regions: Optional[list[int]] = None,
+                   level: Optional[str] = None) -> tuple[str, dict[str, np.ndarray]]:
+        """
+        Returns precomputed monthly, seasonal, annual or decadal aggregates of the given years and regions.
+
+        :param name: str, the name of the weather variable ("temper" or "precip")
+        :param years: list of years
+        :param regions: list of region IDs, if None, all regions are used
+        :param level: 'month', 'season', 'year' or 'decade', if None, the finest level that fits into
+                      AggregatePyramid.MAX_POINTS points is picked
+        :return: a tuple (level, aggregates), see AggregatePyramid.query
+        """
+        pyramid: AggregatePyramid = self.pyramid[name]
+        level = pyramid.level_for(years) if level is None else level
+        return level, pyramid.query(level, years, regions)
+
+    def analog_years(self, year: int, k: int = 5, regions: Optional[list[int]] = None,
+                     names: Optional[list[str]] = None) -> dict[str, np.ndarray]:
+        """
+        Finds the k years before the given year most similar to it in every region using the analog index.
+
+        :param year: the query year
+        :param k: number of analog years
+        :param regions: list of region IDs, if None, all regions are used
+        :param names: weather variables compared together, if None, all chosen variables are used
+        :return: a dictionary with keys 'years' and 'distance', both with the shape (regions, k)
+        """
+        return self.analogs.search(self.chosen_names() if names is None else names, year, k, regions)
+
+    def eof(self, name: str, standardize: bool = False) -> dict[str, np.ndarray]:
+        """
+        Returns the EOF analysis of the monthly anomalies of all regions over the whole history and
+        the hierarchical clustering of regions by their correlation. The analysis of all chosen variables is
+        computed in one batched SVD on the first call and cached.
+
+        :param name: str, the name of the weather variable ("temper" or "precip")
+        :param standardize: if True, the EOF are computed from the correlation instead of the covariance matrix
+        :return: a dictionary with keys of EOFAnalyzer.decompose and 'time' (months without missing values
+                 in years), 'corr' (correlation matrix of regions) and 'linkage' (clustering of regions)
+        """
+        if (name, standardize) not in self.eof_cache:
+            names: list[str] = self.chosen_names()
+            series: dict[str, np.ndarray] = {}
+            times: dict[str, np.ndarray] = {}
+            for key in names:
+                # Months missing in any region (e.g. the rest of the current year) are left out
+                valid: np.ndarray = np.isfinite(self.anomalies(key)).all(axis=0)
+                series[key] = self.anomalies(key)[:, valid]
+                times[key] = PrefixSumIndex.FIRST_YEAR + (np.nonzero(valid)[0] + 0.5) / 12
+            results: list[dict[str, np.ndarray]]
+            if len({block.shape for block in series.values()}) == 1:
+                batch: dict[str, np.ndarray] = EOFAnalyzer.decompose(np.stack(list(series.values())), standardize)
+                results = [{key: value[i] for key, value in batch.items()} for i in range(len(names))]
+            else:
+                results = [EOFAnalyzer.decompose(series[key], standardize) for key in names]
+            for key, result in zip(names, results):
+                result["time"] = times[key]
+                result["corr"] = CorrelationAnalyzer.pearson(series[key])
+                result["linkage"] = CorrelationAnalyzer.correlation_linkage(result["corr"])
+                self.eof_cache[(key, standardize)] = result
+        return self.eof_cache[(name, standardize)]
+
+    def extremes(self, name: str = "precip", periods: tuple[int, ...] = ExtremeValueAnalyzer.PERIODS,
+                 mle: bool = False, parallel: bool = False) -> dict[str, np.ndarray]:
+        """
+        Fits the extreme-value models (GEV of annual maxima and peaks over threshold) to the monthly values
+        of all regions over the whole history in one batch.
+
+        :param name: str, the name of the weather variable ("temper" or "precip")
+        :param periods: return periods in years
+        :param mle: if True, the GEV is fitted by the maximum likelihood instead of L-moments
+        :param parallel: Flag whether to spread the maximum likelihood fits across a process pool or not.
+        :return: a dictionary described in ExtremeValueAnalyzer.analyze
+        """
+        return ExtremeValueAnalyzer.analyze(self.cube[name], periods, mle=mle, parallel=parallel)
+
+    def percentiles(self, name: str, years: list[int], regions: Optional[list[int]] = None) -> np.ndarray:
+        """
+        Returns the percentile ranks of the archived months against all years of the same region and calendar
+        month, e.g. percentiles("precip", [2022], [12])[0, 0, 4] for May 2022 in Zlínský.
+
+        :param name: str, the name of the weather variable ("temper" or "precip")
+        :param years: list of years
+        :param regions: list of region IDs, if None, all regions are used
+        :return: 3D numpy array of percentile ranks (0-100) with the shape (years, regions, months)
+        """
+        return self.percentile_index[name].query(years, regions)
+
+    def percentile_of(self, name: str, values: np.ndarray) -> np.ndarray:
+        """
+        Returns the percentile ranks of any values (e.g. a forecast) against the archive by a binary search.
+
+        :param name: str, the name of the weather variable ("temper" or "precip")
+        :param values: numpy array with the shape (..., regions, months)
+        :return: numpy array of percentile ranks (0-100) with the same shape
+        """
+        return self.percentile_index[name].rank(np.asarray(values, dtype=float))
+
+    def seasonal_model(self) -> dict[str, dict[str, np.ndarray]]:
+        """
+        Fits the harmonic seasonal model (annual and semiannual harmonics with a linear trend) to the whole
+        monthly series of all regions of all chosen variables in one batched call and caches the results.
+
+        :return: dictionary of the results of HarmonicModel.fit per weather variable, the series have the shape
+                 (regions, 12 * years)
+        """
+        if not self.seasonal_cache:
+            names: list[str] = self.chosen_names()
+            length: int = max(len(self.cube[name]) for name in names)
+            # Series of all variables are stacked, the shorter ones are padded with missing months
+            series: np.ndarray = np.full((len(names), len(self.regions), 12 * length), np.nan)
+            for i, name in enumerate(names):
+                series[i, :, :12 * len(self.cube[name])] = self.select(name, list(range(
+                    PrefixSumIndex.FIRST_YEAR, PrefixSumIndex.FIRST_YEAR + len(self.cube[name]))))
+            time: np.ndarray = PrefixSumIndex.FIRST_YEAR + (np.arange(12 * length) + 0.5) / 12
+            result: dict[str, np.ndarray] = HarmonicModel.fit(series.reshape(-1, 12 * length), time)
+            for i, name in enumerate(names):
+                months: int = 12 * len(self.cube[name])
+                rows: slice = slice(i * len(self.regions), (i + 1) * len(self.regions))
+                self.seasonal_cache[name] = {key: value[rows, :months] if key in ("fitted", "residuals")
+                                             else value[rows] for key, value in result.items()}
+        return self.seasonal_cache
+
+    def lagged_correlation(self, max_lag: int = 24, regions: Optional[list[int]] = None,
+                           deseasonalize: bool = True) -> dict[str, np.ndarray]:
+        """
+        Computes lagged cross-correlations between temperature and precipitation over the full archive for all
+        regions simultaneously (positive lag means that precipitation follows temperature).
+
+        :param max_lag: the largest lag in months
+        :param regions: list of region IDs, if None, all regions are used
+        :param deseasonalize: if True, the mean seasonal cycle is removed first
+        :return: a dictionary with keys 'lags', 'ccf' (regions, lags), 'peak_lag' and 'peak' (per region)
+        """
+        rows: Union[list[int], slice] = slice(None) if regions is None else regions
+        length: int = min(self.cube["temper"].shape[0], self.cube["precip"].shape[0]) * 12
+        if deseasonalize:
+            temper: np.ndarray = self.anomalies("temper")[rows, :length]
+            precip: np.ndarray = self.anomalies("precip")[rows, :length]
+        else:
+            temper = self.select("temper", list(range(PrefixSumIndex.FIRST_YEAR,
+                                                      PrefixSumIndex.FIRST_YEAR + length // 12)))[rows]
+            precip = self.select("precip", list(range(PrefixSumIndex.FIRST_YEAR,
+                                                      PrefixSumIndex.FIRST_YEAR + length // 12)))[rows]
+        # Months missing at the end (the rest of the current year) are cut off, the inner gaps are interpolated
+        known: np.ndarray = np.nonzero(np.isfinite(temper).all(axis=0) & np.isfinite(precip).all(axis=0))[0]
+        end: int = known[-1] + 1 if len(known) else 0
+        temper = self.fill_gaps(temper[:, :end])
+        precip = self.fill_gaps(precip[:, :end])
+        lags: np.ndarray
+        ccf: np.ndarray
+        lags, ccf = CorrelationAnalyzer.lagged(temper, precip, max_lag, self.spectral.workers)
+        peak_idx: np.ndarray = np.abs(ccf).argmax(axis=1)
+        return {"lags": lags, "ccf": ccf, "peak_lag": lags[peak_idx],
+                "peak": np.take_along_axis(ccf, peak_idx[:, None], axis=1)[:, 0]}
+
+    def regression_matrix(self, x_name: str, y_name: str, years: list[int], regions: Optional[list[int]] = None,
+                          by_month: bool = False) -> dict[str, np.ndarray]:
+        """
+        Regresses every selected region of one variable on every selected region of another (or the same)
+        variable in one batched computation, e.g. to screen all pairs instead of plotting them one by one.
+
+        :param x_name: str, the name of the independent weather variable ("temper" or "precip")
+        :param y_name: str, the name of the dependent weather variable ("temper" or "precip")
+        :param years: list of years
+        :param regions: list of region IDs, if None, all regions are used
+        :param by_month: if True, every calendar month is regressed separately over the years
+        :return: a dictionary with keys 'slope', 'intercept', 'r', 'p' and 'std_err', each with the shape
+                 (x regions, y regions) or (x regions, y regions, months) if by_month is True
+        :raises ValueError: if any year is not in the loaded data
+        """
+        idx: np.ndarray = PrefixSumIndex.year_index(years, min(len(self.cube[x_name]), len(self.cube[y_name])))
+        rows: Union[list[int], slice] = slice(None) if regions is None else regions
+        x: np.ndarray
+        y: np.ndarray
+        if by_month:
+            # (regions, months, years) series of every calendar month
+            x = self.cube[x_name][idx][:, rows, :].transpose(1, 2, 0)
+            y = self.cube[y_name][idx][:, rows, :].transpose(1, 2, 0)
+        else:
+            x = self.select(x_name, years, regions)
+            y = self.select(y_name, years, regions)
+        result: tuple[np.ndarray, ...] = CorrelationAnalyzer.linregress(x[:, None], y[None, :])
+        return dict(zip(("slope", "intercept", "r", "p", "std_err"), result))
+
+    def bootstrap_ci(self, name: str, years: list[int], regions: list[int], per_region: bool = False,
+                     parallel: bool = False) -> Union[dict[str, Union[tuple[float, float], int]],
+                                                      list[dict[str, Union[tuple[float, float], int]]]]:
+        """
+        Computes bootstrap confidence intervals of the overlay statistics for the given years and regions.
+
+        :param name: str, the name of the weather variable ("temper" or "precip")
+        :param years: list of years
+        :param regions: list of region IDs
+        :param per_region: if True, the intervals are computed for every region separately
+        :param parallel: Flag whether to spread the regions across a process pool or not.
+        :return: a dictionary of (lower, upper) bounds and the number of resamples, or a list of them (one per region)
+        :raises ValueError: if any year is not in the loaded data
+        """
+        values: np.ndarray = self.cube[name][PrefixSumIndex.year_index(years, len(self.cube[name]))][:, regions, :]
+        if per_region:
+            return self.bootstrap.confidence_intervals_many([values[:, i, :] for i in range(len(regions))], parallel)
+        return self.bootstrap.confidence_intervals(values)
+
+    def export(self, path: str) -> xr.Dataset:
+        """
+        Exports the values, normals and deviations of all chosen variables as a table with the dimensions year,
+        region and month, e.g. for spreadsheets or other tools.
+
+        :param path: output file, *.nc is saved as NetCDF and *.csv as a long table with one row per month and region
+        :return: the exported xarray.Dataset
+        """
+        length: int = max(len(self.cube[name]) for name in self.chosen_names())
+        variables: dict[str, tuple[tuple[str, ...], np.ndarray]] = {}
+        for name in self.chosen_names():
+            for layer in ("value", "normal", "deviation"):
+                # A shorter variable is padded with missing years
+                block: np.ndarray = np.full((length, len(self.regions), 12), np.nan)
+                block[:len(self.cube[name])] = self.anomaly_layers[name].layers[layer]
+                variables[f"{name}_{layer}"] = (("year", "region", "month"), block)
+        dataset: xr.Dataset = xr.Dataset(variables, coords={
+            "year": np.arange(PrefixSumIndex.FIRST_YEAR, PrefixSumIndex.FIRST_YEAR + length),
+            "region": self.regions, "month": np.arange(1, 13)})
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if path.lower().endswith(".nc"):
+            dataset.to_netcdf(path)
+        elif path.lower().endswith(".csv"):
+            dataset.to_dataframe().to_csv(path)
+        else:
+            raise ValueError(f"Nepodporovaný formát exportu: {path} (podporované jsou .nc a .csv)")
+        return dataset
+
+    def chosen_names(self) -> list[str]:
+        """
+        Returns the names of the weather variables chosen by the user.
+
+        :return: list of names ("temper" and/or "precip")
+        """
+        return [name for name, chosen in (("temper", self.temper_choose), ("precip", self.precip_choose)) if chosen]
+
+    def control_years(self, years: list[int]) -> bool:
+        """
+        Checks if the given years are in the range of all chosen data.
+
+        :param years: list of years
+        :return: boolean indicating if the years are valid or not
+        """
+        last_year: int = PrefixSumIndex.FIRST_YEAR + min(len(self.cube[name]) for name in self.chosen_names()) - 1
+        if min(years) < PrefixSumIndex.FIRST_YEAR or max(years) > last_year:
+            print("Zadané roky nejsou v rozsahu 1961-" + str(last_year))
+            return False
+        return True
+
+    @staticmethod
+    def control_regions(regions: list[int]) -> bool:
+        """
+        Controls whether the regions entered by the user are valid or not.
+
+        :param regions: A list of integers representing regions.
+        :return: A boolean indicating whether the regions are valid or not.
+        """
+        if min(regions) < 0 or max(regions) > 13:
+            print("Zadané kraje nejsou v rozsahu 0-13")
+            return False
+        return True
+
+    def input_loop(self, text: str, **kwargs: any) -> Union[bool, str, list, int]:
+        """
+        Asks the user like UserInterface.input_loop, the year prompt offers the loaded years and a headless job
+        takes the scripted answers instead of the keyboard.
+
+        :param text: message to display to the user
+        :param kwargs: the kind of the input, see UserInterface.input_loop
+        :return: valid user input
+        """
+        return UserInterface.input_loop(text, answers=self.answers, last_year=self.last_year, **kwargs)
+
+    def ask_years(self) -> list[int]:
+        """
+        Asks the user for years and validates them.
+
+        :return: list of valid years, empty list otherwise
+        """
+        years: list[int] = self.input_loop("Zadejte rok(y)", year=True)
+        return years if years and self.control_years(years) else []
+
+    def ask_regions(self, text: str = "Zadejte kraj(e)") -> list[int]:
+        """
+        Prints the list of regions, asks the user for region(s) and validates them.
+
+        :param text: message to display to the user
+        :return: list of valid region IDs, empty list otherwise
+        """
+        print("Kraje:")
+        print("\n".join([f"{i}) {region}" for i, region in enumerate(self.regions)]))
+        regions: list[int] = self.input_loop(text, region=True)
+        return regions if regions and self.control_regions(regions) else []
+
+    def display(self, fig: mpl.figure.Figure) -> None:
+        """
+        Displays the figure, or saves it into the output file and closes it in the headless mode.
+        The first figure of a job is saved under the output path, the next ones get the suffix _2, _3, ...
+
+        :param fig: Matplotlib Figure to display
+        :return: None
+        """
+        if self.output is None:
+            fig.show()
+            return
+        stem: str
+        suffix: str
+        stem, suffix = os.path.splitext(self.output)
+        path: str = self.output if not self.saved else f"{stem}_{len(self.saved) + 1}{suffix}"
+        fig.savefig(path, bbox_inches='tight')
+        plt.close(fig)
+        self.saved.append(path)
+
+    def show_figure(self, fig: mpl.figure.Figure) -> None:
+        """
+        Sets the key bindings of the figure (key 'x' closes all figures) and displays it.
+
+        :param fig: Matplotlib Figure to display
+        :return: None
+        """
+        def on_key_press(event: mpl.backend_bases.KeyEvent) -> None:
+            """
+            A function that is called when a key is pressed. If the pressed key is 'x', it closes all the figures.
+
+            :param event: The event object that contains information about the key press.
+            :return: None
+            """
+            if event.key.lower() == 'x':
+                plt.close('all')
+
+        mpl.rcParams.update({'keymap.forward': ['d', 'D'], 'keymap.back': ['a', 'A'], 'keymap.save': ['s', 'S']})
+        fig.canvas.mpl_connect('key_press_event', on_key_press)
+        self.display(fig)
+
+    def reset_data(func: Callable[..., any]) -> Callable[..., any]:
+        """
+        This is a decorator function that takes another function as an argument and returns a new function.
+        The returned function restores the original data stored in the data dictionary by copying the backup data
+        for possible reuse.
+
+        :return: function
+        """
+
+        @functools.wraps(func)
+        def wrapper(self, *args: any, **kwargs: any) -> func:
+            """
+            This is a decorator function that wraps around another function passed as an argument.
+            it first executes the original function then it restores the original weather data from the backup.
+
+            :param self: The class instance that the decorated function is a method of.
+            :param args: Positional arguments passed to the decorated function.
+            :param kwargs: Keyword arguments passed to the decorated function.
+            :return: The result of the decorated function.
+            """
+            result: func = func(self, *args, **kwargs)
+            if self.temper_choose:
+                self.data["temper"]: xr.DataArray = self.backup_data["temper"].copy()
+            if self.precip_choose:
+                self.data["precip"]: xr.DataArray = self.backup_data["precip"].copy()
+            return result
+
+        return wrapper
+
+    @Utils.debug
+    def plot_3d(self) -> None:
+        """
+        Create and display a 3D plot of temperature or precipitation data for the last 5 years.
+
+        :return: None
+        """
+        self.plot_3d_year_region(predef_years=self.last_years(5),
+                                 subtitle_part_text="za posledních 5 let",
+                                 regions=[region for region in range(0, 14)])
+
+    @Utils.debug
+    def plot_3d_year(self) -> None:
+        """
+        Create and display a 3D plot of temperature or precipitation data for a specific year(s).
+
+        :return: None
+        """
+        self.plot_3d_year_region(regions=[region for region in range(0, 14)])
+
+    @Utils.debug
+    @reset_data
+    def plot_3d_year_region(self, predef_years: str = None, subtitle_part_text: str = "", regions: str = None) -> None:
+        """
+        Create and display a 3D plot of temperature or precipitation data for a specific year(s) and region(s).
+
+        :param predef_years: A list of years to plot, if None it plots all the available years
+        :param subtitle_part_text: A substring for the subtitle
+        :param regions: A list of regions to display
+        :return: None
+        """
+        if regions is None:
+            regions = []
+        if predef_years is None:
+            predef_years = []
+
+        def create_3d_plot(name: str, years: list[int] = None, regions: list[int] = None,
+                           subtitle_part_text: str = subtitle_part_text) -> None:
+            """
+            This function creates and displays a 3D plot of temperature or precipitation data for a specific year
+            or years and region(s).
+
+            :param name: str, the name of the weather variable ("temper" or "precip")
+            :param years: list[int], optional, list of years to plot, if None, all years will be plotted
+            :param regions: list[int], optional, list of region IDs to plot, if None, all regions will be plotted
+            :param subtitle_part_text: str, optional, text to include in the plot subtitle
+            :return: None
+            """
+            if regions is None:
+                regions = []
+            if years is None:
+                years = []
+
+            def on_key_press(event: mpl.backend_bases.KeyEvent) -> None:
+                """
+                A function that is called when a key is pressed. If the pressed key is 'x', it closes all the figures.
+
+                :param event: The event object that contains information about the key press.
+                :return: None
+                """
+                if event.key.lower() == 'x':
+                    plt.close('all')
+
+            def update(val: Union[float, np.float64]) -> None:
+                """
+                A function that is called when the slider value is changed.
+                It sets the alpha (transparency) of the plot surface.
+
+                :param val: The new value of the slider.
+                :return: None
+                """
+                if len(regions) == 1:
+                    surf[0].set_alpha(val)
+                else:
+                    surf.set_alpha(val)
+
+            def scroll_event(event: mpl.backend_bases.MouseEvent) -> None:
+                """
+                A function that is called when the scroll wheel is used.
+                It increases or decreases the alpha (transparency) of the plot surface.
+
+                :param event: The event object that contains information about the scroll event.
+                :return: None
+                """
+                if event.button == 'up':
+                    alpha: float = min(1., pos.val + 0.02)
+                    pos.set_val(alpha)
+                elif event.button == 'down':
+                    alpha: float = max(0., pos.val - 0.02)
+                    pos.set_val(alpha)
+
+            def rotate_graph(_: mpl.backend_bases.KeyEvent) -> None:
+                """
+                This is a function that rotates the 3D plot view by changing the azimuth and
+                elevation angles of the plot based on keyboard keys.
+                The function also stores the time of the last rotation to avoid updating the plot too frequently.
+
+                :param _: Unused argument, required for compatibility with matplotlib callback functions.
+                :return: None
+                """
+                current_time: float = tim.time()
+                if current_time - self.last_time > 0.1:  # 200 ms
+                    if keyboard.is_pressed('right') and keyboard.is_pressed('up'):
+                        ax.view_init(elev=ax.elev - 5, azim=ax.azim - 5)
+                        ax.elev -= 5
+                        ax.azim -= 5
+                    elif keyboard.is_pressed('right') and keyboard.is_pressed('down'):
+                        ax.view_init(elev=ax.elev + 5, azim=ax.azim - 5)
+                        ax.elev += 5
+                        ax.azim -= 5
+                    elif keyboard.is_pressed('right'):
+                        ax.view_init(elev=ax.elev, azim=ax.azim - 5)
+                        ax.azim -= 5
+                    elif keyboard.is_pressed('left') and keyboard.is_pressed('up'):
+                        ax.view_init(elev=ax.elev - 5, azim=ax.azim + 5)
+                        ax.elev -= 5
+                        ax.azim += 5
+                    elif keyboard.is_pressed('left') and keyboard.is_pressed('down'):
+                        ax.view_init(elev=ax.elev + 5, azim=ax.azim + 5)
+                        ax.elev += 5
+                        ax.azim += 5
+                    elif keyboard.is_pressed('left'):
+                        ax.view_init(elev=ax.elev, azim=ax.azim + 5)
+                        ax.azim += 5
+                    elif keyboard.is_pressed('up'):
+                        ax.view_init(elev=ax.elev - 5, azim=ax.azim)
+                        ax.elev -= 5
+                    elif keyboard.is_pressed('down'):
+                        ax.view_init(elev=ax.elev + 5, azim=ax.azim)
+                        ax.elev += 5
+                    fig.canvas.draw()
+                    self.last_time = current_time
+
+            def update_text(ax, pos: list[float], text: str, is_temper: bool, bottom: bool) -> None:
+                """
+                Updates text in the given axis.
+
+                :param ax: The axis to update the text in.
                 :param pos: The position of the text.
                 :param text: The text to be updated.
                 :param is_temper: Whether the text is temperature data or not.
@@ -864,9 +2997,11 @@ class GraphPlotter:
                 z_min: np.ndarray = np.nanmin(zz)
                 z_max: np.ndarray = np.nanmax(zz)
                 z_mean: np.ndarray = np.nanmean(zz)
+                # Missing months (e.g. the rest of the current year) are left out
+                valid: np.ndarray = zz[np.isfinite(zz)]
                 if name == "precip" or (name == "temper" and bottom):
-                    z_hmean: np.ndarray = hmean(list(itertools.chain.from_iterable(zz)))
-                    z_gmean: np.ndarray = gmean(list(itertools.chain.from_iterable(zz)))
+                    z_hmean: np.ndarray = hmean(valid)
+                    z_gmean: np.ndarray = gmean(valid)
                 else:
                     z_hmean: float = 0
                     z_gmean: float = 0
@@ -875,32 +3010,45 @@ class GraphPlotter:
                 z_q3: float = np.nanpercentile(zz, 75)
                 z_var: np.ndarray = np.nanvar(zz)
                 z_std: np.ndarray = np.nanstd(zz)
-                z_skew: np.ndarray = skew(np.array(list(itertools.chain.from_iterable(zz))))
-                z_kurtosis: float = kurtosis(list(itertools.chain.from_iterable(zz)))
+                z_skew: np.ndarray = skew(valid)
+                z_kurtosis: float = kurtosis(valid)
+                # Bootstrap confidence intervals of all the statistics above
+                ci: dict[str, Union[tuple[float, float], int]] = self.bootstrap.confidence_intervals(zz)
+
+                def ci_str(key: str) -> str:
+                    """
+                    Formats the confidence interval of the given statistic.
+
+                    :param key: name of the statistic in the dictionary of confidence intervals
+                    :return: formatted confidence interval
+                    """
+                    return f" [{ci[key][0]:>8.2f};{ci[key][1]:>8.2f}]"
 
                 unit: str = "[K]   " if bottom else "[°C] " if name == 'temper' else "[mm] "
-                min_str: str = f"Minimum: {z_min:>8.2f} {unit}\n"
-                max_str: str = f"Maximum: {z_max:>8.2f} {unit}\n"
-                mean_str: str = f"Průměr: {z_mean:>8.2f} {unit}\n"
+                min_str: str = f"Minimum: {z_min:>8.2f}{ci_str('min')} {unit}\n"
+                max_str: str = f"Maximum: {z_max:>8.2f}{ci_str('max')} {unit}\n"
+                mean_str: str = f"Průměr: {z_mean:>8.2f}{ci_str('mean')} {unit}\n"
                 if name == "precip" or (name == "temper" and bottom):
-                    hmean_str: str = f"Harm. průměr: {z_hmean:>8.2f} {unit}\n"
-                    gmean_str: str = f"Geom. průměr: {z_gmean:>8.2f} {unit}\n"
+                    hmean_str: str = f"Harm. průměr: {z_hmean:>8.2f}{ci_str('hmean')} {unit}\n"
+                    gmean_str: str = f"Geom. průměr: {z_gmean:>8.2f}{ci_str('gmean')} {unit}\n"
                 else:
                     gmean_str: str = ""
                     hmean_str: str = ""
-                q1_str: str = f"1. kvartil: {z_q1:>8.2f} {unit}\n"
-                median_str: str = f"Medián: {z_median:>8.2f} {unit}\n"
-                q3_str: str = f"3. kvartil: {z_q3:>8.2f} {unit}\n"
+                q1_str: str = f"1. kvartil: {z_q1:>8.2f}{ci_str('q1')} {unit}\n"
+                median_str: str = f"Medián: {z_median:>8.2f}{ci_str('median')} {unit}\n"
+                q3_str: str = f"3. kvartil: {z_q3:>8.2f}{ci_str('q3')} {unit}\n"
                 idx: int = 4 if bottom else 2
-                var_str: str = f"Rozptyl: {z_var:>8.2f} {unit[:-idx] + '²' + unit[-idx:-1]}\n"
-                std_str: str = f"Směr. odchylka: {z_std:>8.2f} {unit}\n"
+                var_str: str = f"Rozptyl: {z_var:>8.2f}{ci_str('var')} {unit[:-idx] + '²' + unit[-idx:-1]}\n"
+                std_str: str = f"Směr. odchylka: {z_std:>8.2f}{ci_str('std')} {unit}\n"
                 space_size: int = 4 if name == 'temper' else 6
-                skew_str: str = f"Koef. šikmosti: {z_skew:>8.2f} [-]{' ' * space_size}\n"
-                kurtosis_str: str = f"Koef. špičatosti: {z_kurtosis:>8.2f} [-]{' ' * space_size}\n"
+                skew_str: str = f"Koef. šikmosti: {z_skew:>8.2f}{ci_str('skew')} [-]{' ' * space_size}\n"
+                kurtosis_str: str = f"Koef. špičatosti: {z_kurtosis:>8.2f}{ci_str('kurtosis')} [-]{' ' * space_size}\n"
 
                 pos: list[float] = [0.10, 0.95 if not bottom else 0.5]
                 text: str = min_str + max_str + mean_str + hmean_str + gmean_str + q1_str + median_str + q3_str
                 text += var_str + std_str + skew_str + kurtosis_str
+                text += f"[ ] {self.bootstrap.confidence * 100:.0f}% bootstrap interval spolehlivosti " \
+                        f"({ci['resamples']} výběrů)\n"
                 is_temper: bool = True if name == "temper" else False
                 fig.canvas.mpl_connect('resize_event', lambda event: update_text(ax, pos, text, is_temper, bottom))
 
@@ -918,12 +3066,8 @@ class GraphPlotter:
             yy: np.ndarray
             xx, yy = np.meshgrid(x, y)
 
-            # Replace comma with dot in the data and convert it to float
-            z: np.ndarray = weather_data.values
-            for i in range(z.shape[0]):
-                for j in range(z.shape[1]):
-                    z[i][j] = z[i][j].replace(',', '.')
-            zz: np.ndarray = z.astype(float)
+            # Convert the data to float, empty cells are NaN
+            zz: np.ndarray = self.to_float(weather_data.values)
 
             # Create the figure and subplot with 3D projection
             fig: mpl.figure.Figure
@@ -959,8 +3103,8 @@ class GraphPlotter:
             ax.set_yticklabels(sel_regions, rotation=60, ha='right')
 
             # Set the ticks and labels for the z-axis
-            z_min: np.float64 = min([min(elem) for elem in zz])
-            z_max: np.float64 = max([max(elem) for elem in zz])
+            z_min: np.float64 = np.nanmin(zz)
+            z_max: np.float64 = np.nanmax(zz)
             step: Union[np.float64, float] = (z_max - z_min) / 10.0
             ax.set_zticks(np.arange(np.floor(z_min), np.ceil(z_max) + step, step))
             ax.set_xlabel('Měsíce [-]', color='blue', va='bottom', labelpad=35)
@@ -984,7 +3128,7 @@ class GraphPlotter:
             fig.canvas.mpl_connect('scroll_event', scroll_event)
             fig.canvas.mpl_connect('key_press_event', on_key_press)
             # Display the final figure
-            fig.show()
+            self.display(fig)
 
         def control_years(min_year: int, max_year: int, temp_time_len: int) -> bool:
             """
@@ -1014,13 +3158,13 @@ class GraphPlotter:
 
         # Ask the user to input the years
         years: list[int]
-        if years := UserInterface.input_loop("Zadejte rok(y)", year=True) if not subtitle_part_text else predef_years:
+        if years := self.input_loop("Zadejte rok(y)", year=True) if not subtitle_part_text else predef_years:
             # Display the regions
             print("Kraje:") if not regions else regions
             print("\n".join([f"{i}) {region}" for i, region in enumerate(self.regions)])) if not regions else regions
             # Ask the user to input the regions
             regions: list[int]
-            if not (regions := UserInterface.input_loop("Zadejte kraj(e)", region=True) if not regions else regions):
+            if not (regions := self.input_loop("Zadejte kraj(e)", region=True) if not regions else regions):
                 return
 
             # Validate the input regions
@@ -1058,21 +3202,25 @@ class GraphPlotter:
 
     @Utils.debug
     @reset_data
-    def plot_2d_year_region(self) -> None:
+    def plot_2d_year_region(self, smooth: bool = False) -> None:
         """
         Create and display a 2D plot of temperature or precipitation data for a specific year(s) and region(s).
 
+        :param smooth: if True, series reconstructed from chosen DCT coefficients are drawn over the data
         :return: None
         """
 
-        def create_2d_plot(name: str, years: list = None, regions: list = None) -> None:
+        def create_2d_plot(name: str, years: list[int], regions: list[int], keep: int = 0,
+                           low_pass: bool = True) -> None:
             """
             This function creates and displays a 2D plot of temperature or precipitation data for a specific year
             or years and region(s).
 
             :param name: str, the name of the weather variable ("temper" or "precip")
-            :param years: list[int], optional, list of years to plot, if None, all years will be plotted
-            :param regions: list[int], optional, list of region IDs to plot, if None, all regions will be plotted
+            :param years: list[int], list of years to plot
+            :param regions: list[int], list of region IDs to plot
+            :param keep: int, number of kept DCT coefficients of the smoothed series, 0 means no smoothing
+            :param low_pass: bool, keep the lowest frequencies (True) or the largest coefficients (False)
             :return: None
             """
             def on_key_press(event: mpl.backend_bases.KeyEvent) -> None:
@@ -1143,9 +3291,11 @@ class GraphPlotter:
                 z_min: np.ndarray = np.nanmin(zz)
                 z_max: np.ndarray = np.nanmax(zz)
                 z_mean: np.ndarray = np.nanmean(zz)
+                # Missing months (e.g. the rest of the current year) are left out
+                valid: np.ndarray = zz[np.isfinite(zz)]
                 if name == "precip" or (name == "temper" and right):
-                    z_hmean: np.ndarray = hmean(list(itertools.chain.from_iterable(zz)))
-                    z_gmean: np.ndarray = gmean(list(itertools.chain.from_iterable(zz)))
+                    z_hmean: np.ndarray = hmean(valid)
+                    z_gmean: np.ndarray = gmean(valid)
                 else:
                     z_hmean: float = 0
                     z_gmean: float = 0
@@ -1154,51 +3304,51 @@ class GraphPlotter:
                 z_q3: float = np.nanpercentile(zz, 75)
                 z_var: np.ndarray = np.nanvar(zz)
                 z_std: np.ndarray = np.nanstd(zz)
-                z_skew: np.ndarray = skew(np.array(list(itertools.chain.from_iterable(zz))))
-                z_kurtosis: float = kurtosis(list(itertools.chain.from_iterable(zz)))
+                z_skew: np.ndarray = skew(valid)
+                z_kurtosis: float = kurtosis(valid)
+                # Bootstrap confidence intervals of all the statistics above
+                ci: dict[str, Union[tuple[float, float], int]] = self.bootstrap.confidence_intervals(zz)
+
+                def ci_str(key: str) -> str:
+                    """
+                    Formats the confidence interval of the given statistic.
+
+                    :param key: name of the statistic in the dictionary of confidence intervals
+                    :return: formatted confidence interval
+                    """
+                    return f" [{ci[key][0]:>8.2f};{ci[key][1]:>8.2f}]"
 
                 unit: str = "[K]   " if right else "[°C] " if name == 'temper' else "[mm] "
-                min_str: str = f"Minimum: {z_min:>8.2f} {unit}\n"
-                max_str: str = f"Maximum: {z_max:>8.2f} {unit}\n"
-                mean_str: str = f"Průměr: {z_mean:>8.2f} {unit}\n"
+                min_str: str = f"Minimum: {z_min:>8.2f}{ci_str('min')} {unit}\n"
+                max_str: str = f"Maximum: {z_max:>8.2f}{ci_str('max')} {unit}\n"
+                mean_str: str = f"Průměr: {z_mean:>8.2f}{ci_str('mean')} {unit}\n"
                 if name == "precip" or (name == "temper" and right):
-                    hmean_str: str = f"Harm. průměr: {z_hmean:>8.2f} {unit}\n"
-                    gmean_str: str = f"Geom. průměr: {z_gmean:>8.2f} {unit}\n"
+                    hmean_str: str = f"Harm. průměr: {z_hmean:>8.2f}{ci_str('hmean')} {unit}\n"
+                    gmean_str: str = f"Geom. průměr: {z_gmean:>8.2f}{ci_str('gmean')} {unit}\n"
                 else:
                     gmean_str: str = ""
                     hmean_str: str = ""
-                q1_str: str = f"1. kvartil: {z_q1:>8.2f} {unit}\n"
-                median_str: str = f"Medián: {z_median:>8.2f} {unit}\n"
-                q3_str: str = f"3. kvartil: {z_q3:>8.2f} {unit}\n"
+                q1_str: str = f"1. kvartil: {z_q1:>8.2f}{ci_str('q1')} {unit}\n"
+                median_str: str = f"Medián: {z_median:>8.2f}{ci_str('median')} {unit}\n"
+                q3_str: str = f"3. kvartil: {z_q3:>8.2f}{ci_str('q3')} {unit}\n"
                 idx: int = 4 if right else 2
-                var_str: str = f"Rozptyl: {z_var:>8.2f} {unit[:-idx] + '²' + unit[-idx:-1]}\n"
-                std_str: str = f"Směr. odchylka: {z_std:>8.2f} {unit}\n"
+                var_str: str = f"Rozptyl: {z_var:>8.2f}{ci_str('var')} {unit[:-idx] + '²' + unit[-idx:-1]}\n"
+                std_str: str = f"Směr. odchylka: {z_std:>8.2f}{ci_str('std')} {unit}\n"
                 space_size: int = 4 if name == 'temper' else 6
-                skew_str: str = f"Koef. šikmosti: {z_skew:>8.2f} [-]{' ' * space_size}\n"
-                kurtosis_str: str = f"Koef. špičatosti: {z_kurtosis:>8.2f} [-]{' ' * space_size}\n"
+                skew_str: str = f"Koef. šikmosti: {z_skew:>8.2f}{ci_str('skew')} [-]{' ' * space_size}\n"
+                kurtosis_str: str = f"Koef. špičatosti: {z_kurtosis:>8.2f}{ci_str('kurtosis')} [-]{' ' * space_size}\n"
 
                 pos: list[float] = [0.15 if not right else 0.75, 0.95]
                 text: str = min_str + max_str + mean_str + hmean_str + gmean_str + q1_str + median_str + q3_str
                 text += var_str + std_str + skew_str + kurtosis_str
+                text += f"[ ] {self.bootstrap.confidence * 100:.0f}% bootstrap interval spolehlivosti " \
+                        f"({ci['resamples']} výběrů)\n"
                 is_temper: bool = True if name == "temper" else False
                 fig.canvas.mpl_connect('resize_event', lambda event: update_text(ax, pos, text, is_temper, right))
 
-            # Make a copy of the weather data
-            weather_data = self.data[name].copy()
-            # Select the desired years and concatenate them along the 'col' dimension
-            weather_data = xr.concat([weather_data.isel(time=year - 1961) for year in years], dim='col')
-            # Select the desired regions
-            weather_data = weather_data.sel(row=regions)
-
-            x: np.ndarray = weather_data.coords['col'].values  # months
-            y: np.ndarray = weather_data.values
-            z: np.ndarray = weather_data.coords['row'].values  # regions
-
-            # Replace comma with dot in the data and convert it to float
-            for i in range(y.shape[0]):
-                for j in range(y.shape[1]):
-                    y[i][j] = y[i][j].replace(',', '.')
-            yy: np.ndarray = y.astype(float)
+            # Months of the chosen years concatenated along the time axis, empty cells are NaN
+            yy: np.ndarray = self.select(name, years, regions)
+            x: np.ndarray = np.arange(yy.shape[1])  # months
 
             fig: mpl.figure.Figure = plt.figure(figsize=(10, 5))
             years_str: str = ", ".join(map(str, years[:10])) + (", ..." if len(years) > 10 else "")
@@ -1208,8 +3358,18 @@ class GraphPlotter:
 
             sel_regions: list[str] = [self.regions[i] for i in regions]
             lines: list[mpl.lines.Line2D] = []
-            for i in range(len(z)):
+            for i in range(len(regions)):
                 lines += plt.plot(x, yy[i], label=sel_regions[i], alpha=1)
+            if keep:
+                # Series of all regions reconstructed from the kept DCT coefficients in one batched call
+                smoothed: np.ndarray = self.spectral.denoise(self.fill_gaps(yy), keep, low_pass)
+                # The filled months are only the input of the transform, they are not drawn
+                smoothed = np.where(np.isfinite(yy), smoothed, np.nan)
+                for i in range(len(regions)):
+                    plt.plot(x, smoothed[i], linestyle='--', color=lines[i].get_color(), linewidth=2)
+                subtitle_part_text += " (vyhlazeno, {} {} DCT koef.)".format(
+                    keep, "nejnižších" if low_pass else "největších")
+                fig.suptitle(subtitle_part_text)
             legend: mpl.legend.Legend = plt.legend(title='Kraje:')
             legend.set_bbox_to_anchor((1, 1))
 
@@ -1221,8 +3381,8 @@ class GraphPlotter:
             ax.set_xticklabels(month_labels, rotation=20, ha='right')
 
             # Set the ticks and labels for the y-axis
-            y_min: np.float64 = min([min(elem) for elem in yy])
-            y_max: np.float64 = max([max(elem) for elem in yy])
+            y_min: np.float64 = np.nanmin(yy)
+            y_max: np.float64 = np.nanmax(yy)
             step: Union[np.float64, float] = (y_max - y_min) / 10.0
             ax.set_yticks(np.arange(np.floor(y_min), np.ceil(y_max) + step, step))
             fig.subplots_adjust(bottom=0.2)  # Posunutí celého grafu nahoru o 0.1
@@ -1248,76 +3408,28 @@ class GraphPlotter:
             fig.canvas.mpl_connect('scroll_event', scroll_event)
             fig.canvas.mpl_connect('key_press_event', on_key_press)
             # Display the final figure
-            fig.show()
-
-        def control_years(min_year: int, max_year: int, temp_time_len: int) -> bool:
-            """
-            Checks if the given range of years is valid or not.
-
-            :param min_year: minimum year in the range
-            :param max_year: maximum year in the range
-            :param temp_time_len: length of the temperature data
-            :return: boolean indicating if the years are valid or not
-            """
-            if min_year < 1961 or max_year > 1961 + temp_time_len - 1:
-                print("Zadané roky nejsou v rozsahu 1961-" + str(1961 + temp_time_len - 1))
-                return False
-            return True
-
-        def control_regions(regions: list[int]) -> bool:
-            """
-            Controls whether the regions entered by the user are valid or not.
-
-            :param regions: A list of integers representing regions.
-            :return: A boolean indicating whether the regions are valid or not.
-            """
-            if min(regions) < 0 or max(regions) > 13:
-                print("Zadané kraje nejsou v rozsahu 0-13")
-                return False
-            return True
+            self.display(fig)
 
-        # Ask the user to input the years
+        # Ask the user to input the years and the regions
         years: list[int]
-        if years := UserInterface.input_loop("Zadejte rok(y)", year=True):
-            # Display the regions
-            print("Kraje:")
-            print("\n".join([f"{i}) {region}" for i, region in enumerate(self.regions)]))
-            # Ask the user to input the regions
-            regions: list[int]
-            if not (regions := UserInterface.input_loop("Zadejte kraj(e)", region=True)):
-                return
-
-            # Validate the input regions
-            if not control_regions(regions):
-                return
-
-            # Set the minimum and maximum years based on user input
-            min_year: int = min(years)
-            max_year: int = max(years)
-
-            # Create a 2D plot for temperature if selected by user
-            if self.temper_choose:
-                temp_data: xr.DataArray = self.data['temper'].copy()
-                temp_time_len: int = len(temp_data.coords['time'])
-
-                # Validate the input years for temperature
-                if not control_years(min_year, max_year, temp_time_len):
-                    return
-                create_2d_plot("temper", years, regions)
+        if not (years := self.ask_years()):
+            return
+        regions: list[int]
+        if not (regions := self.ask_regions()):
+            return
 
-            # Create a 2D plot for precipitation if selected by user
-            if self.precip_choose:
-                prec_data: xr.DataArray = self.data['precip'].copy()
-                prec_time_len: int = len(prec_data.coords['time'])
+        # Ask the user for the kept DCT coefficients of the smoothed series
+        keep: int = 0
+        low_pass: bool = True
+        if smooth:
+            low_pass = self.input_loop("Chcete zachovat nejnižší frekvence (jinak největší koeficienty)")
+            keep = self.input_loop(f"Zadejte počet zachovaných DCT koeficientů (1-{12 * len(years)})", number=True)
+            keep = min(keep, 12 * len(years))
 
-                # Validate the input years for temperature
-                if not control_years(min_year, max_year, prec_time_len):
-                    return
-                create_2d_plot("precip", years, regions)
-            # Show the plot to the user
-            plt.show()
-        else:
-            return
+        for name in self.chosen_names():
+            create_2d_plot(name, years, regions, keep, low_pass)
+        # Show the plot to the user
+        plt.show()
 
     @Utils.debug
     def plot_3d_hist_dct(self) -> None:
@@ -1327,7 +3439,7 @@ class GraphPlotter:
 
         :return: None
         """
-        self.plot_3d_hist_dct_year_region(predef_years=[year for year in range(2018, 2022 + 1)],
+        self.plot_3d_hist_dct_year_region(predef_years=self.last_years(5),
                                           subtitle_part_text="za posledních 5 let",
                                           regions=[region for region in range(0, 14)])
 
@@ -1438,24 +3550,8 @@ class GraphPlotter:
                     fig.canvas.draw()
                     self.last_time = current_time
 
-            # Make a copy of the weather data
-            weather_data: xr.DataArray = self.data[name].copy()
-            # Select the desired years and concatenate them along the 'col' dimension
-            weather_data: xr.DataArray = xr.concat([weather_data.isel(time=year - 1961) for year in years], dim='col')
-            # Select the desired regions
-            weather_data: xr.DataArray = weather_data.sel(row=regions)
-
-            z_pre: np.ndarray = weather_data.values
-            # Replace comma with dot in the data and convert it to float
-            for i in range(z_pre.shape[0]):
-                for j in range(z_pre.shape[1]):
-                    z_pre[i][j] = z_pre[i][j].replace(',', '.')
-            z_pre: np.ndarray = z_pre.astype(float)
-
-            # Calculate the Discrete Cosine Transform of the data for each region
-            dct_region: np.ndarray = np.zeros_like(z_pre)
-            for i in range(len(regions)):
-                dct_region[i, :] = dct(z_pre[i, :], type=2, norm='ortho')
+            # Discrete Cosine Transform of the data of all regions at once (cached for the selection)
+            dct_region: np.ndarray = self.dct_spectrum(name, years, regions)
 
             # Create the 3D plot
             fig: mpl.figure.Figure
@@ -1509,7 +3605,7 @@ class GraphPlotter:
             fig.canvas.mpl_connect('scroll_event', scroll_event)
             fig.canvas.mpl_connect('key_press_event', on_key_press)
             # display the figure
-            fig.show()
+            self.display(fig)
 
         def control_years(min_year: int, max_year: int, temp_time_len: int) -> bool:
             """
@@ -1539,13 +3635,13 @@ class GraphPlotter:
 
         # Ask the user to input the years
         years: list[int]
-        if years := UserInterface.input_loop("Zadejte rok(y)", year=True) if not subtitle_part_text else predef_years:
+        if years := self.input_loop("Zadejte rok(y)", year=True) if not subtitle_part_text else predef_years:
             # Display the regions
             print("Kraje:") if not regions else regions
             print("\n".join([f"{i}) {region}" for i, region in enumerate(self.regions)])) if not regions else regions
             # Ask the user to input the regions
             regions: list[int]
-            if not (regions := UserInterface.input_loop("Zadejte kraj(e)", region=True) if not regions else regions):
+            if not (regions := self.input_loop("Zadejte kraj(e)", region=True) if not regions else regions):
                 return
 
             # Validate the input regions
@@ -1637,23 +3733,8 @@ class GraphPlotter:
                     alpha = max(0., pos.val - 0.02)
                     pos.set_val(alpha)
 
-            # Make a copy of the weather data
-            weather_data: xr.DataArray = self.data[name].copy()
-            # Select the desired years and concatenate them along the 'col' dimension
-            weather_data: xr.DataArray = xr.concat([weather_data.isel(time=year - 1961) for year in years], dim='col')
-            # Select the desired regions
-            weather_data: xr.DataArray = weather_data.sel(row=regions)
-
-            z_pre: np.ndarray = weather_data.values
-            for i in range(z_pre.shape[0]):
-                for j in range(z_pre.shape[1]):
-                    z_pre[i][j] = z_pre[i][j].replace(',', '.')
-            z_pre: np.ndarray = z_pre.astype(float)
-
-            # Calculate the Discrete Cosine Transform of the data for each region
-            dct_region: np.ndarray = np.zeros_like(z_pre)
-            for i in range(len(regions)):
-                dct_region[i, :] = dct(z_pre[i, :], type=2, norm='ortho')
+            # Discrete Cosine Transform of the data of all regions at once (cached for the selection)
+            dct_region: np.ndarray = self.dct_spectrum(name, years, regions)
 
             fig: mpl.figure.Figure = plt.figure(figsize=(10, 5))
             years_str: str = ", ".join(map(str, years[:10])) + (", ..." if len(years) > 10 else "")
@@ -1702,7 +3783,7 @@ class GraphPlotter:
             fig.canvas.mpl_connect('scroll_event', scroll_event)
             fig.canvas.mpl_connect('key_press_event', on_key_press)
             # display the figure
-            fig.show()
+            self.display(fig)
 
         def control_years(min_year: int, max_year: int, temp_time_len: int) -> bool:
             """
@@ -1732,13 +3813,13 @@ class GraphPlotter:
 
         # Ask the user to input the years
         years: list[int]
-        if years := UserInterface.input_loop("Zadejte rok(y)", year=True):
+        if years := self.input_loop("Zadejte rok(y)", year=True):
             # Display the regions
             print("Kraje:")
             print("\n".join([f"{i}) {region}" for i, region in enumerate(self.regions)]))
             # Ask the user to input the regions
             regions: list[int]
-            if not (regions := UserInterface.input_loop("Zadejte kraj(e)", region=True)):
+            if not (regions := self.input_loop("Zadejte kraj(e)", region=True)):
                 return
 
             # Validate the input regions
@@ -1808,12 +3889,8 @@ class GraphPlotter:
             # Select the desired regions
             weather_data: xr.DataArray = weather_data.sel(row=regions)
 
-            z_pre: np.ndarray = weather_data.values
-            # Replace comma with dot in the data and convert it to float
-            for i in range(z_pre.shape[0]):
-                for j in range(z_pre.shape[1]):
-                    z_pre[i][j] = z_pre[i][j].replace(',', '.')
-            z_pre: np.ndarray = z_pre.astype(float)
+            # Convert the data to float, empty cells are NaN
+            z_pre: np.ndarray = self.to_float(weather_data.values)
 
             # Create the 2D plot
             fig: mpl.figure.Figure = plt.figure(figsize=(10, 5))
@@ -1828,7 +3905,7 @@ class GraphPlotter:
             box_width: float = 0.5  # Šířka boxplotu
 
             for i in range(num_boxplots):
-                ax.boxplot(z_pre[i, :], patch_artist=True, widths=box_width, positions=[i],
+                ax.boxplot(z_pre[i, np.isfinite(z_pre[i, :])], patch_artist=True, widths=box_width, positions=[i],
                            boxprops={'facecolor': cmap(i)}, medianprops={'color': 'k'})
 
             ax.set_xticklabels([self.regions[i] for i in regions], rotation=20, ha='right')
@@ -1847,7 +3924,7 @@ class GraphPlotter:
                 {'keymap.forward': ['d', 'D'], 'keymap.back': ['a', 'A'], 'keymap.save': ['s', 'S']})
             fig.canvas.mpl_connect('key_press_event', on_key_press)
             # display the figure
-            fig.show()
+            self.display(fig)
 
         def control_years(min_year: int, max_year: int, temp_time_len: int) -> bool:
             """
@@ -1877,13 +3954,13 @@ class GraphPlotter:
 
         # Ask the user to input the years
         years: list[int]
-        if years := UserInterface.input_loop("Zadejte rok(y)", year=True):
+        if years := self.input_loop("Zadejte rok(y)", year=True):
             # Display the regions
             print("Kraje:")
             print("\n".join([f"{i}) {region}" for i, region in enumerate(self.regions)]))
             # Ask the user to input the regions
             regions: list[int]
-            if not (regions := UserInterface.input_loop("Zadejte kraj(e)", region=True)):
+            if not (regions := self.input_loop("Zadejte kraj(e)", region=True)):
                 return
 
             # Validate the input regions
@@ -1960,47 +4037,192 @@ class GraphPlotter:
                                                        dim='col')
                 # Select the desired regions
                 weather_data: xr.DataArray = weather_data.sel(row=regions)
-                z_pre: np.ndarray = weather_data.values
-                # Replace comma with dot in the data and convert it to float
-                for i in range(z_pre.shape[0]):
-                    for j in range(z_pre.shape[1]):
-                        z_pre[i][j] = z_pre[i][j].replace(',', '.')
-                return z_pre.astype(float)
+                # Convert the data to float, empty cells are NaN
+                return self.to_float(weather_data.values)
+
+            # get weather data
+            z_pre1: np.ndarray = get_weather_data(self.data[name].copy())
+            name2: str = "temper" if name == "precip" else "precip"
+            z_pre2: np.ndarray
+            if self.precip_choose and self.temper_choose:
+                z_pre2 = get_weather_data(self.data[name2].copy())
+            else:
+                z_pre2 = z_pre1.copy()
+
+            # Create the 2D plot
+            fig: mpl.figure.Figure = plt.figure(figsize=(10, 5))
+            years_str: str = ", ".join(map(str, years[:10])) + (", ..." if len(years) > 10 else "")
+            temper_or_precip: str
+            if self.precip_choose and self.temper_choose:
+                temper_or_precip = "srážek na teplotě" if name == "temper" else "teplot na srážkách"
+            else:
+                temper_or_precip = "srážek na srážkách" if name == "precip" else "teplot na teplotách"
+            subtitle_part_text: str = "korelace {} za roky: {}".format(temper_or_precip, years_str)
+            fig.suptitle(subtitle_part_text)
+
+            # data normalization
+            z_pre1_norm: np.ndarray = (z_pre1 - np.nanmin(z_pre1)) / (np.nanmax(z_pre1) - np.nanmin(z_pre1))
+            z_pre2_norm: np.ndarray = (z_pre2 - np.nanmin(z_pre2)) / (np.nanmax(z_pre2) - np.nanmin(z_pre2))
+
+            # Draw a correlation diagram
+            plt.scatter(z_pre1_norm, z_pre2_norm)
+            xlabel_text: str = "Normované " + ('teploty [-]' if name == "temper" else 'srážky [-]')
+            ylabel_text: str
+            if self.precip_choose and self.temper_choose:
+                ylabel_text = "Normované " + ('srážky [-]' if name == "temper" else 'teploty [-]')
+            else:
+                ylabel_text = "Normované " + ('teploty [-]' if name == "temper" else 'srážky [-]')
+            plt.xlabel(xlabel_text, color='blue')
+            plt.ylabel(ylabel_text, color='blue')
+
+            # Perform a linear regression
+            slope: Union[np.float64, float]
+            intercept: Union[np.float64, float]
+            r_value: Union[np.float64, float]
+            p_value: Union[np.float64, float]
+            std_err: Union[np.float64, float]
+            slope, intercept, r_value, p_value, std_err = CorrelationAnalyzer.linregress(z_pre1_norm.ravel(),
+                                                                                         z_pre2_norm.ravel())
+
+            # Calculate the value of r^2 (coefficient of determination)
+            r_squared: Union[np.float64, float] = r_value ** 2
+
+            # Create a regression line
+            line_x: np.ndarray = np.array([0, 1])
+            line_y: np.ndarray = slope * line_x + intercept
+
+            plt.plot(line_x, line_y, 'r', label='Lineární regrese')
+            plt.text(0.025, 0.90, 'Koeficient korelace (r): {:.2f}'.format(r_value), ha='left', va='top',
+                     fontsize=10, transform=plt.gca().transAxes, color="#006600", alpha=0.8)
+            plt.text(0.025, 0.85, 'Koeficient determinace (r²): {:.2f}'.format(r_squared), ha='left', va='top',
+                     fontsize=10, transform=plt.gca().transAxes, color="#006600", alpha=0.8)
+            plt.legend()
+            plt.grid(True)
+
+            mpl.rcParams.update({'keymap.forward': ['d', 'D'], 'keymap.back': ['a', 'A'], 'keymap.save': ['s', 'S']})
+            fig.canvas.mpl_connect('key_press_event', on_key_press)
+            # display the figure
+            self.display(fig)
+
+        def control_years(min_year: int, max_year: int, temp_time_len: int) -> bool:
+            """
+            Checks if the given range of years is valid or not.
+
+            :param min_year: minimum year in the range
+            :param max_year: maximum year in the range
+            :param temp_time_len: length of the temperature data
+            :return: boolean indicating if the years are valid or not
+            """
+            if min_year < 1961 or max_year > 1961 + temp_time_len - 1:
+                print("Zadané roky nejsou v rozsahu 1961-" + str(1961 + temp_time_len - 1))
+                return False
+            return True
+
+        def control_regions(regions: list[int]) -> bool:
+            """
+            Controls whether the regions entered by the user are valid or not.
+
+            :param regions: A list of integers representing regions.
+            :return: A boolean indicating whether the regions are valid or not.
+            """
+            if min(regions) < 0 or max(regions) > 13:
+                print("Zadané kraje nejsou v rozsahu 0-13")
+                return False
+            return True
+
+        # Ask the user to input the years
+        years: list[int]
+        if years := self.input_loop("Zadejte rok(y)", year=True):
+            # Display the regions
+            print("Kraje:")
+            print("\n".join([f"{i}) {region}" for i, region in enumerate(self.regions)]))
+            # Ask the user to input the regions
+            regions: list[int]
+            if not (regions := self.input_loop("Zadejte kraj(e)", region=True)):
+                return
+
+            # Validate the input regions
+            if not control_regions(regions):
+                return
+
+            # Set the minimum and maximum years based on user input
+            min_year: int = min(years)
+            max_year: int = max(years)
+
+            # Create a 2D correlation plot for temperature if selected by user
+            if self.temper_choose:
+                temp_data: xr.DataArray = self.data['temper'].copy()
+                temp_time_len: int = len(temp_data.coords['time'])
+
+                # Validate the input years for temperature
+                if not control_years(min_year, max_year, temp_time_len):
+                    return
+                create_2d_plot("temper", years, regions)
+
+            # Create a 2D correlation plot for precipitation if selected by user
+            if self.precip_choose:
+                prec_data: xr.DataArray = self.data['precip'].copy()
+                prec_time_len: int = len(prec_data.coords['time'])
+
+                # Validate the input years for precipitation
+                if not control_years(min_year, max_year, prec_time_len):
+                    return
+                create_2d_plot("precip", years, regions)
+            # Show the plot to the user
+            plt.show()
+        else:
+            return
+
+    @Utils.debug
+    @reset_data
+    def plot_corr_year_region(self) -> None:
+        """
+        Create and display a correlation plot between two regions for a specific year(s).
+
+        :return: None
+        """
+        def create_2d_plot(name: str, years: list = None, region1: int = 0, region2: int = 0):
+            """
+            Visualize the correlation between two regions for a given weather variable.
+
+            :param name: str, the name of the weather variable ("temper" or "precip")
+            :param years: list[int], optional, list of years to plot, if None, all years will be plotted
+            :param region1: int, ID of the first region
+            :param region2: int, ID of the second region
+            :return: None
+            """
+            def on_key_press(event: mpl.backend_bases.KeyEvent) -> None:
+                """
+                A function that is called when a key is pressed. If the pressed key is 'x', it closes all the figures.
+
+                :param event: The event object that contains information about the key press.
+                :return: None
+                """
+                if event.key.lower() == 'x':
+                    plt.close('all')
 
-            # get weather data
-            z_pre1: np.ndarray = get_weather_data(self.data[name].copy())
-            name2: str = "temper" if name == "precip" else "precip"
+            # get weather data of both regions from the numeric cube in one selection
+            z_pre1: np.ndarray
             z_pre2: np.ndarray
-            if self.precip_choose and self.temper_choose:
-                z_pre2 = get_weather_data(self.data[name2].copy())
-            else:
-                z_pre2 = z_pre1.copy()
+            z_pre1, z_pre2 = self.select(name, years, [region1, region2])[:, None, :]
 
             # Create the 2D plot
             fig: mpl.figure.Figure = plt.figure(figsize=(10, 5))
             years_str: str = ", ".join(map(str, years[:10])) + (", ..." if len(years) > 10 else "")
-            temper_or_precip: str
-            if self.precip_choose and self.temper_choose:
-                temper_or_precip = "srážek na teplotě" if name == "temper" else "teplot na srážkách"
-            else:
-                temper_or_precip = "srážek na srážkách" if name == "precip" else "teplot na teplotách"
-            subtitle_part_text: str = "korelace {} za roky: {}".format(temper_or_precip, years_str)
+            temper_or_precip: str = "teplot" if name == "temper" else "srážek"
+            subtitle_part_text: str = "Korelace {} za roky: {}".format(temper_or_precip, years_str)
             fig.suptitle(subtitle_part_text)
 
             # data normalization
-            z_pre1_norm: np.ndarray = (z_pre1 - np.min(z_pre1)) / (np.max(z_pre1) - np.min(z_pre1))
-            z_pre2_norm: np.ndarray = (z_pre2 - np.min(z_pre2)) / (np.max(z_pre2) - np.min(z_pre2))
+            z_pre1_norm: np.ndarray = (z_pre1 - np.nanmin(z_pre1)) / (np.nanmax(z_pre1) - np.nanmin(z_pre1))
+            z_pre2_norm: np.ndarray = (z_pre2 - np.nanmin(z_pre2)) / (np.nanmax(z_pre2) - np.nanmin(z_pre2))
 
             # Draw a correlation diagram
             plt.scatter(z_pre1_norm, z_pre2_norm)
-            xlabel_text: str = "Normované " + ('teploty [-]' if name == "temper" else 'srážky [-]')
-            ylabel_text: str
-            if self.precip_choose and self.temper_choose:
-                ylabel_text = "Normované " + ('srážky [-]' if name == "temper" else 'teploty [-]')
-            else:
-                ylabel_text = "Normované " + ('teploty [-]' if name == "temper" else 'srážky [-]')
-            plt.xlabel(xlabel_text, color='blue')
-            plt.ylabel(ylabel_text, color='blue')
+            plt.xlabel("Normované " + ('teploty' if name == "temper" else 'srážky') + " pro kraj " +
+                       self.regions[region1] + " [-]", color='blue')
+            plt.ylabel("Normované " + ('teploty' if name == "temper" else 'srážky') + " pro kraj " +
+                       self.regions[region2] + " [-]", color='blue')
 
             # Perform a linear regression
             slope: Union[np.float64, float]
@@ -2008,7 +4230,8 @@ class GraphPlotter:
             r_value: Union[np.float64, float]
             p_value: Union[np.float64, float]
             std_err: Union[np.float64, float]
-            slope, intercept, r_value, p_value, std_err = linregress(z_pre1_norm.ravel(), z_pre2_norm.ravel())
+            slope, intercept, r_value, p_value, std_err = CorrelationAnalyzer.linregress(z_pre1_norm.ravel(),
+                                                                                         z_pre2_norm.ravel())
 
             # Calculate the value of r^2 (coefficient of determination)
             r_squared: Union[np.float64, float] = r_value ** 2
@@ -2028,7 +4251,7 @@ class GraphPlotter:
             mpl.rcParams.update({'keymap.forward': ['d', 'D'], 'keymap.back': ['a', 'A'], 'keymap.save': ['s', 'S']})
             fig.canvas.mpl_connect('key_press_event', on_key_press)
             # display the figure
-            fig.show()
+            self.display(fig)
 
         def control_years(min_year: int, max_year: int, temp_time_len: int) -> bool:
             """
@@ -2058,17 +4281,32 @@ class GraphPlotter:
 
         # Ask the user to input the years
         years: list[int]
-        if years := UserInterface.input_loop("Zadejte rok(y)", year=True):
+        if years := self.input_loop("Zadejte rok(y)", year=True):
             # Display the regions
             print("Kraje:")
             print("\n".join([f"{i}) {region}" for i, region in enumerate(self.regions)]))
-            # Ask the user to input the regions
-            regions: list[int]
-            if not (regions := UserInterface.input_loop("Zadejte kraj(e)", region=True)):
+            # Ask the user to input the first region
+            region1: list[int]
+            if not (region1 := self.input_loop("Zadejte první kraj", region=True)):
                 return
 
-            # Validate the input regions
-            if not control_regions(regions):
+            # Validate the input first region
+            if not control_regions(region1):
+                return
+            if len(region1) > 1:
+                print("Zadali jste více než jeden kraj")
+                return
+
+            # Ask the user to input the second region
+            region2: list[int]
+            if not (region2 := self.input_loop("Zadejte druhý kraj", region=True)):
+                return
+
+            # Validate the input second region
+            if not control_regions(region2):
+                return
+            if len(region2) > 1:
+                print("Zadali jste více než jeden kraj")
                 return
 
             # Set the minimum and maximum years based on user input
@@ -2083,9 +4321,9 @@ class GraphPlotter:
                 # Validate the input years for temperature
                 if not control_years(min_year, max_year, temp_time_len):
                     return
-                create_2d_plot("temper", years, regions)
+                create_2d_plot("temper", years, region1.copy()[0], region2.copy()[0])
 
-            # Create a 2D correlation plot for precipitation if selected by user
+            # Create a 2D correlation plot for temperature if selected by user
             if self.precip_choose:
                 prec_data: xr.DataArray = self.data['precip'].copy()
                 prec_time_len: int = len(prec_data.coords['time'])
@@ -2093,194 +4331,901 @@ class GraphPlotter:
                 # Validate the input years for precipitation
                 if not control_years(min_year, max_year, prec_time_len):
                     return
-                create_2d_plot("precip", years, regions)
+                create_2d_plot("precip", years, region1.copy()[0], region2.copy()[0])
             # Show the plot to the user
             plt.show()
         else:
             return
 
     @Utils.debug
-    @reset_data
-    def plot_corr_year_region(self) -> None:
+    def plot_rolling_region(self) -> None:
         """
-        Create and display a correlation plot between two regions for a specific year(s).
+        Create and display moving means with a band of moving standard deviations of temperature or precipitation
+        data over the whole history for the chosen region(s) and window length.
 
         :return: None
         """
-        def create_2d_plot(name: str, years: list = None, region1: int = 0, region2: int = 0):
+
+        def create_2d_plot(name: str, regions: list[int], window: int) -> None:
             """
-            Visualize the correlation between two regions for a given weather variable.
+            Creates a 2D plot of moving statistics for the given weather variable.
 
             :param name: str, the name of the weather variable ("temper" or "precip")
-            :param years: list[int], optional, list of years to plot, if None, all years will be plotted
-            :param region1: int, ID of the first region
-            :param region2: int, ID of the second region
+            :param regions: list[int], list of region IDs to plot
+            :param window: int, window length in months
             :return: None
             """
-            def on_key_press(event: mpl.backend_bases.KeyEvent) -> None:
-                """
-                A function that is called when a key is pressed. If the pressed key is 'x', it closes all the figures.
+            rolling: dict[str, np.ndarray] = self.rolling(name, window, regions)
 
-                :param event: The event object that contains information about the key press.
-                :return: None
-                """
-                if event.key.lower() == 'x':
-                    plt.close('all')
+            fig: mpl.figure.Figure = plt.figure(figsize=(10, 5))
+            fig.suptitle("Klouzavý průměr {} (okno {} měsíců)".format("teplot" if name == 'temper' else "srážek",
+                                                                      window))
+            ax = plt.gca()
+            for i, region in enumerate(regions):
+                line: list[mpl.lines.Line2D] = ax.plot(rolling["time"], rolling["mean"][i], label=self.regions[region])
+                # Band of ± one moving standard deviation around the moving mean
+                ax.fill_between(rolling["time"], rolling["mean"][i] - rolling["std"][i],
+                                rolling["mean"][i] + rolling["std"][i], color=line[0].get_color(), alpha=0.15)
+            legend: mpl.legend.Legend = plt.legend(title='Kraje:')
+            legend.set_bbox_to_anchor((1, 1))
+            plt.grid(True)
+            fig.subplots_adjust(right=0.75)
+            ax.set_xlabel('Roky [-]', color='blue')
+            ax.set_ylabel('Teplota [°C]' if name == 'temper' else 'Srážky [mm]', color='blue')
+            self.show_figure(fig)
 
-            def get_weather_data(weather_data: xr.DataArray, region: int) -> np.ndarray:
-                """
-                This function takes a xarray DataArray weather_data and returns a numpy ndarray z_pre
-                containing the weather data for the specified years and regions.
+        # Ask the user to input the regions and the window length
+        regions: list[int]
+        if not (regions := self.ask_regions()):
+            return
+        window: int = self.input_loop("Zadejte délku okna v měsících (12, 120 = 10 let, 360 = 30 let)",
+                                      number=True)
+        if window > min(cube.shape[0] * cube.shape[2] for cube in self.cube.values()):
+            print("Okno je delší než celá časová řada")
+            return
 
-                :param weather_data: xarray DataArray containing the weather data
-                :param region: the ID of the region for which the weather data will be returned
-                :return: numpy ndarray containing the weather data for the specified years and regions
-                """
-                # Select the desired years and concatenate them along the 'col' dimension
-                weather_data: xr.DataArray = xr.concat([weather_data.isel(time=year - 1961) for year in years],
-                                                       dim='col')
-                # Select the desired regions
-                weather_data: xr.DataArray = weather_data.sel(row=[region])
-                z_pre: np.ndarray = weather_data.values
-                # Replace comma with dot in the data and convert it to float
-                for i in range(z_pre.shape[0]):
-                    for j in range(z_pre.shape[1]):
-                        z_pre[i][j] = z_pre[i][j].replace(',', '.')
-                return z_pre.astype(float)
+        for name in self.chosen_names():
+            create_2d_plot(name, regions, window)
+        # Show the plot to the user
+        plt.show()
+
+    @Utils.debug
+    def plot_trend_year(self) -> None:
+        """
+        Create and display a heatmap of Sen's slopes of temperature or precipitation data for every region and
+        calendar month of the chosen years, statistically significant trends (Mann-Kendall, p < 0.05) are marked.
+
+        :return: None
+        """
+
+        def create_heatmap(name: str, years: list[int]) -> None:
+            """
+            Creates a heatmap of trends for the given weather variable.
+
+            :param name: str, the name of the weather variable ("temper" or "precip")
+            :param years: list[int], list of years
+            :return: None
+            """
+            trends: dict[str, np.ndarray] = self.trends(name, years)
+            per_decade: np.ndarray = trends["sen"] * 10
+
+            fig: mpl.figure.Figure = plt.figure(figsize=(10, 6))
+            years_str: str = ", ".join(map(str, years[:10])) + (", ..." if len(years) > 10 else "")
+            fig.suptitle("Trend {} (Senův odhad) za roky: {}".format("teplot" if name == 'temper' else "srážek",
+                                                                     years_str))
+            ax = plt.gca()
+            # Symmetric colour scale, so that zero trend is always white
+            limit: float = float(np.nanmax(np.abs(per_decade))) if np.isfinite(per_decade).any() else 1.
+            # NaN is truthy, so the fallback is explicit (e.g. all slopes are missing for a single year)
+            if not (np.isfinite(limit) and limit > 0):
+                limit = 1.
+            image: mpl.image.AxesImage = ax.imshow(per_decade, cmap='RdBu_r' if name == 'temper' else 'BrBG',
+                                                   vmin=-limit, vmax=limit, aspect='auto')
+            colorbar: mpl.colorbar.Colorbar = fig.colorbar(image, ax=ax)
+            colorbar.set_label('Trend ' + ('[°C/10 let]' if name == 'temper' else '[mm/10 let]'), color='blue')
+
+            # Mark significant trends with a star
+            for region, month in zip(*np.nonzero(trends["p"] < 0.05)):
+                ax.text(month, region, '*', ha='center', va='center', fontsize=12)
+
+            ax.set_xticks(np.arange(len(self.months)))
+            ax.set_xticklabels(self.months, rotation=20, ha='right')
+            ax.set_yticks(np.arange(len(self.regions)))
+            ax.set_yticklabels(self.regions)
+            ax.set_xlabel('Měsíce [-] (* Mann-Kendall p < 0,05)', color='blue')
+            fig.subplots_adjust(left=0.2, bottom=0.2)
+            self.show_figure(fig)
+
+        # Ask the user to input the years
+        years: list[int]
+        if not (years := self.ask_years()):
+            return
+        if len(years) < 3:
+            print("Pro výpočet trendu zadejte alespoň 3 roky")
+            return
+
+        for name in self.chosen_names():
+            create_heatmap(name, years)
+        # Show the plot to the user
+        plt.show()
+
+    @Utils.debug
+    def plot_spectrogram_region(self) -> None:
+        """
+        Create and display sliding-window DCT spectrograms of temperature or precipitation data over the whole
+        history, one image per chosen region.
+
+        :return: None
+        """
+
+        def create_spectrogram(name: str, regions: list[int], window: int) -> None:
+            """
+            Creates a figure with one spectrogram image per region for the given weather variable.
+
+            :param name: str, the name of the weather variable ("temper" or "precip")
+            :param regions: list[int], list of region IDs to plot
+            :param window: int, window length in months
+            :return: None
+            """
+            spectrogram: dict[str, np.ndarray] = self.spectrogram(name, window, regions)
+            # Logarithmic scale, so that the annual cycle does not hide the weaker components
+            power: np.ndarray = np.log10(spectrogram["power"] + 1e-6)
+            # Colour range without the rare (almost) zero coefficients
+            v_min: float
+            v_max: float
+            v_min, v_max = np.percentile(power, [1, 100])
+            extent: list[float] = [spectrogram["time"][0], spectrogram["time"][-1], spectrogram["freq"][0],
+                                   spectrogram["freq"][-1]]
+
+            n_cols: int = 1 if len(regions) == 1 else 2
+            n_rows: int = int(np.ceil(len(regions) / n_cols))
+            fig: mpl.figure.Figure
+            fig, axes = plt.subplots(n_rows, n_cols, figsize=(12, 2.5 * n_rows + 1), squeeze=False, sharex=True)
+            fig.suptitle("Spektrogram {} (okno {} měsíců)".format("teplot" if name == 'temper' else "srážek", window))
+            for ax, i in itertools.zip_longest(axes.ravel(), range(len(regions))):
+                if i is None:
+                    ax.set_visible(False)  # unused cell of the grid
+                    continue
+                image: mpl.image.AxesImage = ax.imshow(power[i].T, origin='lower', aspect='auto', extent=extent,
+                                                       vmin=v_min, vmax=v_max, cmap='viridis')
+                ax.set_title(self.regions[regions[i]], fontsize=10)
+                ax.set_ylabel('Frekvence [1/měsíc]', color='blue', fontsize=8)
+            for ax in axes[-1]:
+                ax.set_xlabel('Roky [-]', color='blue')
+            colorbar: mpl.colorbar.Colorbar = fig.colorbar(image, ax=axes.ravel().tolist())
+            colorbar.set_label('log10 absolutní hodnoty spektra', color='blue')
+            self.show_figure(fig)
+
+        # Ask the user to input the regions and the window length
+        regions: list[int]
+        if not (regions := self.ask_regions()):
+            return
+        window: int = self.input_loop("Zadejte délku okna v měsících (např. 60)", number=True)
+        if window < 2 or window > min(cube.shape[0] * cube.shape[2] for cube in self.cube.values()):
+            print("Okno musí mít alespoň 2 měsíce a nesmí být delší než celá časová řada")
+            return
+
+        for name in self.chosen_names():
+            create_spectrogram(name, regions, window)
+        # Show the plot to the user
+        plt.show()
+
+    @Utils.debug
+    def plot_psd_year_region(self) -> None:
+        """
+        Create and display a comparison of power spectral densities (Welch's method or periodogram) of temperature
+        or precipitation data of the chosen regions for a specific year(s), and print the power of the annual
+        and semiannual cycle.
+
+        :return: None
+        """
+
+        def create_2d_plot(name: str, years: list[int], regions: list[int], segment: Optional[int],
+                           overlap: Optional[int]) -> None:
+            """
+            Creates a 2D plot of power spectral densities for the given weather variable.
+
+            :param name: str, the name of the weather variable ("temper" or "precip")
+            :param years: list[int], list of years
+            :param regions: list[int], list of region IDs to plot
+            :param segment: segment length in months for Welch's method, None for the periodogram
+            :param overlap: overlap of the segments in months
+            :return: None
+            """
+            freq: np.ndarray
+            density: np.ndarray
+            freq, density = self.spectral.psd(self.select(name, years, regions, fill=True), segment, overlap)
+
+            fig: mpl.figure.Figure = plt.figure(figsize=(10, 5))
+            years_str: str = ", ".join(map(str, years[:10])) + (", ..." if len(years) > 10 else "")
+            method: str = "periodogram" if segment is None else f"Welch, segment {segment} měsíců, překryv {overlap}"
+            fig.suptitle("Spektrální hustota výkonu {} za roky: {}\n({})".format(
+                "teplot" if name == 'temper' else "srážek", years_str, method))
+            ax = plt.gca()
+            for i, region in enumerate(regions):
+                # The zero frequency is left out because of the logarithmic scale
+                ax.semilogy(freq[1:], density[i, 1:], label=self.regions[region])
+            for cycle in (1, 2):
+                ax.axvline(cycle, color='gray', linestyle='--', linewidth=1)
+            legend: mpl.legend.Legend = plt.legend(title='Kraje:')
+            legend.set_bbox_to_anchor((1, 1))
+            plt.grid(True)
+            fig.subplots_adjust(right=0.75)
+            ax.set_xlabel('Frekvence [1/rok]', color='blue')
+            ax.set_ylabel('Hustota výkonu ' + ('[°C²·rok]' if name == 'temper' else '[mm²·rok]'), color='blue')
+
+            # Power of the annual and semiannual cycle
+            power: np.ndarray = self.spectral.cycle_power(freq, density)
+            print("Spektrální hustota {} (roční / půlroční cyklus):".format("teplot" if name == 'temper' else "srážek"))
+            for i, region in enumerate(regions):
+                print(f"{self.regions[region]:>22}: {power[i, 0]:>12.2f} / {power[i, 1]:>12.2f}")
+            self.show_figure(fig)
+
+        # Ask the user to input the years, the regions and the method
+        years: list[int]
+        if not (years := self.ask_years()):
+            return
+        regions: list[int]
+        if not (regions := self.ask_regions()):
+            return
+        segment: Optional[int] = None
+        overlap: Optional[int] = None
+        if self.input_loop("Chcete použít Welchovu metodu (jinak periodogram)"):
+            segment = self.input_loop("Zadejte délku segmentu v měsících (např. 60)", number=True)
+            if segment > 12 * len(years):
+                print("Segment je delší než zvolené roky")
+                return
+            percent: int = self.input_loop("Zadejte překryv segmentů v % (1-99, obvykle 50)", number=True)
+            if percent > 99:
+                print("Překryv musí být menší než 100 %")
+                return
+            overlap = segment * percent // 100
+
+        for name in self.chosen_names():
+            create_2d_plot(name, years, regions, segment, overlap)
+        # Show the plot to the user
+        plt.show()
+
+    @Utils.debug
+    def plot_corr_matrix_year_region(self) -> None:
+        """
+        Create and display heatmaps of Pearson and Spearman correlation matrices between the chosen regions
+        for a specific year(s), the regions are ordered by hierarchical clustering.
+
+        :return: None
+        """
+
+        def create_heatmaps(name: str, years: list[int], regions: list[int]) -> None:
+            """
+            Creates Pearson and Spearman correlation heatmaps for the given weather variable.
+
+            :param name: str, the name of the weather variable ("temper" or "precip")
+            :param years: list[int], list of years
+            :param regions: list[int], list of region IDs
+            :return: None
+            """
+            block: np.ndarray = self.select(name, years, regions)
+            # Only the months known in all regions are compared
+            block = block[:, np.isfinite(block).all(axis=0)]
+            pearson: np.ndarray = CorrelationAnalyzer.pearson(block)
+            spearman: np.ndarray = CorrelationAnalyzer.spearman(block)
+            # Both matrices are shown in the order of the clustering of the Pearson correlations
+            order: np.ndarray = CorrelationAnalyzer.hierarchical_order(pearson)
+            labels: list[str] = [self.regions[regions[i]] for i in order]
+
+            fig: mpl.figure.Figure
+            fig, axes = plt.subplots(1, 2, figsize=(14, 6))
+            years_str: str = ", ".join(map(str, years[:10])) + (", ..." if len(years) > 10 else "")
+            fig.suptitle("Korelační matice {} za roky: {}".format("teplot" if name == 'temper' else "srážek",
+                                                                  years_str))
+            for ax, corr, title in zip(axes, (pearson, spearman), ("Pearson", "Spearman")):
+                ordered: np.ndarray = corr[np.ix_(order, order)]
+                image: mpl.image.AxesImage = ax.imshow(ordered, cmap='RdBu_r', vmin=-1, vmax=1)
+                for i, j in itertools.product(range(len(order)), repeat=2):
+                    ax.text(j, i, f"{ordered[i, j]:.2f}", ha='center', va='center', fontsize=6)
+                ax.set_title(title)
+                ax.set_xticks(np.arange(len(order)))
+                ax.set_xticklabels(labels, rotation=60, ha='right', fontsize=8)
+                ax.set_yticks(np.arange(len(order)))
+                # Both heatmaps share the order of the regions, so only the first one has the labels
+                ax.set_yticklabels(labels if ax is axes[0] else [], fontsize=8)
+            fig.subplots_adjust(left=0.12, bottom=0.25, wspace=0.05)
+            colorbar: mpl.colorbar.Colorbar = fig.colorbar(image, ax=axes.tolist())
+            colorbar.set_label('Koeficient korelace [-]', color='blue')
+            self.show_figure(fig)
+
+        # Ask the user to input the years and the regions
+        years: list[int]
+        if not (years := self.ask_years()):
+            return
+        regions: list[int]
+        if not (regions := self.ask_regions()):
+            return
+        if len(regions) < 2:
+            print("Zadejte alespoň 2 kraje")
+            return
+
+        for name in self.chosen_names():
+            create_heatmaps(name, years, regions)
+        # Show the plot to the user
+        plt.show()
+
+    @Utils.debug
+    def plot_lagged_corr_region(self) -> None:
+        """
+        Create and display lagged cross-correlations between temperature and precipitation anomalies over
+        the whole history for the chosen region(s), and print the lag and strength of the peak.
+
+        :return: None
+        """
+        if not (self.temper_choose and self.precip_choose):
+            print("Pro tento graf je potřeba pracovat s teplotami i se srážkami")
+            return
+
+        # Ask the user to input the regions and the largest lag
+        regions: list[int]
+        if not (regions := self.ask_regions()):
+            return
+        max_lag: int = self.input_loop("Zadejte největší posun v měsících (např. 24)", number=True)
+        if max_lag >= 12 * min(len(cube) for cube in self.cube.values()):
+            print("Posun je delší než celá časová řada")
+            return
+
+        result: dict[str, np.ndarray] = self.lagged_correlation(max_lag, regions)
+
+        fig: mpl.figure.Figure = plt.figure(figsize=(10, 5))
+        fig.suptitle("Vzájemná korelace odchylek teplot a srážek s posunem (celá historie)")
+        ax = plt.gca()
+        print("Nejsilnější korelace (posun > 0: srážky následují teploty):")
+        for i, region in enumerate(regions):
+            line: list[mpl.lines.Line2D] = ax.plot(result["lags"], result["ccf"][i], label=self.regions[region])
+            ax.plot(result["peak_lag"][i], result["peak"][i], 'o', color=line[0].get_color())
+            print(f"{self.regions[region]:>22}: posun {result['peak_lag'][i]:>4d} měsíců, r = {result['peak'][i]:.2f}")
+        ax.axvline(0, color='gray', linestyle='--', linewidth=1)
+        legend: mpl.legend.Legend = plt.legend(title='Kraje:')
+        legend.set_bbox_to_anchor((1, 1))
+        plt.grid(True)
+        fig.subplots_adjust(right=0.75)
+        ax.set_xlabel('Posun [měsíce]', color='blue')
+        ax.set_ylabel('Koeficient korelace [-]', color='blue')
+        self.show_figure(fig)
+        # Show the plot to the user
+        plt.show()
+
+    @Utils.debug
+    def plot_anomaly_year_region(self) -> None:
+        """
+        Create and display a heatmap of anomalies of temperature or precipitation data of the chosen regions
+        for a specific year(s), the anomalies are read from the precomputed layers.
+
+        :return: None
+        """
+        layers: dict[int, tuple[str, str]] = {1: ("diff", "rozdíl od normálu"),
+                                              2: ("deviation", "odchylka publikovaná ČHMÚ"),
+                                              3: ("z_1961-1990", "z-skóre vůči normálu 1961-1990"),
+                                              4: ("z_1991-2020", "z-skóre vůči normálu 1991-2020")}
+
+        def create_heatmap(name: str, years: list[int], regions: list[int], layer: str, label: str) -> None:
+            """
+            Creates a heatmap of anomalies (regions × months of the chosen years) for the given weather variable.
+
+            :param name: str, the name of the weather variable ("temper" or "precip")
+            :param years: list[int], list of years
+            :param regions: list[int], list of region IDs to plot
+            :param layer: str, the name of the anomaly layer
+            :param label: str, the description of the anomaly layer
+            :return: None
+            """
+            if layer not in self.anomaly_layers[name].layers:
+                print("Data nepokrývají celé referenční období")
+                return
+            block: np.ndarray = self.anomaly(name, layer, years, regions)
+            series: np.ndarray = block.transpose(1, 0, 2).reshape(len(regions), -1)
+            unit: str
+            if layer == "deviation":
+                # Precipitation deviations are published as a percentage of the normal, 100 % means no anomaly
+                series = series - (0 if name == 'temper' else 100)
+                unit = '[°C]' if name == 'temper' else '[% normálu - 100 %]'
+            elif layer == "diff":
+                unit = '[°C]' if name == 'temper' else '[mm]'
+            else:
+                unit = '[-]'
+
+            fig: mpl.figure.Figure = plt.figure(figsize=(12, 5))
+            years_str: str = ", ".join(map(str, years[:10])) + (", ..." if len(years) > 10 else "")
+            fig.suptitle("Odchylky {} ({}) za roky: {}".format("teplot" if name == 'temper' else "srážek", label,
+                                                               years_str))
+            ax = plt.gca()
+            # Symmetric colour scale, so that zero anomaly is always white
+            limit: float = float(np.nanmax(np.abs(series))) if np.isfinite(series).any() else 1.
+            image: mpl.image.AxesImage = ax.imshow(series, cmap='RdBu_r' if name == 'temper' else 'BrBG',
+                                                   vmin=-(limit or 1.), vmax=limit or 1., aspect='auto',
+                                                   interpolation='nearest')
+            colorbar: mpl.colorbar.Colorbar = fig.colorbar(image, ax=ax)
+            colorbar.set_label('Odchylka ' + unit, color='blue')
+            # One tick per year, or per month if there are only a few years
+            if len(years) <= 2:
+                ax.set_xticks(np.arange(12 * len(years)))
+                ax.set_xticklabels([f"{month} {year}" for year in years for month in self.months],
+                                   rotation=60, ha='right', fontsize=8)
+            else:
+                step: int = max(1, len(years) // 20)
+                ax.set_xticks(np.arange(0, 12 * len(years), 12 * step))
+                ax.set_xticklabels(years[::step], rotation=60, ha='right', fontsize=8)
+            ax.set_yticks(np.arange(len(regions)))
+            ax.set_yticklabels([self.regions[region] for region in regions])
+            ax.set_xlabel('Měsíce [-]', color='blue')
+            fig.subplots_adjust(left=0.2, bottom=0.25)
+
+            # Mean anomaly of every region over the chosen years
+            print("Průměrná odchylka {} ({}):".format("teplot" if name == 'temper' else "srážek", label))
+            for i, region in enumerate(regions):
+                print(f"{self.regions[region]:>22}: {np.nanmean(series[i]):>8.2f} {unit}")
+            self.show_figure(fig)
+
+        # Ask the user to input the years, the regions and the kind of the anomaly
+        years: list[int]
+        if not (years := self.ask_years()):
+            return
+        regions: list[int]
+        if not (regions := self.ask_regions()):
+            return
+        print("\n".join([f"{key}) {label}" for key, (_, label) in layers.items()]))
+        choice: int = self.input_loop("Zadejte typ odchylky", number=True)
+        if choice not in layers:
+            print("Zadaný typ odchylky neexistuje")
+            return
+
+        for name in self.chosen_names():
+            create_heatmap(name, years, regions, *layers[choice])
+        # Show the plot to the user
+        plt.show()
+
+    @Utils.debug
+    def plot_overview_year_region(self) -> None:
+        """
+        Create and display an overview of temperature or precipitation data of the chosen regions for a specific
+        year(s), the resolution (months, seasons, years or decades) is picked from the aggregate pyramid
+        according to the length of the chosen range.
+
+        :return: None
+        """
+        level_names: dict[str, str] = {"month": "měsíční", "season": "sezónní (DJF, MAM, JJA, SON)",
+                                       "year": "roční", "decade": "dekádní"}
+
+        def create_2d_plot(name: str, years: list[int], regions: list[int]) -> None:
+            """
+            Creates a 2D plot of aggregates of the given weather variable.
+
+            :param name: str, the name of the weather variable ("temper" or "precip")
+            :param years: list[int], list of years
+            :param regions: list[int], list of region IDs to plot
+            :return: None
+            """
+            level: str
+            data: dict[str, np.ndarray]
+            level, data = self.aggregates(name, years, regions)
+            # Temperatures are averaged, precipitation totals are summed
+            values: np.ndarray = data["mean"] if name == 'temper' else data["sum"]
+
+            fig: mpl.figure.Figure = plt.figure(figsize=(10, 5))
+            years_str: str = ", ".join(map(str, years[:10])) + (", ..." if len(years) > 10 else "")
+            fig.suptitle("Přehled {} za roky: {}\n(rozlišení {}, {} bodů na kraj)".format(
+                "teplot" if name == 'temper' else "srážek", years_str, level_names[level], values.shape[1]))
+            ax = plt.gca()
+            for i, region in enumerate(regions):
+                ax.plot(data["time"], values[i], marker='.', label=self.regions[region])
+            legend: mpl.legend.Legend = plt.legend(title='Kraje:')
+            legend.set_bbox_to_anchor((1, 1))
+            plt.grid(True)
+            fig.subplots_adjust(right=0.75)
+            ax.set_xlabel('Rok [-]', color='blue')
+            if name == 'temper':
+                ax.set_ylabel('Průměrná teplota [°C]', color='blue')
+            else:
+                ax.set_ylabel('Průměrný roční úhrn srážek [mm]' if level == "decade" else 'Úhrn srážek [mm]',
+                              color='blue')
+            self.show_figure(fig)
+
+        # Ask the user to input the years and the regions
+        years: list[int]
+        if not (years := self.ask_years()):
+            return
+        regions: list[int]
+        if not (regions := self.ask_regions()):
+            return
+
+        for name in self.chosen_names():
+            create_2d_plot(name, years, regions)
+        # Show the plot to the user
+        plt.show()
+
+    @Utils.debug
+    def plot_analog_year_region(self) -> None:
+        """
+        Create and display the courses of the chosen year and its most similar past years (analog years)
+        of temperature or precipitation data in the chosen regions, and print the analog years with distances.
+
+        :return: None
+        """
+
+        def create_2d_plot(name: str, year: int, regions: list[int], analogs: dict[str, np.ndarray]) -> None:
+            """
+            Creates a figure with one subplot per region comparing the chosen year with its analog years.
+
+            :param name: str, the name of the weather variable ("temper" or "precip")
+            :param year: int, the chosen year
+            :param regions: list[int], list of region IDs to plot
+            :param analogs: dict, the result of the analog search
+            :return: None
+            """
+            cols: int = min(3, len(regions))
+            rows: int = -(-len(regions) // cols)
+            fig: mpl.figure.Figure
+            fig, axes = plt.subplots(rows, cols, figsize=(5 * cols, 3.5 * rows), squeeze=False)
+            fig.suptitle("Analogické roky k roku {} ({})".format(year, "teploty" if name == 'temper' else "srážky"))
+            for ax, (i, region) in zip(axes.ravel(), enumerate(regions)):
+                for analog, distance in zip(analogs["years"][i], analogs["distance"][i]):
+                    ax.plot(np.arange(12), self.cube[name][analog - PrefixSumIndex.FIRST_YEAR, region],
+                            linewidth=1, alpha=0.7, label=f"{analog} (d = {distance:.2f})")
+                ax.plot(np.arange(12), self.cube[name][year - PrefixSumIndex.FIRST_YEAR, region], color='black',
+                        linewidth=2.5, label=str(year))
+                ax.set_title(self.regions[region], fontsize=10)
+                ax.legend(fontsize=7)
+                ax.grid(True)
+            for ax in axes.ravel()[len(regions):]:
+                ax.set_visible(False)
+            # Month labels only under the lowest subplot of every column
+            for j, ax in enumerate(axes.ravel()[:len(regions)]):
+                ax.set_xticks(np.arange(12))
+                ax.set_xticklabels(self.months if j >= len(regions) - cols else [], rotation=60, ha='right',
+                                   fontsize=8)
+            for ax in axes[:, 0]:
+                ax.set_ylabel('Teplota [°C]' if name == 'temper' else 'Srážky [mm]', color='blue')
+            fig.tight_layout()
+            self.show_figure(fig)
+
+        # Ask the user to input the year, the regions and the number of analog years
+        years: list[int]
+        if not (years := self.ask_years()):
+            return
+        if len(years) != 1:
+            print("Zadejte právě jeden rok")
+            return
+        regions: list[int]
+        if not (regions := self.ask_regions()):
+            return
+        k: int = self.input_loop("Zadejte počet analogických roků (např. 5)", number=True)
 
-            # get weather data
-            z_pre1: np.ndarray = get_weather_data(self.data[name].copy(), region1)
-            z_pre2: np.ndarray = get_weather_data(self.data[name].copy(), region2)
+        # The chosen variables are compared together, e.g. a year both warm and dry
+        names: list[str] = self.chosen_names()
+        analogs: dict[str, np.ndarray] = self.analog_years(years[0], k, regions)
+        if not analogs["years"].shape[1]:
+            print(f"Rok {years[0]} nemá žádné dřívější analogické roky")
+            return
+        print("Analogické roky k roku {} ({}):".format(years[0], " a ".join(
+            "teploty" if name == 'temper' else "srážky" for name in names)))
+        for i, region in enumerate(regions):
+            print(f"{self.regions[region]:>22}: " + ", ".join(
+                f"{analog} ({distance:.2f})" for analog, distance in zip(analogs["years"][i], analogs["distance"][i])))
+        for name in names:
+            create_2d_plot(name, years[0], regions, analogs)
+        # Show the plot to the user
+        plt.show()
 
-            # Create the 2D plot
-            fig: mpl.figure.Figure = plt.figure(figsize=(10, 5))
-            years_str: str = ", ".join(map(str, years[:10])) + (", ..." if len(years) > 10 else "")
-            temper_or_precip: str = "teplot" if name == "temper" else "srážek"
-            subtitle_part_text: str = "Korelace {} za roky: {}".format(temper_or_precip, years_str)
-            fig.suptitle(subtitle_part_text)
+    @Utils.debug
+    def plot_eof_region(self) -> None:
+        """
+        Create and display the EOF analysis of temperature or precipitation anomalies over the whole history:
+        loadings of the leading modes for every region, the dendrogram of the hierarchical clustering of regions
+        and the time series of the principal components, and print the explained variance and the clusters.
 
-            # data normalization
-            z_pre1_norm: np.ndarray = (z_pre1 - np.min(z_pre1)) / (np.max(z_pre1) - np.min(z_pre1))
-            z_pre2_norm: np.ndarray = (z_pre2 - np.min(z_pre2)) / (np.max(z_pre2) - np.min(z_pre2))
+        :return: None
+        """
 
-            # Draw a correlation diagram
-            plt.scatter(z_pre1_norm, z_pre2_norm)
-            plt.xlabel("Normované " + ('teploty' if name == "temper" else 'srážky') + " pro kraj " +
-                       self.regions[region1] + " [-]", color='blue')
-            plt.ylabel("Normované " + ('teploty' if name == "temper" else 'srážky') + " pro kraj " +
-                       self.regions[region2] + " [-]", color='blue')
+        def create_eof_plot(name: str, modes: int, count: int) -> None:
+            """
+            Creates a figure of the EOF analysis for the given weather variable.
 
-            # Perform a linear regression
-            slope: Union[np.float64, float]
-            intercept: Union[np.float64, float]
-            r_value: Union[np.float64, float]
-            p_value: Union[np.float64, float]
-            std_err: Union[np.float64, float]
-            slope, intercept, r_value, p_value, std_err = linregress(z_pre1_norm.ravel(), z_pre2_norm.ravel())
+            :param name: str, the name of the weather variable ("temper" or "precip")
+            :param modes: int, number of plotted modes
+            :param count: int, number of clusters of regions
+            :return: None
+            """
+            result: dict[str, np.ndarray] = self.eof(name)
+            modes = min(modes, result["loadings"].shape[1])
+            labels: np.ndarray = CorrelationAnalyzer.clusters(result["corr"], count)
+
+            fig: mpl.figure.Figure = plt.figure(figsize=(14, 8))
+            fig.suptitle("EOF analýza odchylek {} (celá historie)".format("teplot" if name == 'temper' else "srážek"))
+            grid: mpl.gridspec.GridSpec = fig.add_gridspec(2, 2, height_ratios=[3, 2])
+            ax_tree = fig.add_subplot(grid[0, 1])
+            # The colour threshold lies between the merges leaving count and count - 1 clusters, exactly at
+            # a merge height the dendrogram would colour one more group
+            heights: np.ndarray = np.concatenate([[0.], result["linkage"][:, 2]])
+            threshold: float = (heights[-count] + heights[-count + 1]) / 2 if count > 1 else 0
+            tree: dict = dendrogram(result["linkage"], labels=self.regions, ax=ax_tree, leaf_rotation=60,
+                                    color_threshold=threshold)
+            ax_tree.set_title("Shlukování krajů (vzdálenost 1 - r)", fontsize=10)
+            ax_tree.tick_params(axis='x', labelsize=8)
+            for tick in ax_tree.get_xticklabels():
+                tick.set_ha('right')
+
+            # Loadings in the order of the dendrogram leaves, so the clusters are next to each other
+            order: list[int] = tree["leaves"]
+            ax_load = fig.add_subplot(grid[0, 0])
+            width: float = 0.8 / modes
+            for mode in range(modes):
+                ax_load.bar(np.arange(len(order)) + (mode - (modes - 1) / 2) * width,
+                            result["loadings"][order, mode], width,
+                            label=f"EOF {mode + 1} ({result['explained'][mode] * 100:.1f} %)")
+            ax_load.axhline(0, color='black', linewidth=0.8)
+            ax_load.set_xticks(np.arange(len(order)))
+            ax_load.set_xticklabels([self.regions[i] for i in order], rotation=60, ha='right', fontsize=8)
+            ax_load.set_ylabel('Zátěž ' + ('[°C]' if name == 'temper' else '[mm]'), color='blue')
+            ax_load.set_title("Prostorové zátěže EOF", fontsize=10)
+            ax_load.legend(fontsize=8)
+            ax_load.grid(True, axis='y')
+
+            # Principal components smoothed by the 12-month moving average
+            ax_pcs = fig.add_subplot(grid[1, :])
+            window: np.ndarray = np.ones(12) / 12
+            for mode in range(modes):
+                ax_pcs.plot(result["time"][11:], np.convolve(result["pcs"][mode], window, mode='valid'),
+                            label=f"PC {mode + 1}")
+            ax_pcs.axhline(0, color='black', linewidth=0.8)
+            ax_pcs.set_xlabel('Rok [-] (klouzavý průměr 12 měsíců)', color='blue')
+            ax_pcs.set_ylabel('Hlavní komponenta [-]', color='blue')
+            ax_pcs.legend(fontsize=8)
+            ax_pcs.grid(True)
+            fig.tight_layout()
+
+            print("EOF analýza {}:".format("teplot" if name == 'temper' else "srážek"))
+            for mode in range(modes):
+                print(f"  EOF {mode + 1}: {result['explained'][mode] * 100:>6.2f} % rozptylu")
+            for cluster in np.unique(labels):
+                print(f"  Shluk {cluster}: " + ", ".join(self.regions[i] for i in np.nonzero(labels == cluster)[0]))
+            self.show_figure(fig)
+
+        # Ask the user to input the number of modes and clusters
+        modes: int = self.input_loop("Zadejte počet zobrazených módů EOF (např. 3)", number=True)
+        count: int = self.input_loop("Zadejte počet shluků krajů (např. 3)", number=True)
+        if count > len(self.regions):
+            print("Počet shluků je větší než počet krajů")
+            return
 
-            # Calculate the value of r^2 (coefficient of determination)
-            r_squared: Union[np.float64, float] = r_value ** 2
+        for name in self.chosen_names():
+            create_eof_plot(name, modes, count)
+        # Show the plot to the user
+        plt.show()
 
-            # Create a regression line
-            line_x: np.ndarray = np.array([0, 1])
-            line_y: np.ndarray = slope * line_x + intercept
+    @Utils.debug
+    def plot_return_levels_region(self) -> None:
+        """
+        Create and display return level curves of monthly precipitation extremes of the chosen regions over
+        the whole history (GEV fitted to annual maxima and peaks over threshold), and print the 10, 50 and 100-year
+        return levels.
 
-            plt.plot(line_x, line_y, 'r', label='Lineární regrese')
-            plt.text(0.025, 0.90, 'Koeficient korelace (r): {:.2f}'.format(r_value), ha='left', va='top',
-                     fontsize=10, transform=plt.gca().transAxes, color="#006600", alpha=0.8)
-            plt.text(0.025, 0.85, 'Koeficient determinace (r²): {:.2f}'.format(r_squared), ha='left', va='top',
-                     fontsize=10, transform=plt.gca().transAxes, color="#006600", alpha=0.8)
-            plt.legend()
-            plt.grid(True)
+        :return: None
+        """
+        if not self.precip_choose:
+            print("Pro tento graf je potřeba pracovat se srážkami")
+            return
 
-            mpl.rcParams.update({'keymap.forward': ['d', 'D'], 'keymap.back': ['a', 'A'], 'keymap.save': ['s', 'S']})
-            fig.canvas.mpl_connect('key_press_event', on_key_press)
-            # display the figure
-            fig.show()
+        # Ask the user to input the regions and the fitting method
+        regions: list[int]
+        if not (regions := self.ask_regions()):
+            return
+        mle: bool = self.input_loop("Chcete GEV odhadnout metodou maximální věrohodnosti (jinak L-momenty)")
+
+        result: dict[str, np.ndarray] = self.extremes("precip", mle=mle, parallel=mle)
+        periods: np.ndarray = np.geomspace(2, 200, 60)
+        gev_curve: np.ndarray = ExtremeValueAnalyzer.gev_levels(*result["gev"], periods)
+        pot_curve: np.ndarray = ExtremeValueAnalyzer.gpd_levels(result["threshold"], *result["gpd"], result["rate"],
+                                                                periods)
+
+        fig: mpl.figure.Figure = plt.figure(figsize=(10, 5))
+        fig.suptitle("Návratové úrovně měsíčních srážek (celá historie)\n(plně: GEV ročních maxim{}, čárkovaně: "
+                     "překročení {:.0f}% kvantilu)".format(", max. věrohodnost" if mle else "",
+                                                           ExtremeValueAnalyzer.THRESHOLD * 100))
+        ax = plt.gca()
+        print("Návratové úrovně měsíčních srážek [mm] (GEV / nad prahem):")
+        print(f"{'':>22}  " + "  ".join(f"{period:>15d} let" for period in ExtremeValueAnalyzer.PERIODS))
+        for region in regions:
+            line: list[mpl.lines.Line2D] = ax.semilogx(periods, gev_curve[region], label=self.regions[region])
+            ax.semilogx(periods, pot_curve[region], linestyle='--', color=line[0].get_color())
+            # Observed annual maxima at the Gringorten plotting positions
+            maxima: np.ndarray = np.sort(result["maxima"][region][np.isfinite(result["maxima"][region])])[::-1]
+            ax.plot((len(maxima) + 0.12) / (np.arange(1, len(maxima) + 1) - 0.44), maxima, '.',
+                    color=line[0].get_color())
+            print(f"{self.regions[region]:>22}: " + "  ".join(
+                f"{gev:>8.1f} / {pot:>8.1f}" for gev, pot in zip(result["gev_levels"][region],
+                                                                 result["pot_levels"][region])))
+        legend: mpl.legend.Legend = plt.legend(title='Kraje:')
+        legend.set_bbox_to_anchor((1, 1))
+        plt.grid(True, which='both')
+        fig.subplots_adjust(right=0.75)
+        ax.set_xlabel('Doba opakování [roky]', color='blue')
+        ax.set_ylabel('Měsíční úhrn srážek [mm]', color='blue')
+        self.show_figure(fig)
+        # Show the plot to the user
+        plt.show()
 
-        def control_years(min_year: int, max_year: int, temp_time_len: int) -> bool:
-            """
-            Checks if the given range of years is valid or not.
+    @Utils.debug
+    def plot_percentile_year_region(self) -> None:
+        """
+        Create and display a colour-coded heatmap of percentile ranks of every month of temperature or
+        precipitation data against the whole archive of its region and calendar month for a specific year(s)
+        and region(s).
 
-            :param min_year: minimum year in the range
-            :param max_year: maximum year in the range
-            :param temp_time_len: length of the temperature data
-            :return: boolean indicating if the years are valid or not
-            """
-            if min_year < 1961 or max_year > 1961 + temp_time_len - 1:
-                print("Zadané roky nejsou v rozsahu 1961-" + str(1961 + temp_time_len - 1))
-                return False
-            return True
+        :return: None
+        """
 
-        def control_regions(regions: list[int]) -> bool:
+        def create_heatmap(name: str, years: list[int], regions: list[int]) -> None:
             """
-            Controls whether the regions entered by the user are valid or not.
+            Creates a heatmap of percentile ranks (regions × months of the chosen years) for the given weather
+            variable.
 
-            :param regions: A list of integers representing regions.
-            :return: A boolean indicating whether the regions are valid or not.
+            :param name: str, the name of the weather variable ("temper" or "precip")
+            :param years: list[int], list of years
+            :param regions: list[int], list of region IDs to plot
+            :return: None
             """
-            if min(regions) < 0 or max(regions) > 13:
-                print("Zadané kraje nejsou v rozsahu 0-13")
-                return False
-            return True
+            ranks: np.ndarray = self.percentiles(name, years, regions).transpose(1, 0, 2).reshape(len(regions), -1)
 
-        # Ask the user to input the years
+            fig: mpl.figure.Figure = plt.figure(figsize=(12, 5))
+            years_str: str = ", ".join(map(str, years[:10])) + (", ..." if len(years) > 10 else "")
+            fig.suptitle("Percentil {} vůči všem rokům téhož měsíce a kraje za roky: {}".format(
+                "teplot" if name == 'temper' else "srážek", years_str))
+            ax = plt.gca()
+            image: mpl.image.AxesImage = ax.imshow(ranks, cmap='RdBu_r' if name == 'temper' else 'BrBG', vmin=0,
+                                                   vmax=100, aspect='auto', interpolation='nearest')
+            colorbar: mpl.colorbar.Colorbar = fig.colorbar(image, ax=ax)
+            colorbar.set_label('Percentil [%]', color='blue')
+            # The values are written into the cells if they fit
+            if ranks.size <= 400:
+                for i, j in zip(*np.nonzero(np.isfinite(ranks))):
+                    ax.text(j, i, f"{ranks[i, j]:.0f}", ha='center', va='center', fontsize=7)
+            if len(years) <= 2:
+                ax.set_xticks(np.arange(12 * len(years)))
+                ax.set_xticklabels([f"{month} {year}" for year in years for month in self.months],
+                                   rotation=60, ha='right', fontsize=8)
+            else:
+                step: int = max(1, len(years) // 20)
+                ax.set_xticks(np.arange(0, 12 * len(years), 12 * step))
+                ax.set_xticklabels(years[::step], rotation=60, ha='right', fontsize=8)
+            ax.set_yticks(np.arange(len(regions)))
+            ax.set_yticklabels([self.regions[region] for region in regions])
+            ax.set_xlabel('Měsíce [-]', color='blue')
+            fig.subplots_adjust(left=0.2, bottom=0.25)
+            self.show_figure(fig)
+
+        # Ask the user to input the years and the regions
         years: list[int]
-        if years := UserInterface.input_loop("Zadejte rok(y)", year=True):
-            # Display the regions
-            print("Kraje:")
-            print("\n".join([f"{i}) {region}" for i, region in enumerate(self.regions)]))
-            # Ask the user to input the first region
-            region1: list[int]
-            if not (region1 := UserInterface.input_loop("Zadejte první kraj", region=True)):
-                return
+        if not (years := self.ask_years()):
+            return
+        regions: list[int]
+        if not (regions := self.ask_regions()):
+            return
 
-            # Validate the input first region
-            if not control_regions(region1):
-                return
-            if len(region1) > 1:
-                print("Zadali jste více než jeden kraj")
-                return
+        for name in self.chosen_names():
+            create_heatmap(name, years, regions)
+        # Show the plot to the user
+        plt.show()
 
-            # Ask the user to input the second region
-            region2: list[int]
-            if not (region2 := UserInterface.input_loop("Zadejte druhý kraj", region=True)):
-                return
+    @Utils.debug
+    def plot_seasonal_model_year_region(self) -> None:
+        """
+        Create and display the harmonic seasonal model (annual and semiannual harmonics with a linear trend fitted
+        over the whole history) against the observed temperature or precipitation data and the residuals for
+        a specific year(s) and region(s), and print the parameters of the model.
 
-            # Validate the input second region
-            if not control_regions(region2):
-                return
-            if len(region2) > 1:
-                print("Zadali jste více než jeden kraj")
-                return
+        :return: None
+        """
 
-            # Set the minimum and maximum years based on user input
-            min_year: int = min(years)
-            max_year: int = max(years)
+        def create_2d_plot(name: str, years: list[int], regions: list[int]) -> None:
+            """
+            Creates a figure of the observed and fitted series with the residuals for the given weather variable.
 
-            # Create a 2D correlation plot for temperature if selected by user
-            if self.temper_choose:
-                temp_data: xr.DataArray = self.data['temper'].copy()
-                temp_time_len: int = len(temp_data.coords['time'])
+            :param name: str, the name of the weather variable ("temper" or "precip")
+            :param years: list[int], list of years
+            :param regions: list[int], list of region IDs to plot
+            :return: None
+            """
+            model: dict[str, np.ndarray] = self.seasonal_model()[name]
+            # Months of the chosen years in the monthly series of the whole history
+            columns: np.ndarray = ((np.asarray(years)[:, None] - PrefixSumIndex.FIRST_YEAR) * 12 +
+                                   np.arange(12)).ravel()
+            x: np.ndarray = np.arange(len(columns))
+            observed: np.ndarray = self.select(name, years, regions)
 
-                # Validate the input years for temperature
-                if not control_years(min_year, max_year, temp_time_len):
-                    return
-                create_2d_plot("temper", years, region1.copy()[0], region2.copy()[0])
+            fig: mpl.figure.Figure
+            fig, (ax_fit, ax_res) = plt.subplots(2, 1, figsize=(10, 7), sharex=True, height_ratios=[3, 1])
+            years_str: str = ", ".join(map(str, years[:10])) + (", ..." if len(years) > 10 else "")
+            fig.suptitle("Harmonický sezónní model {} za roky: {}\n(plně: data, čárkovaně: roční a půlroční "
+                         "harmonika + lineární trend)".format("teplot" if name == 'temper' else "srážek", years_str))
+            for i, region in enumerate(regions):
+                line: list[mpl.lines.Line2D] = ax_fit.plot(x, observed[i], label=self.regions[region])
+                ax_fit.plot(x, model["fitted"][region, columns], linestyle='--', color=line[0].get_color())
+                ax_res.plot(x, model["residuals"][region, columns], color=line[0].get_color())
+            ax_res.axhline(0, color='black', linewidth=0.8)
+            legend: mpl.legend.Legend = ax_fit.legend(title='Kraje:')
+            legend.set_bbox_to_anchor((1, 1))
+            ax_fit.grid(True)
+            ax_res.grid(True)
+            fig.subplots_adjust(right=0.75, bottom=0.2)
+            month_labels: list[str] = [f"{month} {year}" for year in years for month in self.months]
+            step: int = max(1, len(month_labels) // 12)
+            ax_res.set_xticks(x[::step])
+            ax_res.set_xticklabels(month_labels[::step], rotation=60, ha='right', fontsize=8)
+            unit: str = '[°C]' if name == 'temper' else '[mm]'
+            ax_fit.set_ylabel(('Teplota ' if name == 'temper' else 'Srážky ') + unit, color='blue')
+            ax_res.set_ylabel('Rezidua ' + unit, color='blue')
+
+            print("Harmonický model {} (celá historie):".format("teplot" if name == 'temper' else "srážek"))
+            for region in regions:
+                print(f"{self.regions[region]:>22}: trend {model['trend'][region]:>6.2f} {unit[:-1]}/10 let], "
+                      f"roční amplituda {model['amplitude'][region, 0]:>6.2f} {unit} "
+                      f"(maximum {self.months[model['peak'][region, 0]]}), "
+                      f"půlroční {model['amplitude'][region, 1]:>6.2f} {unit}, R² = {model['r2'][region]:.2f}")
+            self.show_figure(fig)
+
+        # Ask the user to input the years and the regions
+        years: list[int]
+        if not (years := self.ask_years()):
+            return
+        regions: list[int]
+        if not (regions := self.ask_regions()):
+            return
 
-            # Create a 2D correlation plot for temperature if selected by user
-            if self.precip_choose:
-                prec_data: xr.DataArray = self.data['precip'].copy()
-                prec_time_len: int = len(prec_data.coords['time'])
+        for name in self.chosen_names():
+            create_2d_plot(name, years, regions)
+        # Show the plot to the user
+        plt.show()
 
-                # Validate the input years for precipitation
-                if not control_years(min_year, max_year, prec_time_len):
-                    return
-                create_2d_plot("precip", years, region1.copy()[0], region2.copy()[0])
-            # Show the plot to the user
-            plt.show()
-        else:
+    @Utils.debug
+    def plot_kde_temp_precip_year_region(self) -> None:
+        """
+        Create and display contours of the joint density of temperature and precipitation over all months
+        of the chosen year(s) and region(s), estimated by the binned FFT kernel density estimate.
+
+        :return: None
+        """
+        if not (self.temper_choose and self.precip_choose):
+            print("Pro tento graf je potřeba pracovat s teplotami i se srážkami")
+            return
+
+        # Ask the user to input the years and the regions
+        years: list[int]
+        if not (years := self.ask_years()):
+            return
+        regions: list[int]
+        if not (regions := self.ask_regions()):
+            return
+
+        temper: np.ndarray = self.select("temper", years, regions).ravel()
+        precip: np.ndarray = self.select("precip", years, regions).ravel()
+        if np.count_nonzero(np.isfinite(temper) & np.isfinite(precip)) < 3:
+            print("Pro odhad hustoty jsou potřeba alespoň 3 měsíce")
             return
+        kde: dict[str, np.ndarray] = KernelDensity2D.estimate(temper, precip)
+
+        fig: mpl.figure.Figure = plt.figure(figsize=(10, 6))
+        years_str: str = ", ".join(map(str, years[:10])) + (", ..." if len(years) > 10 else "")
+        fig.suptitle("Sdružená hustota teplot a srážek za roky: {}\n({} měsíců, {} krajů, šířka jádra {:.2f} °C "
+                     "a {:.1f} mm)".format(years_str, np.count_nonzero(np.isfinite(temper) & np.isfinite(precip)),
+                                           len(regions), *kde["bandwidth"]))
+        ax = plt.gca()
+        filled: mpl.contour.QuadContourSet = ax.contourf(kde["x"], kde["y"], kde["density"], levels=12,
+                                                         cmap='viridis')
+        ax.contour(kde["x"], kde["y"], kde["density"], levels=filled.levels[1:], colors='white', linewidths=0.5)
+        colorbar: mpl.colorbar.Colorbar = fig.colorbar(filled, ax=ax)
+        colorbar.set_label('Hustota pravděpodobnosti [1/(°C·mm)]', color='blue')
+        ax.set_xlabel('Teplota [°C]', color='blue')
+        ax.set_ylabel('Srážky [mm]', color='blue')
+        self.show_figure(fig)
+        # Show the plot to the user
+        plt.show()
 
 
 class DataPlotter:
@@ -2299,15 +5244,16 @@ class DataPlotter:
         self.precip_data_are: bool = False
         self.temper_choose: bool = False
         self.precip_choose: bool = False
+        self.graph_plotter: Optional[GraphPlotter] = None
 
     @staticmethod
     def gen_index() -> Generator[int, None, None]:  # index generator
         """
         Generator function for generating indices
 
-        :return: returns a generator object which generates integers from 0 to 9
+        :return: returns a generator object which generates integers from 0 to PLOT_OPTIONS - 1
         """
-        for i in range(10):
+        for i in range(PLOT_OPTIONS):
             yield i
 
     def temper_or_precip(self) -> str:
@@ -2333,7 +5279,10 @@ class DataPlotter:
         :param key: user's choice of plot type as string number
         :return: None
         """
-        graph_plotter = GraphPlotter(self.data, self.temper_choose, self.precip_choose)
+        # The plotter (and its numeric cubes) is built once for each choice of temperature/precipitation
+        if self.graph_plotter is None:
+            self.graph_plotter = GraphPlotter(self.data, self.temper_choose, self.precip_choose)
+        graph_plotter: GraphPlotter = self.graph_plotter
         cases: dict = {
             "0": graph_plotter.plot_3d,
             "1": graph_plotter.plot_3d_year,
@@ -2345,6 +5294,21 @@ class DataPlotter:
             "7": graph_plotter.plot_boxplot_year_region,
             "8": graph_plotter.plot_corr_temp_precip_year_region,
             "9": graph_plotter.plot_corr_year_region,
+            "10": graph_plotter.plot_rolling_region,
+            "11": graph_plotter.plot_trend_year,
+            "12": graph_plotter.plot_spectrogram_region,
+            "13": graph_plotter.plot_psd_year_region,
+            "14": lambda: graph_plotter.plot_2d_year_region(smooth=True),
+            "15": graph_plotter.plot_corr_matrix_year_region,
+            "16": graph_plotter.plot_lagged_corr_region,
+            "17": graph_plotter.plot_anomaly_year_region,
+            "18": graph_plotter.plot_overview_year_region,
+            "19": graph_plotter.plot_analog_year_region,
+            "20": graph_plotter.plot_eof_region,
+            "21": graph_plotter.plot_return_levels_region,
+            "22": graph_plotter.plot_percentile_year_region,
+            "23": graph_plotter.plot_seasonal_model_year_region,
+            "24": graph_plotter.plot_kde_temp_precip_year_region,
             "default": lambda: print("Vybrali jste zpět"),
         }
         cases.get(key, cases["default"])()
@@ -2376,6 +5340,9 @@ class DataPlotter:
             if not (self.temper_choose or self.precip_choose):
                 print("Jiné data aktuálně nezpracovávám, rozhodněte se ještě jednou\n")
                 continue
+            # The choice has changed, build a new plotter and precompute spectra of the standard windows
+            self.graph_plotter = GraphPlotter(self.data, self.temper_choose, self.precip_choose)
+            self.graph_plotter.precompute_spectra()
 
             # Loop until the user chooses to go back
             while True:
@@ -2385,13 +5352,28 @@ class DataPlotter:
 {next(idx)}) 3D graf {self.temper_or_precip()} za posledních 5 let
 {next(idx)}) 3D graf {self.temper_or_precip()} pro zvolené rok(y)
 {next(idx)}) 3D graf {self.temper_or_precip()} pro zvolené rok(y) a region(y)
-{next(idx)}) 2D graf {self.temper_or_precip()} pro zvolené rok(y) a region(y) 
+{next(idx)}) 2D graf {self.temper_or_precip()} pro zvolené rok(y) a region(y)
 {next(idx)}) 3D histogram DCT {self.temper_or_precip()} za posledních 5 let
 {next(idx)}) 3D histogram DCT {self.temper_or_precip()} pro zvolené rok(y) a region(y)
 {next(idx)}) 2D histogram DCT {self.temper_or_precip()} pro zvolené rok(y) a region(y)
 {next(idx)}) Boxploty {self.temper_or_precip()} pro zvolené rok(y) a region(y)
 {next(idx)}) Korelační graf {self.temper_or_precip()} na sobě pro zvolené rok(y) a region(y)
 {next(idx)}) Korelační graf {self.temper_or_precip()} pro zvolené rok(y) mezi 2 regiony
+{next(idx)}) Klouzavé průměry {self.temper_or_precip()} za celou historii pro zvolené region(y)
+{next(idx)}) Heatmapa trendů {self.temper_or_precip()} pro zvolené rok(y) podle krajů a měsíců
+{next(idx)}) Spektrogram DCT {self.temper_or_precip()} za celou historii pro zvolené region(y)
+{next(idx)}) Spektrální hustota výkonu {self.temper_or_precip()} pro zvolené rok(y) a region(y)
+{next(idx)}) 2D graf {self.temper_or_precip()} s vyhlazením pomocí DCT pro zvolené rok(y) a region(y)
+{next(idx)}) Korelační matice {self.temper_or_precip()} mezi všemi zvolenými regiony pro zvolené rok(y)
+{next(idx)}) Vzájemná korelace teplot a srážek s posunem za celou historii pro zvolené region(y)
+{next(idx)}) Odchylky {self.temper_or_precip()} od normálu pro zvolené rok(y) a region(y)
+{next(idx)}) Přehled {self.temper_or_precip()} s automatickým rozlišením pro zvolené rok(y) a region(y)
+{next(idx)}) Analogické roky podle {self.temper_or_precip()} pro zvolený rok a region(y)
+{next(idx)}) EOF analýza a shlukování krajů podle {self.temper_or_precip()} za celou historii
+{next(idx)}) Návratové úrovně extrémních měsíčních srážek za celou historii pro zvolené region(y)
+{next(idx)}) Percentily {self.temper_or_precip()} vůči celé historii pro zvolené rok(y) a region(y)
+{next(idx)}) Harmonický sezónní model {self.temper_or_precip()} pro zvolené rok(y) a region(y)
+{next(idx)}) Sdružená hustota teplot a srážek pro zvolené rok(y) a region(y)
 jiné číslo) zpět
 """)
                 # Get the user's choice and call the appropriate graph using switch_case()
@@ -2404,10 +5386,570 @@ jiné číslo) zpět
                     break
 
 
+class BatchRenderer:
+    """
+    The BatchRenderer class renders plot jobs without a person at the keyboard. A job is a dictionary with
+    the menu option of DataPlotter.switch_case, the output file (the format follows the suffix, e.g. .png or .svg)
+    and the named parameters of the option (see PARAMETERS), the years and regions in the same format as typed
+    in the menu ('2000-2010', '0, 3'), e.g. {"option": 13, "years": "2000-2020", "regions": "0", "welch": true}.
+    The figures are drawn with the Agg backend and the jobs are distributed across a process pool,
+    every worker builds its GraphPlotter only once.
+    """
+    # Named parameters of every menu option in the order of its prompts with the default answer,
+    # None marks a required parameter
+    PARAMETERS: dict[str, tuple[tuple[str, Optional[str]], ...]] = {
+        "0": (),
+        "1": (("years", None),),
+        "2": (("years", None), ("regions", None)),
+        "3": (("years", None), ("regions", None)),
+        "4": (),
+        "5": (("years", None), ("regions", None)),
+        "6": (("years", None), ("regions", None)),
+        "7": (("years", None), ("regions", None)),
+        "8": (("years", None), ("regions", None)),
+        "9": (("years", None), ("region1", None), ("region2", None)),
+        "10": (("regions", None), ("window", "120")),  # window in months
+        "11": (("years", None),),
+        "12": (("regions", None), ("window", "60")),  # window in months
+        # Welch's method (otherwise the periodogram), its segment in months and the overlap in %
+        "13": (("years", None), ("regions", None), ("welch", "ne"), ("segment", "60"), ("overlap", "50")),
+        # the lowest frequencies (otherwise the largest coefficients) and the number of kept DCT coefficients
+        "14": (("years", None), ("regions", None), ("low_pass", "ano"), ("keep", None)),
+        "15": (("years", None), ("regions", None)),
+        "16": (("regions", None), ("max_lag", "24")),  # the largest lag in months
+        "17": (("years", None), ("regions", None), ("layer", "1")),  # type of the anomaly 1-4
+        "18": (("years", None), ("regions", None)),
+        "19": (("years", None), ("regions", None), ("count", "5")),  # number of analog years
+        "20": (("modes", "3"), ("clusters", "3")),  # number of EOF modes and of clusters of regions
+        "21": (("regions", None), ("mle", "ne")),  # maximum likelihood (otherwise L-moments)
+        "22": (("years", None), ("regions", None)),
+        "23": (("years", None), ("regions", None)),
+        "24": (("years", None), ("regions", None)),
+    }
+    # Keys of a job that are not parameters of the menu option
+    JOB_KEYS: tuple[str, ...] = ("option", "plot", "output", "variable", "variables")
+    # Data and plotters of the current process (one plotter for each choice of temperature/precipitation)
+    worker_data: dict[str, xr.DataArray] = {}
+    worker_plotters: dict[tuple[bool, bool], DataPlotter] = {}
+
+    @staticmethod
+    def init_worker(data: dict[str, xr.DataArray]) -> None:
+        """
+        Prepares a process for rendering: switches to the non-interactive Agg backend and stores the data.
+
+        :param data: dictionary with the weather data as returned by DataFetcher.get_data
+        :return: None
+        """
+        plt.switch_backend('Agg')
+        BatchRenderer.worker_data = data
+        BatchRenderer.worker_plotters = {}
+
+    @classmethod
+    def answers(cls, option: Union[int, str], job: dict) -> list[str]:
+        """
+        Returns the scripted answers of a job in the order the menu option asks for them.
+
+        :param option: the menu option
+        :param job: dictionary with the named parameters of the option, the values are strings in the menu
+            format, numbers, booleans (ano/ne) or lists of numbers (the years and regions)
+        :return: list of answers
+        :raises ValueError: if the option is unknown, a required parameter is missing or the job has a parameter
+            that the option does not ask for
+        """
+        if str(option) not in cls.PARAMETERS:
+            raise ValueError(f"Neznámé číslo grafu: {option}")
+        parameters: tuple[tuple[str, Optional[str]], ...] = cls.PARAMETERS[str(option)]
+        names: list[str] = [name for name, _ in parameters]
+        unknown: list[str] = [key for key in job if key not in names and key not in cls.JOB_KEYS]
+        if unknown:
+            raise ValueError(f"Graf {option} nemá parametry {', '.join(unknown)}, "
+                             f"jeho parametry jsou: {', '.join(names) or 'žádné'}")
+        missing: list[str] = [name for name, default in parameters if default is None and job.get(name) is None]
+        if missing:
+            raise ValueError(f"Graf {option} vyžaduje parametry: {', '.join(missing)}")
+        answers: list[str] = []
+        for name, default in parameters:
+            value: any = default if job.get(name) is None else job[name]
+            if isinstance(value, bool):
+                value = "ano" if value else "ne"
+            elif isinstance(value, (list, tuple)):
+                value = ", ".join(map(str, value))
+            answers.append(str(value))
+        return answers
+
+    @staticmethod
+    def render_job(job: dict) -> dict:
+        """
+        Renders one job in the current process.
+
+        :param job: dictionary of the job, 'variables' can limit it to ["temper"] or ["precip"]
+        :return: dictionary with the output, the saved files, the duration in seconds and the error (None if fine)
+        """
+        start: float = tim.time()
+        variables: list[str] = job.get("variables", list(BatchRenderer.worker_data))
+        choice: tuple[bool, bool] = ("temper" in variables and "temper" in BatchRenderer.worker_data,
+                                     "precip" in variables and "precip" in BatchRenderer.worker_data)
+        if choice not in BatchRenderer.worker_plotters:
+            plotter: DataPlotter = DataPlotter()
+            plotter.data = BatchRenderer.worker_data
+            plotter.temper_choose, plotter.precip_choose = choice
+            plotter.graph_plotter = GraphPlotter(plotter.data, *choice)
+            BatchRenderer.worker_plotters[choice] = plotter
+        plotter: DataPlotter = BatchRenderer.worker_plotters[choice]
+        graph_plotter: GraphPlotter = plotter.graph_plotter
+        graph_plotter.output = job["output"]
+        graph_plotter.saved = []
+        os.makedirs(os.path.dirname(job["output"]) or ".", exist_ok=True)
+
+        # The messages of the plot methods are kept, the last one explains a job without any figure
+        log: io.StringIO = io.StringIO()
+        error: Optional[str] = None
+        try:
+            graph_plotter.answers = iter(BatchRenderer.answers(job["option"], job))
+            with contextlib.redirect_stdout(log):
+                plotter.switch_case(str(job["option"]))
+            if not graph_plotter.saved:
+                lines: list[str] = log.getvalue().strip().splitlines()
+                error = lines[-1] if lines else "Nevznikl žádný graf"
+        except (Exception, SystemExit) as e:
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            graph_plotter.answers = None
+            graph_plotter.output = None
+            plt.close('all')
+        return {"output": job["output"], "files": list(graph_plotter.saved), "time": tim.time() - start,
+                "error": error}
+
+    @classmethod
+    def render(cls, data: dict[str, xr.DataArray], jobs: list[dict], parallel: bool = True,
+               workers: Optional[int] = None, report: bool = True) -> list[dict]:
+        """
+        Renders a list of jobs to files and prints a short report.
+
+        :param data: dictionary with the weather data as returned by DataFetcher.get_data
+        :param jobs: list of job dictionaries, see render_job
+        :param parallel: flag whether to distribute the jobs across a process pool
+        :param workers: number of processes, None uses the number of processors
+        :param report: flag whether to print the report
+        :return: list of the results of render_job in the order of the jobs
+        """
+        start: float = tim.time()
+        if not jobs:
+            return []
+        if parallel and len(jobs) > 1:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=cls.init_worker,
+                                                        initargs=(data,)) as executor:
+                results: list[dict] = list(executor.map(cls.render_job, jobs))
+        else:
+            # Serial rendering in this process, the interactive backend is restored afterwards
+            backend: str = mpl.get_backend()
+            cls.init_worker(data)
+            try:
+                results: list[dict] = [cls.render_job(job) for job in jobs]
+            finally:
+                plt.switch_backend(backend)
+        if report:
+            cls.report(results, tim.time() - start)
+        return results
+
+    @staticmethod
+    def report(results: list[dict], total: float) -> None:
+        """
+        Prints one line for every job and the summary.
+
+        :param results: list of the results of render_job, the key 'shared' marks a copy of another job
+        :param total: total duration in seconds
+        :return: None
+        """
+        for result in results:
+            if result["error"] is None:
+                more: str = f" (+{len(result['files']) - 1})" if len(result["files"]) > 1 else ""
+                more += " (sdíleno)" if result.get("shared") else ""
+                print(f"OK     {result['time']:6.2f} s  {result['output']}{more}")
+            else:
+                print(f"CHYBA  {result['time']:6.2f} s  {result['output']}: {result['error']}")
+        failed: int = sum(result["error"] is not None for result in results)
+        print(f"Dokončeno {len(results) - failed}/{len(results)} úloh za {total:.2f} s")
+
+
+class JobRunner:
+    """
+    The JobRunner class executes a job file with many plot and statistics queries in one process that loads
+    the data only once. The job file (JSON, or YAML if PyYAML is installed) is a list of jobs, or a dictionary
+    with the list under 'jobs' and common values under 'defaults', e.g.:
+
+        {"defaults": {"variable": "temper", "years": "1991-2020"},
+         "jobs": [{"plot": 3, "years": "2015", "regions": "0", "output": "report/2015.png"},
+                  {"stats": "range_stats", "regions": "0-13", "output": "report/normal.json"},
+                  {"stats": "extremes", "variable": "precip", "years": null, "output": "report/extremes.json"}]}
+
+    A plot job takes the menu option and its named parameters as BatchRenderer does, the defaults are applied
+    only to the parameters that the option asks for. A statistics job calls the method
+    of GraphPlotter named in 'stats' (one of STATS) with the variable, years, regions and 'params' and writes
+    the result into a JSON file. Identical queries are computed only once, the statistics run in a thread pool
+    on the shared GraphPlotter and the plots in the process pool of BatchRenderer at the same time.
+    """
+    # Methods of GraphPlotter available to the statistics jobs
+    STATS: tuple[str, ...] = ("range_stats", "rolling", "trends", "anomaly", "aggregates", "percentiles", "extremes",
+                              "seasonal_model", "eof", "analog_years", "lagged_correlation", "regression_matrix",
+                              "bootstrap_ci", "spectrogram")
+
+    def __init__(self, data: dict[str, xr.DataArray]) -> None:
+        """
+        Builds the GraphPlotter of all loaded variables, which is shared by all statistics jobs.
+
+        :param data: dictionary with the weather data as returned by DataFetcher.get_data
+        """
+        self.data: dict[str, xr.DataArray] = data
+        self.graph_plotter: GraphPlotter = GraphPlotter(data, "temper" in data, "precip" in data)
+
+    @staticmethod
+    def load(path: str) -> list[dict]:
+        """
+        Loads the jobs from a JSON or YAML file and applies the defaults.
+
+        :param path: path to the job file, *.yaml and *.yml are read by PyYAML
+        :return: list of job dictionaries
+        """
+        with open(path, encoding="utf-8") as file:
+            if path.lower().endswith((".yaml", ".yml")):
+                if yaml is None:
+                    raise ImportError("Pro čtení souborů YAML je potřeba knihovna PyYAML")
+                content: Union[dict, list] = yaml.safe_load(file)
+            else:
+                content: Union[dict, list] = json.load(file)
+        if isinstance(content, list):
+            return content
+        defaults: dict = content.get("defaults", {})
+        jobs: list[dict] = []
+        for job in content["jobs"]:
+            # A plot job would reject the common values its menu option does not ask for, e.g. the years
+            taken: dict = defaults if "plot" not in job else {
+                key: value for key, value in defaults.items() if key in BatchRenderer.JOB_KEYS or
+                key in dict(BatchRenderer.PARAMETERS.get(str(job["plot"]), ()))}
+            jobs.append(taken | job)
+        return jobs
+
+    @staticmethod
+    def parse_selection(job: dict) -> tuple[Optional[list[int]], Optional[list[int]]]:
+        """
+        Converts the years and regions of a statistics job (a string in the menu format or a list of numbers)
+        into lists.
+
+        :param job: dictionary of the job
+        :return: a tuple (years, regions), None where the job does not give them
+        """
+        years: Optional[list[int]] = job.get("years")
+        regions: Optional[list[int]] = job.get("regions")
+        if isinstance(years, str):
+            years = UserInterface.parse_date_range(years)
+        if isinstance(regions, (str, int)):
+            regions = UserInterface.parse_region_range(str(regions))
+        if years is not None and not years:
+            raise ValueError(f"Neplatné roky: {job['years']}")
+        if regions is not None and not regions:
+            raise ValueError(f"Neplatné kraje: {job['regions']}")
+        return years, regions
+
+    @staticmethod
+    def key(job: dict) -> str:
+        """
+        Returns the key of the query of a job, the jobs that differ only in the output path share it.
+
+        :param job: dictionary of the job
+        :return: the key as a JSON string
+        """
+        if "plot" in job:
+            return json.dumps(["plot", str(job["plot"]), JobRunner.variables(job),
+                               BatchRenderer.answers(job["plot"], job), os.path.splitext(job["output"])[1].lower()])
+        years: Optional[list[int]]
+        regions: Optional[list[int]]
+        years, regions = JobRunner.parse_selection(job)
+        return json.dumps(["stats", job["stats"], job.get("variable"), years, regions, job.get("params", {})],
+                          sort_keys=True)
+
+    @staticmethod
+    def variables(job: dict) -> Optional[list[str]]:
+        """
+        Returns the variables of a plot job as a list ('variable' can be a single name).
+
+        :param job: dictionary of the job
+        :return: list of variables, None for all loaded variables
+        """
+        variables: Optional[Union[str, list[str]]] = job.get("variables", job.get("variable"))
+        return [variables] if isinstance(variables, str) else variables
+
+    @staticmethod
+    def to_json(value: any) -> any:
+        """
+        Converts a result of GraphPlotter into JSON types, NaN becomes null.
+
+        :param value: dictionary, tuple, list, numpy array or scalar
+        :return: the converted value
+        """
+        if isinstance(value, dict):
+            return {str(key): JobRunner.to_json(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [JobRunner.to_json(item) for item in value]
+        if isinstance(value, np.ndarray):
+            if value.dtype.kind == "f":
+                return np.where(np.isfinite(value), value, None).tolist()
+            return value.tolist()
+        if isinstance(value, np.generic):
+            value = value.item()
+        return None if isinstance(value, float) and not np.isfinite(value) else value
+
+    def query(self, job: dict) -> any:
+        """
+        Computes one statistics query.
+
+        :param job: dictionary of the job with the key 'stats' and optionally 'variable', 'years', 'regions'
+            and 'params'
+        :return: the result of the GraphPlotter method
+        """
+        if job["stats"] not in self.STATS:
+            raise ValueError(f"Neznámý dotaz: {job['stats']}")
+        years: Optional[list[int]]
+        regions: Optional[list[int]]
+        years, regions = self.parse_selection(job)
+        last: int = PrefixSumIndex.FIRST_YEAR + max(len(cube) for cube in self.graph_plotter.cube.values()) - 1
+        if years and (min(years) < PrefixSumIndex.FIRST_YEAR or max(years) > last):
+            raise ValueError(f"Roky nejsou v rozsahu {PrefixSumIndex.FIRST_YEAR}-{last}")
+        if regions and (min(regions) < 0 or max(regions) >= len(self.graph_plotter.regions)):
+            raise ValueError(f"Kraje nejsou v rozsahu 0-{len(self.graph_plotter.regions) - 1}")
+        method: Callable[..., any] = getattr(self.graph_plotter, job["stats"])
+        kwargs: dict = ({"name": job["variable"]} if job.get("variable") else {}) | \
+                       ({"years": years} if years is not None else {}) | \
+                       ({"regions": regions} if regions is not None else {})
+        # The common values (e.g. the variable from the defaults) are passed only to the methods that take them
+        parameters: list[str] = list(inspect.signature(method).parameters)
+        return method(**{key: value for key, value in kwargs.items() if key in parameters}, **job.get("params", {}))
+
+    def stats_job(self, job: dict) -> dict:
+        """
+        Computes one statistics query and writes it into the output file.
+
+        :param job: dictionary of the job, see query, with the key 'output'
+        :return: dictionary with the output, the saved files, the duration in seconds and the error (None if fine)
+        """
+        start: float = tim.time()
+        try:
+            result: any = self.query(job)
+            os.makedirs(os.path.dirname(job["output"]) or ".", exist_ok=True)
+            with open(job["output"], "w", encoding="utf-8") as file:
+                json.dump({"query": {key: value for key, value in job.items() if key != "output"},
+                           "result": self.to_json(result)}, file, ensure_ascii=False)
+            error: Optional[str] = None
+        except Exception as e:
+            error: Optional[str] = f"{type(e).__name__}: {e}"
+        return {"output": job["output"], "files": [] if error else [job["output"]], "time": tim.time() - start,
+                "error": error}
+
+    def run(self, jobs: list[dict], parallel: bool = True, workers: Optional[int] = None) -> list[dict]:
+        """
+        Executes the jobs, identical queries only once, and prints the timing of every job.
+
+        :param jobs: list of job dictionaries
+        :param parallel: flag whether to run the jobs in parallel or not
+        :param workers: number of threads for the statistics and processes for the plots, None uses the default
+        :return: list of results (see BatchRenderer.render_job) in the order of the jobs, the copies of shared
+            queries have the key 'shared' set to True
+        """
+        start: float = tim.time()
+        # The first job of every query is computed, the others get a copy of its output
+        results: list[Optional[dict]] = [None] * len(jobs)
+        first: dict[str, int] = {}
+        for i, job in enumerate(jobs):
+            try:
+                first.setdefault(self.key(job), i)
+            except (KeyError, ValueError) as e:
+                results[i] = {"output": job.get("output", "?"), "files": [], "time": 0.,
+                              "error": f"{type(e).__name__}: {e}"}
+        plots: list[int] = [i for i in first.values() if "plot" in jobs[i]]
+        stats: list[int] = [i for i in first.values() if "plot" not in jobs[i]]
+        plot_jobs: list[dict] = [{key: value for key, value in jobs[i].items() if key not in ("plot", "variable")} |
+                                 {"option": jobs[i]["plot"]} |
+                                 ({"variables": self.variables(jobs[i])} if self.variables(jobs[i]) else {})
+                                 for i in plots]
+
+        if parallel:
+            # The plots are rendered by the process pool meanwhile the statistics are computed in the threads,
+            # the processes are started by the first submit, before any thread exists
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=BatchRenderer.init_worker,
+                                                        initargs=(self.data,)) as processes:
+                rendered: list[concurrent.futures.Future] = [processes.submit(BatchRenderer.render_job, job)
+                                                             for job in plot_jobs]
+                with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as threads:
+                    for i, result in zip(stats, threads.map(self.stats_job, [jobs[i] for i in stats])):
+                        results[i] = result
+                for i, future in zip(plots, rendered):
+                    results[i] = future.result()
+        else:
+            for i, result in zip(plots, BatchRenderer.render(self.data, plot_jobs, False, report=False)):
+                results[i] = result
+            for i in stats:
+                results[i] = self.stats_job(jobs[i])
+
+        # Copies of the shared queries
+        for i, job in enumerate(jobs):
+            if results[i] is None:
+                source: dict = results[first[self.key(job)]]
+                results[i] = {"output": job["output"], "files": [], "time": 0., "error": source["error"],
+                              "shared": True}
+                stem: str = os.path.splitext(source["output"])[0]
+                for path in source["files"]:
+                    target: str = os.path.splitext(job["output"])[0] + path[len(stem):]
+                    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+                    shutil.copyfile(path, target)
+                    results[i]["files"].append(target)
+        BatchRenderer.report(results, tim.time() - start)
+        return results
+
+
+class CommandLine:
+    """
+    The CommandLine class is the non-interactive interface of the program for scripts and cron, e.g.:
+
+        python main.py update --parallel
+        python main.py plot 3 --years 2015-2020 --regions 0,3 --output report/2d.png
+        python main.py plot --jobs report.yaml --workers 4
+        python main.py stats range_stats --variable precip --years 1991-2020 --regions 0-13
+        python main.py export --output export/data.csv
+
+    Without any arguments the interactive mode starts as before.
+    """
+
+    @staticmethod
+    def parser() -> argparse.ArgumentParser:
+        """
+        Creates the parser of the subcommands fetch, update, plot, stats and export.
+
+        :return: the argument parser
+        """
+        common: argparse.ArgumentParser = argparse.ArgumentParser(add_help=False)
+        common.add_argument("--variables", nargs="+", choices=("temper", "precip"), default=["temper", "precip"],
+                            help="zpracovaná data: teploty a/nebo srážky (výchozí obojí)")
+        common.add_argument("--parallel", action="store_true", help="paralelní načítání a zpracování")
+        common.add_argument("--backup", default=DataFetcher.BACKUP_PATH, help="složka se zálohou dat")
+        data: argparse.ArgumentParser = argparse.ArgumentParser(add_help=False, parents=[common])
+        data.add_argument("--online", action="store_true", help="načíst data z webu místo zálohy")
+
+        parser: argparse.ArgumentParser = argparse.ArgumentParser(
+            description="Teploty a srážky ČR a krajů podle ČHMÚ, bez argumentů se spustí interaktivní režim.")
+        commands: argparse._SubParsersAction = parser.add_subparsers(dest="command", required=True)
+        commands.add_parser("fetch", parents=[common], help="stáhnout data z webu a uložit zálohu")
+        commands.add_parser("update", parents=[common], help="stáhnout data a aktualizovat zálohu, pokud se změnila")
+
+        # The named parameters of every menu option with their defaults in the help
+        options: str = "; ".join(
+            f"{option}: " + (", ".join(name if default is None else f"{name}={default}"
+                                       for name, default in parameters) or "-")
+            for option, parameters in BatchRenderer.PARAMETERS.items())
+        plot: argparse.ArgumentParser = commands.add_parser("plot", parents=[data],
+                                                            help="vykreslit graf nebo úlohy ze souboru",
+                                                            epilog=f"parametry grafů: {options}")
+        plot.add_argument("option", nargs="?", type=int, help=f"číslo grafu z menu (0-{PLOT_OPTIONS - 1})")
+        plot.add_argument("--years", help="rok(y), např. '2000', '1990-2000', '1982, 1984, 1986-1988'")
+        plot.add_argument("--regions", help="kraj(e), např. '5', '0-3'")
+        plot.add_argument("--params", default="{}", help="další pojmenované parametry grafu jako JSON, "
+                                                         "např. '{\"welch\": true, \"segment\": 60}'")
+        plot.add_argument("--output", help="výstupní soubor (.png, .svg, ...), bez něj se graf zobrazí")
+        plot.add_argument("--jobs", help="soubor úloh JSON/YAML pro JobRunner")
+        plot.add_argument("--workers", type=int, help="počet paralelních procesů")
+
+        stats: argparse.ArgumentParser = commands.add_parser("stats", parents=[data], help="spočítat statistiku")
+        stats.add_argument("method", choices=JobRunner.STATS, help="metoda GraphPlotter")
+        stats.add_argument("--variable", choices=("temper", "precip"), help="veličina dotazu")
+        stats.add_argument("--years", help="rok(y), např. '1991-2020'")
+        stats.add_argument("--regions", help="kraj(e), např. '0-13'")
+        stats.add_argument("--params", default="{}", help="další parametry jako JSON, např. '{\"window\": 120}'")
+        stats.add_argument("--output", help="výstupní soubor JSON, bez něj se výsledek vypíše")
+
+        export: argparse.ArgumentParser = commands.add_parser("export", parents=[data],
+                                                              help="exportovat data do NetCDF nebo CSV")
+        export.add_argument("--output", required=True, help="výstupní soubor .nc nebo .csv")
+        return parser
+
+    @staticmethod
+    def run(argv: list[str]) -> int:
+        """
+        Parses the arguments and runs the subcommand.
+
+        :param argv: list of command-line arguments without the program name
+        :return: exit code, 0 if everything succeeded
+        """
+        args: argparse.Namespace = CommandLine.parser().parse_args(argv)
+        start: float = tim.time()
+        fetcher: DataFetcher = DataFetcher()
+        fetcher.BACKUP_PATH = args.backup
+        temper: bool = "temper" in args.variables
+        precip: bool = "precip" in args.variables
+        try:
+            if args.command == "fetch":
+                data: dict = fetcher.fetch(True, temper, precip, args.parallel, save=True)
+            elif args.command == "update":
+                data: dict = fetcher.update(temper, precip, args.parallel)
+            else:
+                data: dict = fetcher.fetch(args.online, temper, precip, args.parallel)
+        except JumpException:
+            return 1
+        if not data:
+            return 1
+
+        if args.command == "plot":
+            if args.jobs:
+                results: list[dict] = JobRunner(data).run(JobRunner.load(args.jobs), args.parallel, args.workers)
+                return int(any(result["error"] for result in results))
+            if args.option is None:
+                print("Zadejte číslo grafu nebo soubor úloh (--jobs)")
+                return 1
+            job: dict = ({"option": args.option, "variables": args.variables}
+                         | ({"years": args.years} if args.years else {})
+                         | ({"regions": args.regions} if args.regions else {})
+                         | json.loads(args.params))
+            if args.output:
+                return int(BatchRenderer.render(data, [job | {"output": args.output}], False)[0]["error"] is not None)
+            # Without an output file the plot is displayed, the questions are answered from the arguments
+            plotter: DataPlotter = DataPlotter()
+            plotter.data = data
+            plotter.temper_choose, plotter.precip_choose = temper, precip
+            plotter.graph_plotter = GraphPlotter(data, temper, precip)
+            try:
+                plotter.graph_plotter.answers = iter(BatchRenderer.answers(args.option, job))
+                plotter.switch_case(str(args.option))
+            except (ValueError, ScriptedInputError) as e:
+                print(e)
+                return 1
+        elif args.command == "stats":
+            runner: JobRunner = JobRunner(data)
+            job: dict = {"stats": args.method, "params": json.loads(args.params)} | \
+                        {key: value for key, value in (("variable", args.variable), ("years", args.years),
+                                                       ("regions", args.regions)) if value is not None}
+            try:
+                result: any = runner.query(job)
+            except Exception as e:
+                print(f"{type(e).__name__}: {e}")
+                return 1
+            if args.output:
+                os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+                with open(args.output, "w", encoding="utf-8") as file:
+                    json.dump({"query": job, "result": JobRunner.to_json(result)}, file, ensure_ascii=False)
+            else:
+                print(json.dumps(JobRunner.to_json(result), ensure_ascii=False))
+        elif args.command == "export":
+            GraphPlotter(data, temper, precip).export(args.output)
+        print(f"Hotovo za {tim.time() - start:.2f} s", file=sys.stderr)
+        return 0
+
+
 if __name__ == "__main__":
     # Sets up a keyboard interrupt signal handler.
     signal.signal(signal.SIGINT, Utils.handle_keyboard_interrupt)
 
+    # Subcommands run without any question, otherwise the interactive mode starts
+    if len(sys.argv) > 1:
+        exit(CommandLine.run(sys.argv[1:]))
+
     # Prints out a welcome message.
     Utils.welcome()
 